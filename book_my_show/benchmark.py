@@ -0,0 +1,301 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from concurrent.futures import ThreadPoolExecutor
+
+from book_my_show.booking_engine import BookingEngine
+from book_my_show.event_log import DurableBookMyShow
+from book_my_show.main import BookMyShow
+from book_my_show.scan_baselines import ScanBestAvailableSeatStrategy, ScanContiguousSeatStrategy
+
+
+def make_system(strategies, shows=10, rows=50, cols=100):
+    """`shows` shows on 5000-seat screens (rows * cols) in one cinema."""
+    system = BookMyShow()
+    system.strategies = strategies
+    system.add_cinema(cinema_id=1, city_id=1, screen_count=shows, rows=rows, cols=cols)
+    for s in range(shows):
+        system.add_show(show_id=s, movie_id=1, cinema_id=1, screen_index=s + 1, start_time=1000, end_time=1200)
+    return system
+
+
+def release_day_rush(system, shows, seed=0, cancel_rate=0.1):
+    """Book groups of 1-8 until every show is sold out, cancelling a random 10% along the way."""
+    rng = random.Random(seed)
+    open_shows = list(range(shows))
+    ticket_id, booked = 0, []
+    while open_shows:
+        show_id = rng.choice(open_shows)
+        ticket_id += 1
+        if system.book_ticket(ticket_id, show_id, rng.randint(1, 8)):
+            booked.append(ticket_id)
+        elif system.get_free_seats_count(show_id) == 0:
+            open_shows.remove(show_id)
+        else:  # fewer seats left than the group: sell the rest as singles
+            system.book_ticket(ticket_id, show_id, 1)
+        if booked and rng.random() < cancel_rate:
+            system.cancel_ticket(booked.pop(rng.randrange(len(booked))))
+    return ticket_id
+
+
+def benchmark_allocation(shows=4):
+    """Sell out `shows` 5000-seat screens with and without the free-run index."""
+    print(f"\n=== Seat allocation: {shows} shows x 5000 seats, sold out with 10% cancellations ===")
+    results = {}
+    for label, strategies in (("free-run index", None),
+                              ("scan", [ScanContiguousSeatStrategy(), ScanBestAvailableSeatStrategy()])):
+        system = make_system(strategies or BookMyShow().strategies, shows)
+        start = time.perf_counter()
+        requests = release_day_rush(system, shows)
+        elapsed = time.perf_counter() - start
+        results[label] = {sid: b["seats"] for sid, b in system.bookings.items()}
+        print(f"{label:<15} {requests / elapsed:>10,.0f} requests/s   ({requests} requests, {elapsed:.2f} s)")
+    assert results["free-run index"] == results["scan"], "index and scan allocated different seats"
+
+
+def benchmark_memory(shows=200, rows=50, cols=100, fill=0.5):
+    """Seat maps and bookings of `shows` half-sold 5000-seat shows vs the list-of-bools / "r-c" layout."""
+    print(f"\n=== Memory: {shows} shows x {rows * cols} seats, {fill:.0%} sold in groups of 4 ===")
+    tracemalloc.start()
+    system = make_system(BookMyShow().strategies, shows, rows, cols)
+    seat_maps, _ = tracemalloc.get_traced_memory()
+    ticket_id = 0
+    for show_id in range(shows):
+        for _ in range(int(rows * cols * fill) // 4):
+            ticket_id += 1
+            system.book_ticket(ticket_id, show_id, 4)
+    bookings = tracemalloc.get_traced_memory()[0] - seat_maps
+    tracemalloc.stop()
+
+    # the previous representation of the same state
+    tracemalloc.start()
+    legacy_seats = [[[False] * cols for _ in range(rows)] for _ in range(shows)]
+    legacy_seat_maps, _ = tracemalloc.get_traced_memory()
+    legacy_bookings = {}
+    for tid, booking in system.bookings.items():
+        show = system.shows[booking["showId"]]
+        labels = [show.seat_label(index) for index in booking["seats"]]
+        for label in labels:
+            r, c = map(int, label.split("-"))
+            legacy_seats[booking["showId"]][r][c] = True
+        legacy_bookings[tid] = {"showId": booking["showId"], "seats": labels}
+    legacy = tracemalloc.get_traced_memory()[0] - legacy_seat_maps
+    tracemalloc.stop()
+    print(f"{'':<22} {'per show':>10} {'per booking':>12}")
+    print(f"{'bitset + packed':<22} {seat_maps / shows:>8.0f} B {bookings / ticket_id:>10.0f} B")
+    print(f"{'bool lists + r-c':<22} {legacy_seat_maps / shows:>8.0f} B {legacy / ticket_id:>10.0f} B")
+
+
+def scan_list_cinemas(system, movie_id, city_id):
+    """The original list_cinemas: any() over every show for every cinema in the city."""
+    result = []
+    for cid in sorted(system.cities.get(city_id, [])):
+        if any(sh.movie_id == movie_id and sh.cinema_id == cid for sh in system.shows.values()):
+            result.append(cid)
+    return result
+
+
+def scan_list_shows(system, movie_id, cinema_id):
+    """The original list_shows: filter every show, then sort."""
+    filtered = [(sh.start_time, sid) for sid, sh in system.shows.items()
+                if sh.movie_id == movie_id and sh.cinema_id == cinema_id]
+    filtered.sort(key=lambda x: (-x[0], x[1]))
+    return [sid for _, sid in filtered]
+
+
+def make_catalogue(rng, show_count, cities, cinemas_per_city, movies, days=30):
+    """Random 3-hour shows on 4-screen cinemas over `days` days; clashing shows are rejected."""
+    system = BookMyShow()
+    for c in range(cities * cinemas_per_city):
+        system.add_cinema(cinema_id=c, city_id=c % cities, screen_count=4, rows=5, cols=10)
+    start = time.perf_counter()
+    added = 0
+    for s in range(show_count):
+        start_time = rng.randrange(0, days * 24) * 60
+        added += system.add_show(show_id=s, movie_id=rng.randrange(movies),
+                                 cinema_id=rng.randrange(cities * cinemas_per_city), screen_index=rng.randint(1, 4),
+                                 start_time=start_time, end_time=start_time + 180)
+    elapsed = time.perf_counter() - start
+    print(f"add_show: {show_count / elapsed:>10,.0f} shows/s   ({added} added, {show_count - added} clashed)")
+    return system
+
+
+def benchmark_browse(show_count=100_000, cities=20, cinemas_per_city=50, movies=200, queries=20):
+    """Browse requests over `show_count` shows: maintained indexes vs the original full scans."""
+    print(f"\n=== Browse: {show_count} shows, {cities * cinemas_per_city} cinemas, {movies} movies ===")
+    rng = random.Random(0)
+    system = make_catalogue(rng, show_count, cities, cinemas_per_city, movies)
+
+    cinema_queries = [(rng.randrange(movies), rng.randrange(cities)) for _ in range(queries)]
+    show_queries = [(rng.randrange(movies), rng.randrange(cities * cinemas_per_city)) for _ in range(queries)]
+    for label, list_cinemas, list_shows in (
+            ("indexed", system.list_cinemas, system.list_shows),
+            ("scan", lambda m, c: scan_list_cinemas(system, m, c), lambda m, c: scan_list_shows(system, m, c))):
+        start = time.perf_counter()
+        cinemas = [list_cinemas(*q) for q in cinema_queries]
+        cinemas_us = (time.perf_counter() - start) / queries * 1e6
+        start = time.perf_counter()
+        shows = [list_shows(*q) for q in show_queries]
+        shows_us = (time.perf_counter() - start) / queries * 1e6
+        if label == "indexed":
+            expected = (cinemas, shows)
+        else:
+            assert (cinemas, shows) == expected, "indexes disagree with the scans"
+        print(f"{label:<8} list_cinemas: {cinemas_us:>10.1f} us   list_shows: {shows_us:>10.1f} us")
+
+    removed = rng.sample(sorted(system.shows), len(system.shows) // 10)
+    start = time.perf_counter()
+    for show_id in removed:
+        system.remove_show(show_id)
+    print(f"remove_show: {len(removed) / (time.perf_counter() - start):>10,.0f} shows/s")
+    assert all(system.list_shows(*q) == scan_list_shows(system, *q) for q in show_queries[:20])
+
+
+def scan_find_shows(system, movie_id, city_id, start_from, start_to, min_free=1):
+    """Time-range search as a full scan of system.shows."""
+    found = [(sh.start_time, sid) for sid, sh in system.shows.items()
+             if sh.movie_id == movie_id and system.cinemas[sh.cinema_id].city_id == city_id
+             and start_from <= sh.start_time <= start_to and sh.free_count >= min_free]
+    return [sid for _, sid in sorted(found)]
+
+
+def scan_screen_conflicts(system, cinema_id, screen_index, start_time, end_time):
+    return [sid for _, sid in sorted((sh.start_time, sid) for sid, sh in system.shows.items()
+                                     if sh.cinema_id == cinema_id and sh.screen_idx == screen_index
+                                     and sh.start_time < end_time and start_time < sh.end_time)]
+
+
+def benchmark_time_search(show_count=100_000, cities=20, cinemas_per_city=50, movies=200, queries=20):
+    """find_shows / screen_conflicts on the interval indexes vs full scans of the shows."""
+    print(f"\n=== Time-range search: {show_count} shows, {cities * cinemas_per_city} cinemas ===")
+    rng = random.Random(1)
+    system = make_catalogue(rng, show_count, cities, cinemas_per_city, movies)
+    for show_id in rng.sample(sorted(system.shows), 1000):  # some sold-out shows for the min_free filter
+        system.book_ticket(f"t{show_id}", show_id, 50)
+    range_queries = []
+    for _ in range(queries):
+        t1 = rng.randrange(0, 30 * 24) * 60
+        range_queries.append((rng.randrange(movies), rng.randrange(cities), t1, t1 + 3 * 24 * 60, 1))
+    conflict_queries = []
+    for _ in range(queries):
+        t1 = rng.randrange(0, 30 * 24) * 60
+        conflict_queries.append((rng.randrange(cities * cinemas_per_city), rng.randint(1, 4), t1, t1 + 180))
+    for label, find_shows, screen_conflicts in (
+            ("indexed", system.find_shows, system.screen_conflicts),
+            ("scan", lambda *q: scan_find_shows(system, *q), lambda *q: scan_screen_conflicts(system, *q))):
+        start = time.perf_counter()
+        found = [find_shows(*q) for q in range_queries]
+        find_us = (time.perf_counter() - start) / queries * 1e6
+        start = time.perf_counter()
+        clashes = [screen_conflicts(*q) for q in conflict_queries]
+        clash_us = (time.perf_counter() - start) / queries * 1e6
+        if label == "indexed":
+            expected = (found, clashes)
+        else:
+            assert (found, clashes) == expected, "interval indexes disagree with the scans"
+        print(f"{label:<8} find_shows: {find_us:>10.1f} us   screen_conflicts: {clash_us:>10.1f} us")
+
+
+def benchmark_engine(workers=(1, 2, 4, 8), ops=5_000):
+    """
+    BookingEngine on a thread pool, one show per worker: hold 1-6 seats, then confirm
+    (every other hold) or release it, then cancel. Checks every show ends with no seats lost.
+    """
+    print(f"\n=== BookingEngine: {ops} hold/confirm/cancel rounds per worker, one show each ===")
+    for n in workers:
+        system = make_system(BookMyShow().strategies, shows=n)
+        engine = BookingEngine(system)
+
+        def worker(show_id):
+            rng = random.Random(show_id)
+            for i in range(ops):
+                hold_id = f"h{show_id}-{i}"
+                if not engine.hold(hold_id, show_id, rng.randint(1, 6)):
+                    continue
+                if i % 2:
+                    engine.confirm(hold_id, f"t{show_id}-{i}")
+                    engine.cancel_ticket(f"t{show_id}-{i}")
+                else:
+                    engine.release(hold_id)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            list(pool.map(worker, range(n)))
+        elapsed = time.perf_counter() - start
+        assert all(system.get_free_seats_count(s) == 5000 for s in range(n)), "seats lost"
+        print(f"workers={n}: {n * ops / elapsed:>9,.0f} rounds/s   ({ops / elapsed:>8,.0f} per worker)")
+
+
+def make_durable_system(log_path, shows, rows=50, cols=100, **kwargs):
+    system = DurableBookMyShow(log_path, **kwargs)
+    system.add_cinema(cinema_id=1, city_id=1, screen_count=shows, rows=rows, cols=cols)
+    for s in range(shows):
+        system.add_show(show_id=s, movie_id=1, cinema_id=1, screen_index=s + 1, start_time=1000, end_time=1200)
+    return system
+
+
+def benchmark_event_log(shows=4, group_sizes=(1, 64, 1024)):
+    """The release-day rush with the write-ahead log off and at several group-commit sizes."""
+    print(f"\n=== Event log: {shows} shows x 5000 seats sold out, booking throughput ===")
+    for group_size in (None,) + tuple(group_sizes):
+        with tempfile.TemporaryDirectory() as tmp:
+            if group_size is None:
+                system, label = make_system(BookMyShow().strategies, shows), "no log"
+            else:
+                system = make_durable_system(os.path.join(tmp, "bookings.log"), shows, group_size=group_size)
+                label = f"group={group_size}"
+            start = time.perf_counter()
+            requests = release_day_rush(system, shows)
+            if group_size is not None:
+                system.close()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<11} {requests / elapsed:>10,.0f} requests/s   ({requests} requests, {elapsed:.2f} s)")
+
+
+def benchmark_recovery(shows=200, rows=50, cols=100):
+    """Restart after 1M single-seat bookings: replaying the whole log vs loading a snapshot."""
+    bookings = shows * rows * cols
+    print(f"\n=== Recovery: {bookings:,} bookings over {shows} shows ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "bookings.log")
+        system = make_durable_system(log_path, shows, rows, cols, group_size=4096)
+        start = time.perf_counter()
+        ticket_id = 0
+        for show_id in range(shows):
+            for _ in range(rows * cols):
+                ticket_id += 1
+                system.book_ticket(ticket_id, show_id, 1)
+        system.close()
+        print(f"write: {bookings / (time.perf_counter() - start):>10,.0f} bookings/s   "
+              f"log {os.path.getsize(log_path) / 2**20:.1f} MiB")
+
+        start = time.perf_counter()
+        replayed = DurableBookMyShow(log_path)
+        print(f"replay log:    {time.perf_counter() - start:>6.2f} s")
+        assert len(replayed.bookings) == bookings and replayed.get_free_seats_count(0) == 0
+
+        start = time.perf_counter()
+        replayed.snapshot()
+        replayed.close()
+        print(f"snapshot:      {time.perf_counter() - start:>6.2f} s   "
+              f"file {os.path.getsize(log_path + '.snap') / 2**20:.1f} MiB")
+
+        start = time.perf_counter()
+        restored = DurableBookMyShow(log_path)
+        print(f"load snapshot: {time.perf_counter() - start:>6.2f} s")
+        assert restored.bookings.keys() == replayed.bookings.keys()
+        assert all(restored.shows[s].seats.taken == replayed.shows[s].seats.taken for s in range(shows))
+        restored.close()
+
+
+if __name__ == "__main__":
+    benchmark_allocation()
+    benchmark_memory()
+    benchmark_browse()
+    benchmark_time_search()
+    benchmark_engine()
+    benchmark_event_log()
+    benchmark_recovery()
@@ -0,0 +1,163 @@
+import threading
+import time
+
+from book_my_show.main import BookMyShow
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: `slots` buckets of `tick_sec` each. A deadline lands in bucket
+    (deadline tick % slots); advance() visits only the buckets of the ticks that passed and
+    returns keys whose deadline is due, leaving later rounds of the same bucket in place.
+    Scheduling and cancelling are O(1); cancel is lazy (the entry is skipped when its
+    bucket comes round).
+    """
+    def __init__(self, tick_sec=1.0, slots=512, now=0.0):
+        self.tick_sec = tick_sec
+        self.slots = [dict() for _ in range(slots)]  # key -> deadline tick
+        self.current_tick = int(now // tick_sec)
+        self.deadlines = {}  # key -> deadline tick, for lazy cancel
+        self._lock = threading.Lock()
+
+    def schedule(self, key, deadline):
+        tick = max(int(-(-deadline // self.tick_sec)), self.current_tick + 1)  # round up: never fire early
+        with self._lock:
+            self.deadlines[key] = tick
+            self.slots[tick % len(self.slots)][key] = tick
+
+    def cancel(self, key):
+        with self._lock:
+            self.deadlines.pop(key, None)
+
+    def advance(self, now):
+        """Keys whose deadline is <= now; each key is returned once."""
+        target = int(now // self.tick_sec)
+        expired = []
+        with self._lock:
+            if target <= self.current_tick:
+                return expired
+            # one full turn visits every bucket, so a long gap needs no extra passes
+            first = max(self.current_tick + 1, target - len(self.slots) + 1)
+            for tick in range(first, target + 1):
+                bucket = self.slots[tick % len(self.slots)]
+                for key, deadline in list(bucket.items()):
+                    if deadline > target:
+                        continue  # a later round of this bucket
+                    del bucket[key]
+                    if self.deadlines.get(key) == deadline:  # not cancelled or rescheduled
+                        del self.deadlines[key]
+                        expired.append(key)
+            self.current_tick = target
+        return expired
+
+
+class BookingEngine:
+    """
+    Thread-safe front end for BookMyShow with seat holds.
+
+    Each show has its own lock: bookings, holds and cancellations on different shows never
+    wait for each other, and allocation on one show is serialised so seats cannot be sold
+    twice. hold() takes seats off sale for `hold_sec`; confirm() turns the hold into a
+    booking, release() or expiry gives the seats back. Hold deadlines sit in a TimerWheel
+    that every call advances, so expired holds are swept without a background thread;
+    expire() can also be called from a periodic job.
+
+    Bookings are written through system.add_booking / pop_booking under the show's lock,
+    so a DurableBookMyShow logs engine bookings, confirmations and cancellations. Holds are
+    not logged: after a restart their seats are free again.
+    """
+    def __init__(self, system: BookMyShow = None, hold_sec=300.0, clock=time.monotonic, tick_sec=1.0):
+        self.system = system or BookMyShow()
+        self.hold_sec = hold_sec
+        self.clock = clock
+        self.holds = {}  # holdId -> {"showId", "seats" (packed indices), "expires"}
+        self.wheel = TimerWheel(tick_sec=tick_sec, now=clock())
+        self._show_locks = {}
+        self._locks_guard = threading.Lock()
+
+    def show_lock(self, show_id):
+        lock = self._show_locks.get(show_id)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._show_locks.setdefault(show_id, threading.Lock())
+        return lock
+
+    # ---- bookings ----
+    def book_ticket(self, ticket_id, show_id, tickets_count):
+        self.expire()
+        show = self.system.shows.get(show_id)
+        if not show:
+            return []
+        with self.show_lock(show_id):
+            return self.system.book_ticket(ticket_id, show_id, tickets_count)
+
+    def cancel_ticket(self, ticket_id):
+        booking = self.system.bookings.get(ticket_id)
+        if booking is None:
+            return False
+        with self.show_lock(booking["showId"]):
+            return self.system.cancel_ticket(ticket_id)
+
+    # ---- holds ----
+    def hold(self, hold_id, show_id, tickets_count):
+        """Take seats off sale until confirm / release / expiry; returns their "r-c" labels."""
+        now = self.expire()
+        show = self.system.shows.get(show_id)
+        if not show or hold_id in self.holds:
+            return []
+        held = {}
+        with self.show_lock(show_id):
+            labels = show.book_seats(hold_id, tickets_count, self.system.strategies, held)
+            if not labels:
+                return []
+            hold = held[hold_id]
+            hold["expires"] = now + self.hold_sec
+            self.holds[hold_id] = hold
+        self.wheel.schedule(hold_id, hold["expires"])
+        return labels
+
+    def confirm(self, hold_id, ticket_id):
+        """Turn an unexpired hold into booking ticket_id; returns its seat labels, or [] if gone."""
+        now = self.expire()
+        hold = self.holds.get(hold_id)
+        if hold is None:
+            return []
+        with self.show_lock(hold["showId"]):
+            if self.holds.get(hold_id) is not hold or hold["expires"] <= now:
+                return []
+            if ticket_id in self.system.bookings:
+                return []  # the hold stays, so it can be confirmed under another ticket id
+            show = self.system.shows.get(hold["showId"])
+            if show is not None:
+                self.system.add_booking(ticket_id, {"showId": hold["showId"], "seats": hold["seats"]})
+            del self.holds[hold_id]
+        self.wheel.cancel(hold_id)
+        if show is None:
+            return []  # the show was removed while held; its seats went with it
+        return [show.seat_label(index) for index in hold["seats"]]
+
+    def release(self, hold_id):
+        self.wheel.cancel(hold_id)
+        return self._release(hold_id)
+
+    def _release(self, hold_id, expired_by=None):
+        hold = self.holds.get(hold_id)
+        if hold is None:
+            return False
+        with self.show_lock(hold["showId"]):
+            if self.holds.get(hold_id) is not hold:
+                return False  # confirmed or released meanwhile
+            if expired_by is not None and hold["expires"] > expired_by:
+                return False
+            del self.holds[hold_id]
+            show = self.system.shows.get(hold["showId"])
+            if show:
+                show.cancel_seats(hold)
+        return True
+
+    def expire(self, now=None):
+        """Release every hold whose deadline has passed; returns the time used."""
+        now = self.clock() if now is None else now
+        for hold_id in self.wheel.advance(now):
+            self._release(hold_id, expired_by=now)
+        return now
@@ -0,0 +1,269 @@
+import json
+import os
+import pickle
+import threading
+from array import array
+
+from book_my_show.main import BookMyShow
+
+
+class EventLog:
+    """
+    Append-only write-ahead log, one JSON array per line: [seq, op, *args].
+
+    append() only buffers the record; commit() writes every buffered record with one
+    write() and one fsync, and append() commits by itself every `group_size` records.
+    With group_size=1 each operation is durable when it returns; larger groups trade a
+    window of at most group_size - 1 operations for far fewer fsyncs. Call commit() before
+    acknowledging anything that must not be lost.
+    """
+    def __init__(self, path, group_size=64, seq=0):
+        self.path = path
+        self.group_size = group_size
+        self.seq = seq
+        self._pending = []
+        self._lock = threading.Lock()
+        self._drop_torn_tail(path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _drop_torn_tail(path):
+        """Cut a partial last record so new records start on a fresh line."""
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if not size:
+                return
+            f.seek(max(0, size - 4096))
+            tail = f.read()
+            if tail.endswith(b"\n"):
+                return
+            cut = tail.rfind(b"\n")
+            if cut < 0 and size > len(tail):
+                return  # one record longer than the window; leave it for read() to stop at
+            f.truncate(size - len(tail) + cut + 1)
+
+    def append(self, op, *args):
+        with self._lock:
+            self.seq += 1
+            self._pending.append(json.dumps([self.seq, op, *args], separators=(",", ":")))
+            if len(self._pending) >= self.group_size:
+                self._write_pending()
+            return self.seq
+
+    def commit(self):
+        with self._lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        self._file.write("\n".join(self._pending) + "\n")
+        self._pending = []
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def truncate(self):
+        """Drop every committed record (they are covered by a snapshot)."""
+        with self._lock:
+            self._write_pending()
+            self._file.truncate(0)
+            self._file.seek(0)
+
+    def close(self):
+        self.commit()
+        self._file.close()
+
+    @staticmethod
+    def read(path, after_seq=0):
+        """Yield (seq, op, args) for records with seq > after_seq; a torn last line ends the log."""
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    seq, op, *args = json.loads(line)
+                except ValueError:
+                    return  # partial write from a crash mid-commit
+                if seq > after_seq:
+                    yield seq, op, args
+
+
+class DurableBookMyShow(BookMyShow):
+    """
+    BookMyShow whose catalogue and bookings survive a restart.
+
+    Every successful add_cinema / add_show / remove_show and every add_booking /
+    pop_booking (which book_ticket, cancel_ticket and BookingEngine go through) is appended
+    to an EventLog; bookings record the packed seat indices they were given, so replay
+    re-takes exactly those seats without running the allocation strategies again.
+    snapshot() pickles the catalogue, each show's row masks rebuilt from its bookings (so
+    BookingEngine holds are left out) and all bookings as flat columns, replaces the
+    snapshot file atomically and truncates the log. On start-up the snapshot is loaded and
+    only log records newer than it are replayed. A snapshot is taken automatically every
+    `snapshot_every` logged operations (0 = only when asked).
+
+    Logged writes and snapshot() share one lock, so BookingEngine threads can book on
+    different shows while another thread takes a snapshot. Seat allocation itself stays
+    outside that lock, under the engine's per-show locks.
+    """
+    def __init__(self, log_path, snapshot_path=None, group_size=64, snapshot_every=0):
+        super().__init__()
+        self.snapshot_path = snapshot_path or log_path + ".snap"
+        self.snapshot_every = snapshot_every
+        self._since_snapshot = 0
+        self._lock = threading.RLock()
+        seq = self._recover(log_path)
+        self.log = EventLog(log_path, group_size, seq)
+
+    # ---- logged operations ----
+    def _record(self, op, *args):
+        """Caller holds self._lock."""
+        self.log.append(op, *args)
+        self._since_snapshot += 1
+        if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def add_cinema(self, cinema_id, city_id, screen_count, rows, cols):
+        with self._lock:
+            super().add_cinema(cinema_id, city_id, screen_count, rows, cols)
+            self._record("cinema", cinema_id, city_id, screen_count, rows, cols)
+
+    def add_show(self, show_id, movie_id, cinema_id, screen_index, start_time, end_time):
+        with self._lock:
+            before = self.shows.get(show_id)
+            result = super().add_show(show_id, movie_id, cinema_id, screen_index, start_time, end_time)
+            if self.shows.get(show_id) is not before:
+                self._record("show", show_id, movie_id, cinema_id, screen_index, start_time, end_time)
+            return result
+
+    def remove_show(self, show_id):
+        with self._lock:
+            if not super().remove_show(show_id):
+                return False
+            self._record("remove", show_id)
+            return True
+
+    def add_booking(self, ticket_id, booking):
+        with self._lock:
+            super().add_booking(ticket_id, booking)
+            self._record("book", ticket_id, booking["showId"], booking["seats"].tolist())
+
+    def pop_booking(self, ticket_id):
+        with self._lock:
+            booking = super().pop_booking(ticket_id)
+            if booking is not None:
+                self._record("cancel", ticket_id)
+            return booking
+
+    def close(self):
+        self.log.close()
+
+    # ---- snapshot / recovery ----
+    def snapshot(self):
+        """Write a snapshot covering every logged operation, then truncate the log."""
+        with self._lock:
+            self.log.commit()
+            # seat masks come from the bookings, not the live seat maps, which also hold
+            # BookingEngine holds and may be mid-update under a show lock
+            taken = {show_id: [0] * show.rows for show_id, show in self.shows.items()}
+            ticket_ids, show_ids, ends, seats = [], [], array("I"), array("I")
+            for ticket_id, booking in self.bookings.items():
+                show_id = booking["showId"]
+                ticket_ids.append(ticket_id)
+                show_ids.append(show_id)
+                seats.extend(booking["seats"])
+                ends.append(len(seats))
+                masks = taken.get(show_id)
+                if masks is not None:  # bookings of removed shows only need to be cancellable
+                    cols = self.shows[show_id].cols
+                    for index in booking["seats"]:
+                        masks[index // cols] |= 1 << (index % cols)
+            state = {
+                "seq": self.log.seq,
+                "cinemas": [(c.cinema_id, c.city_id, len(c.screens), c.rows, c.cols) for c in self.cinemas.values()],
+                "shows": [(s.show_id, s.movie_id, s.cinema_id, s.screen_idx, s.start_time, s.end_time,
+                           taken[s.show_id]) for s in self.shows.values()],
+                "bookings": (ticket_ids, show_ids, ends.tobytes(), seats.tobytes()),
+            }
+            tmp = self.snapshot_path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            # a crash before this truncate only leaves records the snapshot's seq already covers
+            self.log.truncate()
+            self._since_snapshot = 0
+
+    def _recover(self, log_path):
+        seq = 0
+        if os.path.exists(self.snapshot_path):
+            seq = self._load_snapshot()
+        for seq, op, args in EventLog.read(log_path, after_seq=seq):
+            self._apply(op, args)
+        for show in self.shows.values():  # replayed bookings skip the per-row tree refresh
+            show.seats.rebuild()
+        return seq
+
+    def _load_snapshot(self):
+        with open(self.snapshot_path, "rb") as f:
+            state = pickle.load(f)
+        for args in state["cinemas"]:
+            BookMyShow.add_cinema(self, *args)
+        for *args, taken in state["shows"]:
+            BookMyShow.add_show(self, *args)
+            show = self.shows[args[0]]
+            show.seats.load(taken)
+            show.free_count = show.rows * show.cols - sum(mask.bit_count() for mask in taken)
+        ticket_ids, show_ids, ends, seats = state["bookings"]
+        ends, seats = array("I", ends), array("I", seats)
+        start = 0
+        for ticket_id, show_id, end in zip(ticket_ids, show_ids, ends):
+            self._store_booking(ticket_id, {"showId": show_id, "seats": seats[start:end]})
+            start = end
+        return state["seq"]
+
+    def _apply(self, op, args):
+        """Re-run one logged operation without logging it again."""
+        if op == "cinema":
+            BookMyShow.add_cinema(self, *args)
+        elif op == "show":
+            BookMyShow.add_show(self, *args)
+        elif op == "remove":
+            BookMyShow.remove_show(self, *args)
+        elif op == "book":
+            ticket_id, show_id, seats = args
+            show = self.shows.get(show_id)
+            if show is None:
+                return  # written by an older version after its show was removed
+            show.take_indices(seats, refresh=False)
+            self._store_booking(ticket_id, {"showId": show_id, "seats": array("I", seats)})
+        elif op == "cancel":
+            booking = BookMyShow.pop_booking(self, args[0])
+            show = self.shows.get(booking["showId"]) if booking else None
+            if show:
+                show.cancel_seats(booking)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "bookings.log")
+        system = DurableBookMyShow(log_path, group_size=1)
+        system.add_cinema(cinema_id=101, city_id=1, screen_count=2, rows=3, cols=5)
+        system.add_show(show_id=201, movie_id=301, cinema_id=101, screen_index=1, start_time=1600, end_time=1800)
+        print("Booking Ticket 1:", system.book_ticket(ticket_id=401, show_id=201, tickets_count=3))
+        print("Booking Ticket 2:", system.book_ticket(ticket_id=402, show_id=201, tickets_count=2))
+        system.snapshot()
+        print("Cancel Ticket 401:", system.cancel_ticket(401))
+        system.close()
+
+        recovered = DurableBookMyShow(log_path)
+        print("Recovered bookings:", {tid: [recovered.shows[b["showId"]].seat_label(i) for i in b["seats"]]
+                                      for tid, b in recovered.bookings.items()})
+        print("Free Seats in Show 201 after recovery:", recovered.get_free_seats_count(201))
+        print("Booking Ticket 3:", recovered.book_ticket(ticket_id=403, show_id=201, tickets_count=4))
+        recovered.close()
@@ -1,40 +1,154 @@
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+
+
+def _windows(free, k):
+    """Bit c of the result is set iff seats c .. c+k-1 are all free in the `free` bitmask."""
+    width = 1
+    while width < k and free:
+        step = min(width, k - width)
+        free &= free >> step
+        width += step
+    return free
+
+
+def _longest_run(free):
+    """Length of the longest run of set bits, in O(log run) big-int operations."""
+    if not free:
+        return 0
+    powers = [(1, free)]  # (2**j, windows of length 2**j)
+    while True:
+        width, windows = powers[-1]
+        doubled = windows & (windows >> width)
+        if not doubled:
+            break
+        powers.append((2 * width, doubled))
+    length, windows = powers.pop()
+    for width, power_windows in reversed(powers):  # extend greedily by smaller powers
+        longer = windows & (power_windows >> length)
+        if longer:
+            length, windows = length + width, longer
+    return length
+
+
+class SeatMap:
+    """
+    A show's seats as one int bitmask per row (bit c set = seat c taken), plus a max segment
+    tree over rows of each row's longest free run.
+
+    Runs are found with shift-and tricks on the row's free mask: k free seats starting at c
+    show up as bit c of `free & free >> 1 & ... & free >> (k-1)`, built in O(log k) shifts.
+    first_row(k) walks the tree to the lowest row whose longest run is >= k in O(log rows).
+    """
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.full = (1 << cols) - 1
+        self.taken = [0] * rows
+        self.size = 1 << max(0, rows - 1).bit_length()
+        self.tree = [0] * (2 * self.size)
+        for r in range(rows):
+            self.tree[self.size + r] = cols
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def free_mask(self, r):
+        return ~self.taken[r] & self.full
+
+    def is_free(self, r, c):
+        return not (self.taken[r] >> c) & 1
+
+    def _refresh(self, r):
+        node = self.size + r
+        self.tree[node] = _longest_run(self.free_mask(r))
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def first_row(self, k, start_row=0):
+        """Lowest row >= start_row holding a free run of at least k seats, or None."""
+        if self.tree[1] < k:
+            return None
+        return self._first_row(1, 0, self.size, k, start_row)
+
+    def _first_row(self, node, lo, hi, k, start_row):
+        if hi <= start_row or self.tree[node] < k:
+            return None
+        if hi - lo == 1:
+            return lo
+        mid = (lo + hi) // 2
+        row = self._first_row(2 * node, lo, mid, k, start_row)
+        return row if row is not None else self._first_row(2 * node + 1, mid, hi, k, start_row)
+
+    def first_run(self, r, k):
+        """Start column of the first k free seats in row r, or None."""
+        windows = _windows(self.free_mask(r), k)
+        return (windows & -windows).bit_length() - 1 if windows else None
+
+    def find(self, k):
+        """(row, col) of the first window of k free seats in row-major order, or None."""
+        r = self.first_row(k)
+        return None if r is None else (r, self.first_run(r, k))
+
+    def run_at(self, r, c):
+        """Number of consecutive free seats starting at column c of row r."""
+        free = self.free_mask(r) >> c
+        return (free ^ (free + 1)).bit_length() - 1
+
+    def take(self, r, c, k, refresh=True):
+        """refresh=False only sets the bits; the tree is stale until rebuild()."""
+        self.taken[r] |= ((1 << k) - 1) << c
+        if refresh:
+            self._refresh(r)
+
+    def give(self, r, c, k=1):
+        self.taken[r] &= ~(((1 << k) - 1) << c)
+        self._refresh(r)
+
+    def load(self, taken):
+        """Replace every row mask at once (e.g. from a snapshot) and rebuild the tree."""
+        self.taken = list(taken)
+        self.rebuild()
+
+    def rebuild(self):
+        for r in range(self.rows):
+            self.tree[self.size + r] = _longest_run(self.free_mask(r))
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
 
 
 class SeatAllocationStrategy(ABC):
     @abstractmethod
     def allocate(self, show, tickets_count):
+        """Book tickets_count seats of show; returns their packed indices (see Show.seat_index)."""
         pass
 
 
 class ContiguousSeatStrategy(SeatAllocationStrategy):
+    """First window of tickets_count free seats in row-major order, via the show's SeatMap."""
     def allocate(self, show, tickets_count):
-        rows, cols = len(show.seats), len(show.seats[0])
-        for r in range(rows):
-            for c in range(cols - tickets_count + 1):
-                if all(not show.seats[r][c + k] for k in range(tickets_count)):
-                    allocated = []
-                    for k in range(tickets_count):
-                        show.seats[r][c + k] = True
-                        allocated.append(f"{r}-{c + k}")
-                    show.free_count -= tickets_count
-                    return allocated
-        return []  # If contiguous not found
+        found = show.seats.find(tickets_count)
+        if found is None:
+            return []  # If contiguous not found
+        r, c = found
+        return show.take_seats(r, c, tickets_count)
 
 
 class BestAvailableSeatStrategy(SeatAllocationStrategy):
+    """First tickets_count free seats in row-major order, taken run by run."""
     def allocate(self, show, tickets_count):
-        rows, cols = len(show.seats), len(show.seats[0])
+        if show.free_count < tickets_count:
+            return []
         allocated = []
-        for r in range(rows):
-            for c in range(cols):
-                if not show.seats[r][c]:
-                    show.seats[r][c] = True
-                    allocated.append(f"{r}-{c}")
-                    if len(allocated) == tickets_count:
-                        show.free_count -= tickets_count
-                        return allocated
-        return []
+        r = 0
+        while len(allocated) < tickets_count:
+            r = show.seats.first_row(1, r)
+            c = show.seats.first_run(r, 1)
+            allocated += show.take_seats(r, c, min(show.seats.run_at(r, c), tickets_count - len(allocated)))
+        return allocated
 
 
 class Show:
@@ -45,30 +159,69 @@ class Show:
         self.screen_idx = screen_idx
         self.start_time = start_time
         self.end_time = end_time
-        self.seats = [[False] * cols for _ in range(rows)]
+        self.rows = rows
+        self.cols = cols
+        self.seats = SeatMap(rows, cols)
         self.free_count = rows * cols
 
+    def seat_index(self, r, c):
+        return r * self.cols + c
+
+    def seat_label(self, index):
+        r, c = divmod(index, self.cols)
+        return f"{r}-{c}"
+
+    def is_free(self, r, c):
+        return self.seats.is_free(r, c)
+
+    def take_seats(self, r, c, count):
+        """Book the free seats [c, c + count) of row r; returns their packed indices."""
+        self.seats.take(r, c, count)
+        self.free_count -= count
+        start = self.seat_index(r, c)
+        return list(range(start, start + count))
+
     def book_seats(self, ticket_id, tickets_count, strategies, bookings):
         if self.free_count < tickets_count:
             return []
         for strategy in strategies:
             allocated = strategy.allocate(self, tickets_count)
             if allocated:
-                bookings[ticket_id] = {"showId": self.show_id, "seats": allocated}
-                return allocated
+                # bookings keep packed seat indices; callers still get "r-c" labels
+                bookings[ticket_id] = {"showId": self.show_id, "seats": array("I", allocated)}
+                return [self.seat_label(index) for index in allocated]
         return []
 
+    def seat_runs(self, seats):
+        """(row, col, length) for each run of consecutive packed indices within one row."""
+        i = 0
+        while i < len(seats):
+            j = i + 1
+            r, c = divmod(seats[i], self.cols)
+            while j < len(seats) and seats[j] == seats[j - 1] + 1 and seats[j] % self.cols:
+                j += 1
+            yield r, c, j - i
+            i = j
+
+    def take_indices(self, seats, refresh=True):
+        """Book exactly these packed indices (replaying a recorded booking)."""
+        for r, c, k in self.seat_runs(seats):
+            self.seats.take(r, c, k, refresh)
+        self.free_count -= len(seats)
+
     def cancel_seats(self, booking):
-        for seat in booking["seats"]:
-            r, c = map(int, seat.split("-"))
-            self.seats[r][c] = False
-        self.free_count += len(booking["seats"])
+        seats = booking["seats"]
+        for r, c, k in self.seat_runs(seats):  # give contiguous indices back a run at a time
+            self.seats.give(r, c, k)
+        self.free_count += len(seats)
 
 
 class Cinema:
     def __init__(self, cinema_id, city_id, screen_count, rows, cols):
         self.cinema_id = cinema_id
         self.city_id = city_id
+        self.rows = rows
+        self.cols = cols
         self.screens = {i: {"rows": rows, "cols": cols} for i in range(1, screen_count + 1)}
 
 
@@ -78,6 +231,14 @@ class BookMyShow:
         self.cinemas = {}  # cinemaId -> Cinema
         self.shows = {}  # showId -> Show
         self.bookings = {}  # ticketId -> Booking
+        self.show_bookings = {}  # showId -> number of bookings, kept by add_booking / pop_booking
+        # Browse indexes, maintained by add_show / remove_show
+        self.movie_cinemas = {}  # movieId -> cityId -> {cinemaId: number of shows}
+        self.cinema_shows = {}  # (movieId, cinemaId) -> sorted [(-startTime, showId)]
+        self.city_shows = {}  # (movieId, cityId) -> sorted [(startTime, showId)]
+        # (cinemaId, screenIndex) -> sorted [(startTime, endTime, showId)]; intervals never
+        # overlap, so ends are sorted too and one bisect finds every clash
+        self.screen_shows = {}
         # Strategy chain
         self.strategies = [ContiguousSeatStrategy(), BestAvailableSeatStrategy()]
 
@@ -87,43 +248,127 @@ class BookMyShow:
         self.cities.setdefault(city_id, set()).add(cinema_id)
 
     def add_show(self, show_id, movie_id, cinema_id, screen_index, start_time, end_time):
+        """
+        Returns False if the cinema/screen is unknown, the screen is busy in [start, end), or
+        show_id still has bookings (a removed show's included): they would otherwise point
+        at the new show, and cancelling one would free seats nobody booked.
+        """
         cinema = self.cinemas.get(cinema_id)
-        if not cinema or screen_index not in cinema.screens:
-            return
+        if not cinema or screen_index not in cinema.screens or end_time <= start_time:
+            return False
+        if self.show_bookings.get(show_id):
+            return False
+        conflicts = self.screen_conflicts(cinema_id, screen_index, start_time, end_time)
+        if any(sid != show_id for sid in conflicts):  # a show may be re-added over itself
+            return False
         rows = cinema.screens[screen_index]["rows"]
         cols = cinema.screens[screen_index]["cols"]
         show = Show(show_id, movie_id, cinema_id, screen_index, start_time, end_time, rows, cols)
+        self._drop_show(show_id)
         self.shows[show_id] = show
+        counts = self.movie_cinemas.setdefault(movie_id, {}).setdefault(cinema.city_id, {})
+        counts[cinema_id] = counts.get(cinema_id, 0) + 1
+        insort(self.cinema_shows.setdefault((movie_id, cinema_id), []), (-start_time, show_id))
+        insort(self.city_shows.setdefault((movie_id, cinema.city_id), []), (start_time, show_id))
+        insort(self.screen_shows.setdefault((cinema_id, screen_index), []), (start_time, end_time, show_id))
+        return True
+
+    def remove_show(self, show_id):
+        """Drop a show from the catalogue; its bookings can still be cancelled."""
+        return self._drop_show(show_id)
+
+    def _drop_show(self, show_id):
+        show = self.shows.pop(show_id, None)
+        if show is None:
+            return False
+        city_id = self.cinemas[show.cinema_id].city_id
+        counts = self.movie_cinemas[show.movie_id][city_id]
+        counts[show.cinema_id] -= 1
+        if not counts[show.cinema_id]:
+            del counts[show.cinema_id]
+        key = (show.movie_id, show.cinema_id)
+        shows = self.cinema_shows[key]
+        del shows[bisect_left(shows, (-show.start_time, show_id))]
+        if not shows:
+            del self.cinema_shows[key]
+        for index, key, entry in (
+                (self.city_shows, (show.movie_id, city_id), (show.start_time, show_id)),
+                (self.screen_shows, (show.cinema_id, show.screen_idx), (show.start_time, show.end_time, show_id))):
+            shows = index[key]
+            del shows[bisect_left(shows, entry)]
+            if not shows:
+                del index[key]
+        return True
 
     def book_ticket(self, ticket_id, show_id, tickets_count):
         show: Show = self.shows.get(show_id)
-        if not show:
+        if not show or ticket_id in self.bookings:
             return []
-        return show.book_seats(ticket_id, tickets_count, self.strategies, self.bookings)
+        booked = {}
+        labels = show.book_seats(ticket_id, tickets_count, self.strategies, booked)
+        if labels:
+            self.add_booking(ticket_id, booked[ticket_id])
+        return labels
 
     def cancel_ticket(self, ticket_id):
-        if ticket_id not in self.bookings:
+        booking = self.pop_booking(ticket_id)
+        if booking is None:
             return False
-        booking = self.bookings.pop(ticket_id)
-        show = self.shows[booking["showId"]]
-        show.cancel_seats(booking)
+        show = self.shows.get(booking["showId"])
+        if show:
+            show.cancel_seats(booking)
         return True
 
+    # Every booking enters and leaves self.bookings through these two, so subclasses (e.g.
+    # DurableBookMyShow) and front ends (BookingEngine) see the same writes.
+    def add_booking(self, ticket_id, booking):
+        """Store a booking whose seats are already taken on its show."""
+        if booking["showId"] not in self.shows:
+            raise ValueError(f"show {booking['showId']} does not exist")
+        if ticket_id in self.bookings:
+            raise ValueError(f"ticket {ticket_id} is already booked")
+        self._store_booking(ticket_id, booking)
+
+    def _store_booking(self, ticket_id, booking):
+        # also used to reload bookings, including those of shows removed since
+        self.bookings[ticket_id] = booking
+        show_id = booking["showId"]
+        self.show_bookings[show_id] = self.show_bookings.get(show_id, 0) + 1
+
+    def pop_booking(self, ticket_id):
+        """Remove and return a booking, or None; the caller gives its seats back."""
+        booking = self.bookings.pop(ticket_id, None)
+        if booking is not None:
+            show_id = booking["showId"]
+            self.show_bookings[show_id] -= 1
+            if not self.show_bookings[show_id]:
+                del self.show_bookings[show_id]
+        return booking
+
     def get_free_seats_count(self, show_id):
         return self.shows.get(show_id).free_count if show_id in self.shows else 0
 
     def list_cinemas(self, movie_id, city_id):
-        result = []
-        for cid in sorted(self.cities.get(city_id, [])):
-            if any(sh.movie_id == movie_id and sh.cinema_id == cid for sh in self.shows.values()):
-                result.append(cid)
-        return result
+        return sorted(self.movie_cinemas.get(movie_id, {}).get(city_id, ()))
 
     def list_shows(self, movie_id, cinema_id):
-        filtered = [(sh.start_time, sid) for sid, sh in self.shows.items()
-                    if sh.movie_id == movie_id and sh.cinema_id == cinema_id]
-        filtered.sort(key=lambda x: (-x[0], x[1]))
-        return [sid for _, sid in filtered]
+        return [sid for _, sid in self.cinema_shows.get((movie_id, cinema_id), ())]
+
+    def screen_conflicts(self, cinema_id, screen_index, start_time, end_time):
+        """Shows on the screen overlapping [start_time, end_time), in start order: O(log n + k)."""
+        shows = self.screen_shows.get((cinema_id, screen_index), ())
+        i = bisect_left(shows, end_time, key=itemgetter(0))  # shows[:i] start before end_time
+        j = i
+        while j and shows[j - 1][1] > start_time:  # ends are sorted: walk back while they overlap
+            j -= 1
+        return [sid for _, _, sid in shows[j:i]]
+
+    def find_shows(self, movie_id, city_id, start_from, start_to, min_free=1):
+        """Shows of movie_id in city_id starting in [start_from, start_to] with >= min_free seats, by start."""
+        shows = self.city_shows.get((movie_id, city_id), ())
+        lo = bisect_left(shows, start_from, key=itemgetter(0))
+        hi = bisect_right(shows, start_to, lo, key=itemgetter(0))
+        return [sid for _, sid in shows[lo:hi] if self.shows[sid].free_count >= min_free]
 
 
 if __name__ == "__main__":
@@ -156,3 +401,13 @@ if __name__ == "__main__":
     # Step 7: List Shows in a Cinema for a Movie
     print("Shows in Cinema 101 for Movie 301:", system.list_shows(movie_id=301, cinema_id=101))
 
+    # Step 8: Remove a Show
+    print("Remove Show 202:", system.remove_show(202))
+    print("Shows in Cinema 101 for Movie 301 after remove:", system.list_shows(movie_id=301, cinema_id=101))
+
+    # Step 9: Screen clashes and time-range search
+    print("Add clashing Show 204 on Screen 1:",
+          system.add_show(show_id=204, movie_id=302, cinema_id=101, screen_index=1, start_time=1700, end_time=1900))
+    print("Shows of Movie 301 in City 1 starting 1500-1700 with 5 free seats:",
+          system.find_shows(movie_id=301, city_id=1, start_from=1500, start_to=1700, min_free=5))
+
@@ -0,0 +1,27 @@
+from book_my_show.main import SeatAllocationStrategy
+
+
+class ScanContiguousSeatStrategy(SeatAllocationStrategy):
+    """The original window scan, the reference for the free-run index."""
+    def allocate(self, show, tickets_count):
+        rows, cols = show.rows, show.cols
+        for r in range(rows):
+            for c in range(cols - tickets_count + 1):
+                if all(show.is_free(r, c + k) for k in range(tickets_count)):
+                    return show.take_seats(r, c, tickets_count)
+        return []
+
+
+class ScanBestAvailableSeatStrategy(SeatAllocationStrategy):
+    """The original row-major scan for single free seats."""
+    def allocate(self, show, tickets_count):
+        if show.free_count < tickets_count:
+            return []
+        allocated = []
+        for r in range(show.rows):
+            for c in range(show.cols):
+                if show.is_free(r, c):
+                    allocated += show.take_seats(r, c, 1)
+                    if len(allocated) == tickets_count:
+                        return allocated
+        return allocated
@@ -0,0 +1,395 @@
+import os
+import random
+import tempfile
+import threading
+import unittest
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from book_my_show.booking_engine import BookingEngine, TimerWheel
+from book_my_show.event_log import DurableBookMyShow
+from book_my_show.main import BookMyShow, SeatMap, Show, _longest_run, _windows
+from book_my_show.scan_baselines import ScanBestAvailableSeatStrategy, ScanContiguousSeatStrategy
+
+
+class FakeClock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_engine(shows=1, rows=10, cols=10, system=None, **kwargs):
+    system = system or BookMyShow()
+    system.add_cinema(cinema_id=1, city_id=1, screen_count=shows, rows=rows, cols=cols)
+    for s in range(shows):
+        system.add_show(show_id=s, movie_id=1, cinema_id=1, screen_index=s + 1, start_time=1000, end_time=1200)
+    return BookingEngine(system, **kwargs)
+
+
+def scan_run_at(seats, r, c):
+    run = 0
+    while c + run < seats.cols and seats.is_free(r, c + run):
+        run += 1
+    return run
+
+
+class TestSeatMap(unittest.TestCase):
+    def test_index_allocates_like_the_scan_under_churn(self):
+        for rows, cols in ((1, 1), (3, 7), (5, 13), (4, 64), (2, 65)):
+            rng = random.Random(rows * cols)
+            indexed, scanned = make_engine(rows=rows, cols=cols).system, make_engine(rows=rows, cols=cols).system
+            scanned.strategies = [ScanContiguousSeatStrategy(), ScanBestAvailableSeatStrategy()]
+            seats = indexed.shows[0].seats
+            booked = []
+            with self.subTest(rows=rows, cols=cols):
+                for i in range(300):
+                    if booked and rng.random() < 0.4:
+                        ticket_id = booked.pop(rng.randrange(len(booked)))
+                        self.assertEqual(indexed.cancel_ticket(ticket_id), scanned.cancel_ticket(ticket_id))
+                    else:
+                        count = rng.randint(1, min(8, rows * cols))
+                        got, want = indexed.book_ticket(i, 0, count), scanned.book_ticket(i, 0, count)
+                        self.assertEqual(got, want)
+                        if got:
+                            booked.append(i)
+                    for r in range(rows):
+                        longest = max(scan_run_at(seats, r, c) for c in range(cols))
+                        self.assertEqual(_longest_run(seats.free_mask(r)), longest)
+                        self.assertEqual(seats.tree[seats.size + r], longest)
+                        c = rng.randrange(cols)
+                        self.assertEqual(seats.run_at(r, c), scan_run_at(seats, r, c))
+
+    def test_windows_at_edge_widths(self):
+        cols = 6
+        full = (1 << cols) - 1
+        for free in (0, full, 0b101101, 0b011110):
+            with self.subTest(free=bin(free)):
+                self.assertEqual(_windows(free, 0), free)  # k <= 1: every free seat starts a window
+                self.assertEqual(_windows(free, 1), free)
+                self.assertEqual(_windows(free, cols), 1 if free == full else 0)
+                self.assertEqual(_windows(free, cols + 1), 0)
+                for k in range(2, cols):
+                    expected = sum(1 << c for c in range(cols - k + 1) if (free >> c) & ((1 << k) - 1) == (1 << k) - 1)
+                    self.assertEqual(_windows(free, k), expected)
+        self.assertEqual(_longest_run(0), 0)
+        self.assertEqual(_longest_run(full), cols)
+        self.assertEqual(_longest_run(0b1110111011111), 5)
+
+    def test_full_and_empty_rows(self):
+        seats = SeatMap(rows=3, cols=5)
+        self.assertEqual(seats.find(5), (0, 0))
+        self.assertIsNone(seats.find(6))
+        seats.take(0, 0, 5)
+        seats.take(1, 1, 3)
+        self.assertEqual(seats.free_mask(0), 0)
+        self.assertEqual((seats.first_run(0, 1), seats.run_at(0, 0)), (None, 0))
+        self.assertEqual(seats.find(5), (2, 0))
+        self.assertEqual(seats.find(2), (2, 0))
+        self.assertEqual(seats.first_row(1), 1)
+        self.assertEqual(seats.run_at(1, 4), 1)
+        seats.take(2, 0, 5)
+        self.assertIsNone(seats.find(2))
+        self.assertEqual(seats.find(1), (1, 0))
+        seats.give(0, 0, 5)
+        self.assertEqual((seats.find(5), seats.run_at(0, 0)), ((0, 0), 5))
+
+    def test_take_and_free_indices_across_rows(self):
+        show = Show(1, 1, 1, 1, 1000, 1200, rows=3, cols=4)
+        booking = {"showId": 1, "seats": array("I", [2, 3, 4, 5, 11])}  # 0-2, 0-3, 1-0, 1-1, 2-3
+        show.take_indices(booking["seats"])
+        self.assertEqual(show.seats.taken, [0b1100, 0b0011, 0b1000])
+        self.assertEqual(show.free_count, 7)
+        self.assertEqual(show.seats.find(2), (0, 0))
+        self.assertIsNone(show.seats.find(4))
+        rest = {"showId": 1, "seats": array("I", [0, 1, 6, 7, 8, 9, 10])}
+        show.take_indices(rest["seats"], refresh=False)  # stale tree until rebuild
+        show.seats.rebuild()
+        self.assertEqual((show.free_count, show.seats.tree[1]), (0, 0))
+        self.assertEqual(show.seats.taken, [0b1111] * 3)
+        show.cancel_seats(rest)
+        self.assertEqual(show.seats.taken, [0b1100, 0b0011, 0b1000])
+        show.cancel_seats(booking)
+        self.assertEqual(show.seats.taken, [0, 0, 0])
+        self.assertEqual(show.free_count, 12)
+        self.assertEqual(show.seats.find(4), (0, 0))
+
+    def test_seat_runs_split_at_gaps_and_row_ends(self):
+        rng = random.Random(3)
+        for cols in (1, 5, 64):
+            show = Show(1, 1, 1, 1, 1000, 1200, rows=4, cols=cols)
+            for _ in range(50):
+                seats = sorted(rng.sample(range(4 * cols), rng.randint(1, 4 * cols)))
+                runs = []
+                for index in seats:
+                    r, c = divmod(index, cols)
+                    if runs and runs[-1][0] == r and runs[-1][1] + runs[-1][2] == c:
+                        runs[-1][2] += 1
+                    else:
+                        runs.append([r, c, 1])
+                self.assertEqual([list(run) for run in show.seat_runs(array("I", seats))], runs)
+
+
+class TestTimerWheel(unittest.TestCase):
+    def test_fires_once_at_deadline_and_skips_cancelled(self):
+        wheel = TimerWheel(tick_sec=1.0, slots=8)
+        wheel.schedule("a", 3.0)
+        wheel.schedule("b", 20.0)  # more than one turn of the wheel away
+        wheel.schedule("c", 4.0)
+        wheel.cancel("c")
+        self.assertEqual(wheel.advance(2.5), [])
+        self.assertEqual(wheel.advance(3.0), ["a"])
+        self.assertEqual(wheel.advance(12.0), [])
+        self.assertEqual(wheel.advance(100.0), ["b"])
+
+
+class TestBookingEngine(unittest.TestCase):
+    def test_no_oversell_under_contention(self):
+        engine = make_engine(rows=10, cols=10)
+        barrier = threading.Barrier(8)
+
+        def worker(w):
+            barrier.wait()
+            return [engine.book_ticket(f"{w}-{i}", 0, 1 + i % 4) for i in range(50)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = [seats for batch in pool.map(worker, range(8)) for seats in batch]
+        sold = [seat for seats in results for seat in seats]
+        self.assertEqual(len(sold), 100)
+        self.assertEqual(len(set(sold)), 100)
+        self.assertEqual(engine.system.get_free_seats_count(0), 0)
+
+    def test_independent_shows_sell_out_exactly(self):
+        engine = make_engine(shows=8, rows=20, cols=20)
+
+        def worker(show_id):
+            return sum(len(engine.book_ticket(f"{show_id}-{i}", show_id, 4)) for i in range(200))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            self.assertEqual(list(pool.map(worker, range(8))), [400] * 8)
+
+    def test_hold_confirm_and_expiry(self):
+        clock = FakeClock()
+        engine = make_engine(rows=1, cols=4, hold_sec=60, clock=clock)
+        self.assertEqual(engine.hold("h1", 0, 2), ["0-0", "0-1"])
+        self.assertEqual(engine.hold("h2", 0, 2), ["0-2", "0-3"])
+        self.assertEqual(engine.book_ticket("t0", 0, 1), [])  # everything is held
+
+        self.assertEqual(engine.confirm("h1", "t1"), ["0-0", "0-1"])
+        clock.now += 61
+        self.assertEqual(engine.confirm("h2", "t2"), [])  # expired and swept
+        self.assertEqual(engine.system.get_free_seats_count(0), 2)
+        self.assertEqual(engine.book_ticket("t3", 0, 2), ["0-2", "0-3"])
+        self.assertTrue(engine.cancel_ticket("t1"))
+        self.assertEqual(engine.system.get_free_seats_count(0), 2)
+
+    def test_confirm_after_show_removed_drops_the_hold(self):
+        engine = make_engine(rows=1, cols=4)
+        self.assertEqual(engine.hold("h1", 0, 2), ["0-0", "0-1"])
+        self.assertTrue(engine.system.remove_show(0))
+        self.assertEqual(engine.confirm("h1", "t1"), [])
+        self.assertEqual(engine.holds, {})
+        self.assertEqual(engine.system.bookings, {})
+        self.assertFalse(engine.release("h1"))
+
+    def test_duplicate_ticket_ids_are_refused(self):
+        engine = make_engine(shows=2, rows=1, cols=4)
+        system = engine.system
+        self.assertEqual(engine.book_ticket("t1", 0, 1), ["0-0"])
+        self.assertEqual(engine.book_ticket("t1", 1, 1), [])
+        self.assertEqual(system.get_free_seats_count(1), 4)
+        self.assertEqual(engine.hold("h1", 1, 2), ["0-0", "0-1"])
+        self.assertEqual(engine.confirm("h1", "t1"), [])
+        self.assertEqual(engine.confirm("h1", "t2"), ["0-0", "0-1"])
+        with self.assertRaises(ValueError):
+            system.add_booking("t2", {"showId": 0, "seats": system.bookings["t2"]["seats"]})
+        self.assertEqual(system.show_bookings, {0: 1, 1: 1})
+        self.assertTrue(system.cancel_ticket("t1"))
+        self.assertEqual(system.show_bookings, {1: 1})
+
+    def test_release_returns_seats(self):
+        engine = make_engine(rows=1, cols=4)
+        engine.hold("h", 0, 4)
+        self.assertTrue(engine.release("h"))
+        self.assertFalse(engine.release("h"))
+        self.assertEqual(engine.system.get_free_seats_count(0), 4)
+
+
+class TestShowTimeIndexes(unittest.TestCase):
+    def setUp(self):
+        self.system = BookMyShow()
+        self.system.add_cinema(cinema_id=1, city_id=7, screen_count=2, rows=1, cols=4)
+        self.system.add_cinema(cinema_id=2, city_id=7, screen_count=1, rows=1, cols=4)
+
+    def add(self, show_id, screen_index, start_time, end_time, movie_id=1, cinema_id=1):
+        return self.system.add_show(show_id, movie_id, cinema_id, screen_index, start_time, end_time)
+
+    def test_rejects_overlap_on_same_screen_only(self):
+        self.assertTrue(self.add(1, 1, 1000, 1200))
+        self.assertTrue(self.add(2, 1, 1200, 1400))  # back to back is fine
+        self.assertTrue(self.add(3, 2, 1100, 1300))  # other screen
+        self.assertFalse(self.add(4, 1, 1150, 1250))
+        self.assertFalse(self.add(5, 1, 900, 1500))
+        self.assertNotIn(4, self.system.shows)
+        self.assertEqual(self.system.screen_conflicts(1, 1, 1199, 1201), [1, 2])
+        self.assertEqual(self.system.screen_conflicts(1, 1, 1400, 1600), [])
+        self.assertTrue(self.add(1, 1, 1050, 1200))  # re-adding a show may overlap its old slot
+        self.assertTrue(self.system.remove_show(2))
+        self.assertEqual(self.system.screen_conflicts(1, 1, 1000, 2000), [1])
+
+    def test_show_id_with_bookings_cannot_be_reused(self):
+        self.assertTrue(self.add(1, 1, 1000, 1200))
+        self.system.book_ticket(10, 1, 4)
+        self.assertFalse(self.add(1, 1, 1000, 1200))
+        self.assertTrue(self.system.remove_show(1))
+        self.assertFalse(self.add(1, 2, 1000, 1200))  # the removed show's booking is still open
+        self.assertTrue(self.system.cancel_ticket(10))
+        self.assertTrue(self.add(1, 2, 1000, 1200))
+        self.system.book_ticket(11, 1, 2)
+        self.assertEqual(self.system.get_free_seats_count(1), 2)
+        self.assertEqual(self.system.screen_conflicts(1, 1, 0, 9999), [])
+
+    def test_find_shows_by_start_range_and_free_seats(self):
+        self.add(1, 1, 1000, 1200)
+        self.add(2, 2, 1300, 1500)
+        self.add(3, 1, 1600, 1800)
+        self.add(4, 1, 1400, 1600, cinema_id=2)
+        self.add(5, 2, 1000, 1200, movie_id=2)
+        self.system.book_ticket(10, 2, 4)
+        self.assertEqual(self.system.find_shows(1, 7, 1000, 1600, min_free=0), [1, 2, 4, 3])
+        self.assertEqual(self.system.find_shows(1, 7, 1000, 1600), [1, 4, 3])  # show 2 is sold out
+        self.assertEqual(self.system.find_shows(1, 7, 1001, 1599), [4])
+        self.assertEqual(self.system.find_shows(1, 8, 0, 9999), [])
+
+
+class TestDurableBookMyShow(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmp.name, "bookings.log")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def state(self, system):
+        return ({tid: (b["showId"], list(b["seats"])) for tid, b in system.bookings.items()},
+                {sid: (show.seats.taken, show.free_count) for sid, show in system.shows.items()})
+
+    def test_recovers_from_snapshot_and_log_tail(self):
+        system = DurableBookMyShow(self.log_path, group_size=4)
+        system.add_cinema(cinema_id=1, city_id=1, screen_count=2, rows=3, cols=5)
+        system.add_show(show_id=1, movie_id=1, cinema_id=1, screen_index=1, start_time=1000, end_time=1200)
+        system.add_show(show_id=2, movie_id=1, cinema_id=1, screen_index=2, start_time=1300, end_time=1500)
+        for i in range(6):
+            system.book_ticket(i, 1 + i % 2, 1 + i % 3)
+        system.snapshot()
+        system.cancel_ticket(2)
+        system.book_ticket(10, 1, 4)
+        system.remove_show(2)
+        system.close()
+        with open(self.log_path, "a") as f:
+            f.write('[99,"book",11,1,[1')  # torn write from a crash
+
+        recovered = DurableBookMyShow(self.log_path)
+        self.assertEqual(self.state(recovered), self.state(system))
+        self.assertEqual(recovered.list_shows(1, 1), [1])
+        # allocation continues from the recovered seat maps
+        self.assertEqual(recovered.book_ticket(12, 1, 2), system.book_ticket(12, 1, 2))
+        recovered.close()
+        reopened = DurableBookMyShow(self.log_path)
+        self.assertEqual(self.state(reopened), self.state(recovered))
+        reopened.close()
+
+    def test_replays_a_show_re_added_over_itself(self):
+        system = DurableBookMyShow(self.log_path)
+        system.add_cinema(cinema_id=1, city_id=1, screen_count=1, rows=2, cols=4)
+        system.add_show(show_id=1, movie_id=1, cinema_id=1, screen_index=1, start_time=1000, end_time=1200)
+        system.add_show(show_id=1, movie_id=1, cinema_id=1, screen_index=1, start_time=1100, end_time=1300)
+        system.book_ticket(1, 1, 3)
+        self.assertFalse(system.add_show(show_id=1, movie_id=2, cinema_id=1, screen_index=1,
+                                         start_time=1100, end_time=1300))
+        system.close()
+
+        recovered = DurableBookMyShow(self.log_path)
+        self.assertEqual(self.state(recovered), self.state(system))
+        self.assertEqual((recovered.shows[1].start_time, recovered.shows[1].movie_id), (1100, 1))
+        self.assertEqual(recovered.show_bookings, {1: 1})
+        recovered.close()
+
+    def test_bookings_for_missing_shows_are_neither_logged_nor_replayed(self):
+        with open(self.log_path, "w") as f:  # a record left behind by a booking on a removed show
+            f.write('[1,"cinema",1,1,1,1,4]\n[2,"show",1,1,1,1,1000,1200]\n[3,"remove",1]\n[4,"book",7,1,[0,1]]\n')
+        system = DurableBookMyShow(self.log_path)
+        self.assertEqual(system.bookings, {})
+        with self.assertRaises(ValueError):
+            system.add_booking(8, {"showId": 1, "seats": array("I", [2])})
+        system.close()
+        with open(self.log_path) as f:
+            self.assertEqual(len(f.readlines()), 4)
+
+    def test_snapshot_keeps_bookings_of_removed_shows(self):
+        system = DurableBookMyShow(self.log_path)
+        system.add_cinema(cinema_id=1, city_id=1, screen_count=1, rows=1, cols=4)
+        system.add_show(show_id=1, movie_id=1, cinema_id=1, screen_index=1, start_time=1000, end_time=1200)
+        system.book_ticket(7, 1, 2)
+        system.remove_show(1)
+        system.snapshot()
+        system.close()
+        recovered = DurableBookMyShow(self.log_path)
+        self.assertEqual(list(recovered.bookings), [7])
+        self.assertTrue(recovered.cancel_ticket(7))
+        recovered.close()
+
+    def test_snapshot_with_a_screenless_cinema(self):
+        system = DurableBookMyShow(self.log_path)
+        system.add_cinema(cinema_id=1, city_id=1, screen_count=0, rows=3, cols=5)
+        system.snapshot()
+        system.close()
+        recovered = DurableBookMyShow(self.log_path)
+        self.assertEqual(recovered.cinemas[1].screens, {})
+        recovered.close()
+
+    def test_booking_engine_writes_are_logged_and_holds_are_not(self):
+        clock = FakeClock()
+        engine = make_engine(shows=2, rows=3, cols=5, clock=clock,
+                             system=DurableBookMyShow(self.log_path, group_size=1))
+        system = engine.system
+        engine.book_ticket(1, 0, 3)
+        engine.hold("h1", 0, 2)
+        engine.confirm("h1", 2)
+        engine.book_ticket(3, 1, 4)
+        engine.cancel_ticket(3)
+        engine.hold("h2", 1, 5)  # still held at shutdown
+        self.assertEqual(system.get_free_seats_count(1), 10)
+        system.snapshot()
+        engine.book_ticket(4, 1, 1)
+        system.close()
+
+        recovered = DurableBookMyShow(self.log_path)
+        bookings, shows = self.state(recovered)
+        self.assertEqual(bookings, self.state(system)[0])
+        self.assertEqual(sorted(bookings), [1, 2, 4])
+        self.assertEqual((shows[0][1], shows[1][1]), (10, 14))  # the open hold's seats are free again
+        recovered.close()
+
+    def test_snapshot_while_engine_books_on_other_threads(self):
+        engine = make_engine(shows=4, rows=20, cols=20, system=DurableBookMyShow(self.log_path))
+        system = engine.system
+        done = threading.Event()
+
+        def snapshots():
+            while not done.is_set():
+                system.snapshot()
+
+        snapshotter = threading.Thread(target=snapshots)
+        snapshotter.start()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda i: engine.book_ticket(i, i % 4, 1 + i % 3), range(600)))
+        done.set()
+        snapshotter.join()
+        system.close()
+
+        recovered = DurableBookMyShow(self.log_path)
+        self.assertEqual(self.state(recovered), self.state(system))
+        recovered.close()
+
@@ -0,0 +1,180 @@
+import copy
+import random
+import time
+
+from chess_games.bitboard import BitBoard
+from chess_games.main import BACK_RANK, OTHER, START_FEN, Board, create_piece, perft
+from chess_games.transposition import TranspositionTable, cached_perft
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+POSITION_3 = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+
+
+def pseudo_perft(board, color, depth):
+    """
+    Leaf count of the move tree built from Piece.possible_moves alone: every target square
+    not holding a piece of the mover's color, sides alternating, moves undone by moving the
+    piece back and replacing the capture. The last ply is counted without being played
+    (bulk counting). Both board classes must give the same count.
+    """
+    nodes = 0
+    grid = board.grid
+    for src, piece in board.pieces_of(color):
+        for dst in piece.possible_moves(src, board):
+            target = grid[dst[0]][dst[1]]
+            if target is not None and target.color == color:
+                continue
+            if depth == 1:
+                nodes += 1
+                continue
+            captured = board.move_piece(src, dst)
+            nodes += pseudo_perft(board, OTHER[color], depth - 1)
+            board.move_piece(dst, src)
+            if captured is not None:
+                board.place_piece(captured, dst)
+    return nodes
+
+
+def random_position(board_class, rng, pieces=16):
+    board = board_class()
+    names = ["Pawn"] * 8 + BACK_RANK
+    for pos in rng.sample([(r, c) for r in range(8) for c in range(8)], pieces):
+        board.place_piece(create_piece(rng.choice(names), rng.choice(["White", "Black"])), pos)
+    return board
+
+
+def check_same_moves(positions=200, seed=0):
+    """possible_moves gives the same squares on both boards for random positions."""
+    rng = random.Random(seed)
+    for _ in range(positions):
+        state = rng.getstate()
+        grid_board = random_position(Board, rng)
+        rng.setstate(state)
+        bit_board = random_position(BitBoard, rng)
+        for pos, piece in grid_board.pieces_of("White") + grid_board.pieces_of("Black"):
+            assert piece.possible_moves(pos, grid_board) == piece.possible_moves(pos, bit_board), (pos, piece.name)
+
+
+def benchmark_perft(depth=4, seed=2):
+    """Pseudo-legal perft from the start position and from an open random 16-piece position."""
+    check_same_moves()
+    for label, setup in (("start position", lambda board: board.setup_start_position()),
+                         ("random 16 pieces", None)):
+        print(f"\n=== Pseudo-legal perft({depth}), {label} ===")
+        results = {}
+        for board_class in (Board, BitBoard):
+            if setup:
+                board = board_class()
+                setup(board)
+            else:
+                board = random_position(board_class, random.Random(seed))
+            start = time.perf_counter()
+            nodes = pseudo_perft(board, "White", depth)
+            elapsed = time.perf_counter() - start
+            results[board_class.__name__] = nodes
+            print(f"{board_class.__name__:<9} {nodes:>8} nodes   {nodes / elapsed:>10,.0f} nodes/s   ({elapsed:.2f} s)")
+        assert len(set(results.values())) == 1, f"node counts differ: {results}"
+
+
+def benchmark_generate(positions=500, seed=1):
+    """possible_moves for every piece of many random 16-piece positions."""
+    print(f"\n=== possible_moves over {positions} random 16-piece positions ===")
+    for board_class in (Board, BitBoard):
+        rng = random.Random(seed)
+        boards = [random_position(board_class, rng) for _ in range(positions)]
+        start = time.perf_counter()
+        calls = 0
+        for board in boards:
+            for color in ("White", "Black"):
+                for pos, piece in board.pieces_of(color):
+                    piece.possible_moves(pos, board)
+                    calls += 1
+        elapsed = time.perf_counter() - start
+        print(f"{board_class.__name__:<9} {calls / elapsed:>10,.0f} calls/s")
+
+
+def copy_perft(board, depth):
+    """perft the way callers had to do it: test every pseudo-legal move on a deep copy of the board."""
+    moves = []
+    for move in board.pseudo_legal_moves():
+        trial = copy.deepcopy(board)
+        trial.make_move(move)
+        if not trial.in_check(board.turn):
+            moves.append((move, trial))
+    if depth == 1:
+        return len(moves)
+    return sum(copy_perft(trial, depth - 1) for _, trial in moves)
+
+
+def benchmark_legal(cases=((START_FEN, 3, 8902), (KIWIPETE, 2, 2039), (POSITION_3, 4, 43238)), min_speed=5_000):
+    """
+    Legal perft with make/unmake on both boards, and with board copies on the grid Board.
+    BitBoard must stay above `min_speed` nodes/s: ~80k on a single slow core, so the floor
+    only catches a return to board copying.
+    """
+    print("\n=== Legal perft: make/unmake vs copying the board ===")
+    for fen, depth, expected in cases:
+        print(fen)
+        runs = [(board_class.__name__, perft, board_class) for board_class in (Board, BitBoard)]
+        runs.append(("Board+copy", copy_perft, Board))
+        for label, run, board_class in runs:
+            if label == "Board+copy" and expected > 10_000:
+                continue  # minutes at this depth
+            board = board_class.from_fen(fen)
+            start = time.perf_counter()
+            nodes = run(board, depth)
+            elapsed = time.perf_counter() - start
+            assert nodes == expected, f"{label} perft({depth}) = {nodes}, expected {expected}"
+            if board_class is BitBoard and run is perft:
+                assert nodes / elapsed > min_speed, f"{label} perft({depth}) at {nodes / elapsed:,.0f} nodes/s"
+            print(f"  {label:<11} perft({depth}) = {nodes:>6}   {nodes / elapsed:>10,.0f} nodes/s   ({elapsed:.2f} s)")
+
+
+PIECE_VALUES = {"Pawn": 1, "Knight": 3, "Bishop": 3, "Rook": 5, "Queen": 9, "King": 0}
+
+
+def material_and_mobility(board):
+    """Material balance plus a tenth of a point per pseudo-legal move; stands in for a real evaluation."""
+    score = sum((PIECE_VALUES[p.name] if p.color == "White" else -PIECE_VALUES[p.name])
+                for row in board.grid for p in row if p is not None)
+    mobility = len(board.pseudo_legal_moves()) / 10
+    return score + (mobility if board.turn == "White" else -mobility)
+
+
+def evaluate_leaves(board, depth, evaluate):
+    """Evaluate every position at `depth` plies, transpositions included."""
+    if depth == 0:
+        return 1 if evaluate(board) is not None else 0
+    total = 0
+    for move in board.legal_moves():
+        board.make_move(move)
+        total += evaluate_leaves(board, depth - 1, evaluate)
+        board.unmake_move()
+    return total
+
+
+def benchmark_transposition(fen=KIWIPETE, depth=3, size_bits=18):
+    """perft and leaf evaluation with and without the transposition table, on BitBoard."""
+    print(f"\n=== Transposition table (2**{size_bits} slots) ===")
+    print(fen)
+    for label, run in (("perft", lambda board, table: perft(board, depth)),
+                       ("perft + table", lambda board, table: cached_perft(board, depth, table))):
+        board, table = BitBoard.from_fen(fen), TranspositionTable(size_bits)
+        start = time.perf_counter()
+        nodes = run(board, table)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<22} perft({depth}) = {nodes}   {elapsed:.2f} s   (hits {table.hits}, misses {table.misses})")
+    for label, cached in (("evaluate", False), ("evaluate + table", True)):
+        board, table = BitBoard.from_fen(fen), TranspositionTable(size_bits)
+        evaluate = (lambda b: table.evaluate(b, material_and_mobility)) if cached else material_and_mobility
+        start = time.perf_counter()
+        leaves = evaluate_leaves(board, depth, evaluate)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<22} {leaves} leaves   {elapsed:.2f} s   (hits {table.hits}, misses {table.misses})")
+
+
+if __name__ == "__main__":
+    benchmark_generate()
+    benchmark_perft()
+    benchmark_legal()
+    benchmark_transposition()
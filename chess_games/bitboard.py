@@ -0,0 +1,219 @@
+from chess_games.main import ZOBRIST_PIECES, Board, Piece
+
+# Square sq = r * 8 + c is bit sq of a 64-bit int; row 0 is Black's back rank.
+KINDS = {"Pawn": 0, "Knight": 1, "Bishop": 2, "Rook": 3, "Queen": 4, "King": 5}
+COLORS = {"White": 0, "Black": 1}
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+ROOK_DIRS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+BISHOP_DIRS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _inside(squares):
+    return [(r, c) for r, c in squares if 0 <= r < 8 and 0 <= c < 8]
+
+
+def _mask(squares):
+    bb = 0
+    for r, c in squares:
+        if 0 <= r < 8 and 0 <= c < 8:
+            bb |= 1 << (r * 8 + c)
+    return bb
+
+
+def _jump_table(jumps):
+    return [_mask((sq // 8 + dr, sq % 8 + dc) for dr, dc in jumps) for sq in range(64)]
+
+
+def _jump_lists(jumps):
+    return [_inside((sq // 8 + dr, sq % 8 + dc) for dr, dc in jumps) for sq in range(64)]
+
+
+def _ray_squares(sq, dr, dc):
+    r, c = divmod(sq, 8)
+    return _inside((r + dr * i, c + dc * i) for i in range(1, 8))
+
+
+def _ray(sq, dr, dc):
+    return _mask(_ray_squares(sq, dr, dc))
+
+
+def _ray_lists(dirs):
+    """Per direction: (mask table, ascending, step, squares outward from sq in strategy order)."""
+    return [([_ray(sq, dr, dc) for sq in range(64)], dr > 0 or (dr == 0 and dc > 0), abs(dr * 8 + dc),
+             [_ray_squares(sq, dr, dc) for sq in range(64)]) for dr, dc in dirs]
+
+
+KNIGHT_JUMPS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+KING_STEPS = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+KNIGHT_ATTACKS = _jump_table(KNIGHT_JUMPS)
+KING_ATTACKS = _jump_table(KING_STEPS)
+# PAWN_ATTACKS[color][sq]: the diagonals a pawn of that color on sq captures on
+PAWN_ATTACKS = [_jump_table([(-1, -1), (-1, 1)]), _jump_table([(1, -1), (1, 1)])]
+PAWN_PUSH = [_jump_table([(-1, 0)]), _jump_table([(1, 0)])]
+ROOK_RAYS = _ray_lists(ROOK_DIRS)
+BISHOP_RAYS = _ray_lists(BISHOP_DIRS)
+# the same targets as (r, c) lists, in the order the MoveStrategy classes produce them
+KNIGHT_LISTS = _jump_lists(KNIGHT_JUMPS)
+KING_LISTS = _jump_lists(KING_STEPS)
+# PAWN_LISTS[color][sq]: (bit, (r, c), bit if it must be occupied else 0) for the push, then
+# both captures
+PAWN_LISTS = [[[(bit, target, bit if dc else 0) for dc in (0, -1, 1)
+                for target in _inside([(sq // 8 + dr, sq % 8 + dc)]) for bit in [_mask([target])]]
+               for sq in range(64)] for dr in (-1, 1)]
+
+
+def _first_blocker(blockers, ascending):
+    return (blockers & -blockers).bit_length() - 1 if ascending else blockers.bit_length() - 1
+
+
+def _slide(sq, occupied, rays):
+    """Squares reached along each ray up to and including the first occupied one."""
+    attacks = 0
+    for table, ascending, _, _ in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[_first_blocker(blockers, ascending)]
+        attacks |= ray
+    return attacks
+
+
+def _slide_list(sq, occupied, rays, moves):
+    """Append the _slide squares to moves as (r, c), ray by ray, nearest first."""
+    for table, ascending, step, lists in rays:
+        blockers = table[sq] & occupied
+        if blockers:
+            moves += lists[sq][:abs(_first_blocker(blockers, ascending) - sq) // step]
+        else:
+            moves += lists[sq]
+    return moves
+
+
+def rook_attacks(sq, occupied):
+    return _slide(sq, occupied, ROOK_RAYS)
+
+
+def bishop_attacks(sq, occupied):
+    return _slide(sq, occupied, BISHOP_RAYS)
+
+
+def squares(bb):
+    """Set bits of bb in ascending order."""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+class BitBoard(Board):
+    """
+    Board that also keeps one 64-bit int per (color, piece kind) plus per-color and total
+    occupancy, updated in _put / _remove along with the Zobrist hash. generate_moves answers Piece.possible_moves from
+    precomputed knight / king / pawn tables and ray tables for sliders, so no square is
+    visited that is not a result. The grid is kept as well, for callers that read it.
+
+    Results are the same squares, in the same order, that the strategies return (occupied
+    squares of either color included).
+    """
+    def __init__(self):
+        super().__init__()
+        self.bitboards = [[0] * 6 for _ in COLORS]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+
+    def _put(self, piece: Piece, r, c):
+        self.grid[r][c] = piece
+        sq = r * 8 + c
+        self.hash ^= ZOBRIST_PIECES[piece.color][piece.name][sq]
+        bit = 1 << sq
+        color = COLORS[piece.color]
+        self.bitboards[color][KINDS[piece.name]] |= bit
+        self.occupancy[color] |= bit
+        self.occupied |= bit
+
+    def _remove(self, r, c):
+        piece = self.grid[r][c]
+        self.grid[r][c] = None
+        sq = r * 8 + c
+        self.hash ^= ZOBRIST_PIECES[piece.color][piece.name][sq]
+        bit = 1 << sq
+        color = COLORS[piece.color]
+        self.bitboards[color][KINDS[piece.name]] ^= bit
+        self.occupancy[color] ^= bit
+        self.occupied ^= bit
+        return piece
+
+    def attacks(self, piece: Piece, sq):
+        kind = KINDS[piece.name]
+        if kind == KNIGHT:
+            return KNIGHT_ATTACKS[sq]
+        if kind == KING:
+            return KING_ATTACKS[sq]
+        if kind == ROOK:
+            return rook_attacks(sq, self.occupied)
+        if kind == BISHOP:
+            return bishop_attacks(sq, self.occupied)
+        if kind == QUEEN:
+            return rook_attacks(sq, self.occupied) | bishop_attacks(sq, self.occupied)
+        return PAWN_ATTACKS[COLORS[piece.color]][sq]
+
+    def target_mask(self, piece: Piece, sq):
+        """Bitboard form of generate_moves."""
+        if piece.name == "Pawn":
+            color = COLORS[piece.color]
+            return (PAWN_PUSH[color][sq] & ~self.occupied) | (PAWN_ATTACKS[color][sq] & self.occupied)
+        return self.attacks(piece, sq)
+
+    def generate_moves(self, piece: Piece, pos):
+        r, c = pos
+        sq = r * 8 + c
+        kind = KINDS[piece.name]
+        if kind == KNIGHT:
+            return KNIGHT_LISTS[sq][:]
+        if kind == KING:
+            return KING_LISTS[sq][:]
+        if kind == ROOK:
+            return _slide_list(sq, self.occupied, ROOK_RAYS, [])
+        if kind == BISHOP:
+            return _slide_list(sq, self.occupied, BISHOP_RAYS, [])
+        if kind == QUEEN:
+            return _slide_list(sq, self.occupied, BISHOP_RAYS, _slide_list(sq, self.occupied, ROOK_RAYS, []))
+        occupied = self.occupied
+        return [target for bit, target, need in PAWN_LISTS[COLORS[piece.color]][sq] if occupied & bit == need]
+
+    def pieces_of(self, color: str):
+        grid = self.grid
+        return [((sq >> 3, sq & 7), grid[sq >> 3][sq & 7]) for sq in squares(self.occupancy[COLORS[color]])]
+
+    def king_square(self, color: str):
+        king = self.bitboards[COLORS[color]][KING]
+        return divmod(king.bit_length() - 1, 8) if king else None
+
+    def is_square_attacked(self, pos, by_color: str) -> bool:
+        sq = pos[0] * 8 + pos[1]
+        them = COLORS[by_color]
+        bb = self.bitboards[them]
+        if KNIGHT_ATTACKS[sq] & bb[KNIGHT] or KING_ATTACKS[sq] & bb[KING]:
+            return True
+        if PAWN_ATTACKS[1 - them][sq] & bb[PAWN]:  # our pawn's capture squares hold their pawns
+            return True
+        queens = bb[QUEEN]
+        return bool(rook_attacks(sq, self.occupied) & (bb[ROOK] | queens)
+                    or bishop_attacks(sq, self.occupied) & (bb[BISHOP] | queens))
+
+
+if __name__ == "__main__":
+    from chess_games.main import create_piece
+
+    board = BitBoard()
+    board.place_piece(create_piece("King", "White"), (4, 4))
+    board.place_piece(create_piece("Rook", "Black"), (0, 0))
+    board.place_piece(create_piece("Queen", "White"), (7, 7))
+    board.place_piece(create_piece("Knight", "Black"), (2, 5))
+    board.place_piece(create_piece("Pawn", "White"), (6, 3))
+    board.show()
+
+    for pos, piece in board.pieces_of("White") + board.pieces_of("Black"):
+        print(f"{piece.color} {piece.name} {pos}:", piece.possible_moves(pos, board))
+    print(f"Occupied: {board.occupied:#018x}")
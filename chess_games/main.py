@@ -1,4 +1,6 @@
+import random
 from abc import ABC, abstractmethod
+from collections import namedtuple
 from typing import List, Tuple, Optional
 
 
@@ -56,9 +58,12 @@ class BishopStrategy(MoveStrategy):
 
 
 class QueenStrategy(MoveStrategy):
+    rook = RookStrategy()
+    bishop = BishopStrategy()
+
     def get_moves(self, pos, board):
         # Queen = Rook + Bishop moves
-        return RookStrategy().get_moves(pos, board) + BishopStrategy().get_moves(pos, board)
+        return self.rook.get_moves(pos, board) + self.bishop.get_moves(pos, board)
 
 
 class KnightStrategy(MoveStrategy):
@@ -101,29 +106,288 @@ class Piece:
         self.strategy = strategy
 
     def possible_moves(self, pos, board):
-        return self.strategy.get_moves(pos, board)
+        return board.generate_moves(self, pos)
+
+
+STRATEGIES = {"King": KingStrategy(), "Queen": QueenStrategy(), "Rook": RookStrategy(),
+              "Bishop": BishopStrategy(), "Knight": KnightStrategy()}
+BACK_RANK = ["Rook", "Knight", "Bishop", "Queen", "King", "Bishop", "Knight", "Rook"]
+
+
+def create_piece(name: str, color: str) -> Piece:
+    """Pieces share one strategy instance per type (pawns one per piece, for the color)."""
+    strategy = PawnStrategy(color) if name == "Pawn" else STRATEGIES[name]
+    return Piece(name, color, strategy)
+
+
+Move = namedtuple("Move", "src dst promotion", defaults=(None,))
+
+OTHER = {"White": "Black", "Black": "White"}
+PROMOTIONS = ["Queen", "Rook", "Bishop", "Knight"]
+# castling right bits, and the king's / rook's home squares for each
+WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE = 1, 2, 4, 8
+CASTLING = {  # right -> (king from, king to, rook from, rook to, squares that must be empty)
+    WHITE_KING_SIDE: ((7, 4), (7, 6), (7, 7), (7, 5), [(7, 5), (7, 6)]),
+    WHITE_QUEEN_SIDE: ((7, 4), (7, 2), (7, 0), (7, 3), [(7, 1), (7, 2), (7, 3)]),
+    BLACK_KING_SIDE: ((0, 4), (0, 6), (0, 7), (0, 5), [(0, 5), (0, 6)]),
+    BLACK_QUEEN_SIDE: ((0, 4), (0, 2), (0, 0), (0, 3), [(0, 1), (0, 2), (0, 3)]),
+}
+CASTLING_COLOR = {WHITE_KING_SIDE: "White", WHITE_QUEEN_SIDE: "White",
+                  BLACK_KING_SIDE: "Black", BLACK_QUEEN_SIDE: "Black"}
+# rights lost when a move starts or ends on the square
+CASTLING_LOST = {(7, 4): WHITE_KING_SIDE | WHITE_QUEEN_SIDE, (7, 7): WHITE_KING_SIDE, (7, 0): WHITE_QUEEN_SIDE,
+                 (0, 4): BLACK_KING_SIDE | BLACK_QUEEN_SIDE, (0, 7): BLACK_KING_SIDE, (0, 0): BLACK_QUEEN_SIDE}
+FEN_PIECES = {"p": "Pawn", "n": "Knight", "b": "Bishop", "r": "Rook", "q": "Queen", "k": "King"}
+FEN_CASTLING = {"K": WHITE_KING_SIDE, "Q": WHITE_QUEEN_SIDE, "k": BLACK_KING_SIDE, "q": BLACK_QUEEN_SIDE}
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Zobrist keys: a position's hash is the XOR of the keys of its pieces on their squares,
+# its castling rights, its en passant file and (if Black is to move) ZOBRIST_SIDE.
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST_PIECES = {color: {name: [_zobrist_rng.getrandbits(64) for _ in range(64)]
+                          for name in ["Pawn", "Knight", "Bishop", "Rook", "Queen", "King"]}
+                  for color in ["White", "Black"]}
+ZOBRIST_CASTLING = [_zobrist_rng.getrandbits(64) for _ in range(16)]
+ZOBRIST_EP = [_zobrist_rng.getrandbits(64) for _ in range(8)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
 
 
 # --- Board Class ---
 class Board:
+    """
+    8x8 grid of Pieces plus the game state legal move generation needs: side to move,
+    castling rights (bit set of the CASTLING keys) and the en passant target square.
+
+    make_move / unmake_move change the position in place and keep an undo stack in
+    `history`, so search never copies the grid. legal_moves() generates pseudo-legal moves
+    from Piece.possible_moves (dropping friendly targets, adding double pushes, en passant,
+    promotions and castling) and keeps those that do not leave the mover's king attacked.
+
+    `hash` is the position's Zobrist key, updated incrementally by _put / _remove (so by
+    place_piece, move_piece and make_move), _set_state and _set_turn.
+    """
     def __init__(self):
         self.grid: List[List[Optional[Piece]]] = [[None for _ in range(8)] for _ in range(8)]
+        self.turn = "White"
+        self.castling = 0
+        self.ep_square: Optional[Tuple[int, int]] = None
+        self.history = []  # undo records, one per make_move
+        self.kings = {}  # color -> king position
+        self.hash = ZOBRIST_CASTLING[0]
 
     def is_inside(self, r, c):
         return 0 <= r < 8 and 0 <= c < 8
 
+    # Every change to the position goes through _put / _remove, so subclasses that keep
+    # extra state (bitboards, hashes) only override these two.
+    def _put(self, piece: Piece, r, c):
+        self.grid[r][c] = piece
+        self.hash ^= ZOBRIST_PIECES[piece.color][piece.name][r * 8 + c]
+        if piece.name == "King":
+            self.kings[piece.color] = (r, c)
+
+    def _remove(self, r, c):
+        piece = self.grid[r][c]
+        self.grid[r][c] = None
+        self.hash ^= ZOBRIST_PIECES[piece.color][piece.name][r * 8 + c]
+        if piece.name == "King" and self.kings.get(piece.color) == (r, c):
+            del self.kings[piece.color]
+        return piece
+
     def place_piece(self, piece: Piece, pos: Tuple[int, int]):
         r, c = pos
-        self.grid[r][c] = piece
+        if self.grid[r][c] is not None:
+            self._remove(r, c)
+        self._put(piece, r, c)
 
     def move_piece(self, src: Tuple[int, int], dst: Tuple[int, int]):
+        """Move src to dst without any rule checks; returns the piece that stood on dst, if any."""
         r1, c1 = src
         r2, c2 = dst
-        piece = self.grid[r1][c1]
-        if piece is None:
+        if self.grid[r1][c1] is None:
             raise ValueError("No piece at source")
-        self.grid[r1][c1] = None
-        self.grid[r2][c2] = piece
+        piece = self._remove(r1, c1)
+        captured = self._remove(r2, c2) if self.grid[r2][c2] is not None else None
+        self._put(piece, r2, c2)
+        return captured
+
+    def generate_moves(self, piece: Piece, pos: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Target squares for `piece` on `pos`; Piece.possible_moves dispatches here."""
+        return piece.strategy.get_moves(pos, self)
+
+    def pieces_of(self, color: str):
+        """(pos, piece) for every piece of `color`, row by row."""
+        return [((r, c), p) for r, row in enumerate(self.grid) for c, p in enumerate(row)
+                if p is not None and p.color == color]
+
+    def king_square(self, color: str):
+        return self.kings.get(color)
+
+    def setup_start_position(self):
+        for c, name in enumerate(BACK_RANK):
+            self.place_piece(create_piece(name, "Black"), (0, c))
+            self.place_piece(create_piece("Pawn", "Black"), (1, c))
+            self.place_piece(create_piece("Pawn", "White"), (6, c))
+            self.place_piece(create_piece(name, "White"), (7, c))
+        self._set_turn("White")
+        self._set_state(WHITE_KING_SIDE | WHITE_QUEEN_SIDE | BLACK_KING_SIDE | BLACK_QUEEN_SIDE, None)
+
+    @classmethod
+    def from_fen(cls, fen: str):
+        """Board (or subclass) set up from the first four fields of a FEN string."""
+        placement, turn, castling, ep = fen.split()[:4]
+        board = cls()
+        for r, rank in enumerate(placement.split("/")):
+            c = 0
+            for ch in rank:
+                if ch.isdigit():
+                    c += int(ch)
+                    continue
+                board.place_piece(create_piece(FEN_PIECES[ch.lower()], "White" if ch.isupper() else "Black"), (r, c))
+                c += 1
+        board._set_turn("White" if turn == "w" else "Black")
+        board._set_state(sum(FEN_CASTLING[ch] for ch in castling if ch != "-"),
+                         None if ep == "-" else (8 - int(ep[1]), ord(ep[0]) - ord("a")))
+        return board
+
+    # ---- rules ----
+    def is_square_attacked(self, pos: Tuple[int, int], by_color: str) -> bool:
+        """Whether a piece of by_color attacks pos, looking outwards from pos with the strategies."""
+        grid = self.grid
+        for name, attackers in (("Knight", ("Knight",)), ("King", ("King",)),
+                                ("Rook", ("Rook", "Queen")), ("Bishop", ("Bishop", "Queen"))):
+            for r, c in STRATEGIES[name].get_moves(pos, self):
+                piece = grid[r][c]
+                if piece is not None and piece.color == by_color and piece.name in attackers:
+                    return True
+        r = pos[0] + (1 if by_color == "White" else -1)  # row the attacking pawns stand on
+        for c in (pos[1] - 1, pos[1] + 1):
+            if self.is_inside(r, c):
+                piece = grid[r][c]
+                if piece is not None and piece.color == by_color and piece.name == "Pawn":
+                    return True
+        return False
+
+    def in_check(self, color: Optional[str] = None) -> bool:
+        color = color or self.turn
+        king = self.king_square(color)
+        return king is not None and self.is_square_attacked(king, OTHER[color])
+
+    def pseudo_legal_moves(self) -> List[Move]:
+        color, grid = self.turn, self.grid
+        moves = []
+        for src, piece in self.pieces_of(color):
+            pawn = piece.name == "Pawn"
+            for dst in self.generate_moves(piece, src):
+                target = grid[dst[0]][dst[1]]
+                if target is not None and target.color == color:
+                    continue
+                if pawn and dst[0] in (0, 7):
+                    moves += [Move(src, dst, name) for name in PROMOTIONS]
+                else:
+                    moves.append(Move(src, dst))
+            if pawn:
+                step = -1 if color == "White" else 1
+                r, c = src
+                if r == (6 if color == "White" else 1) and grid[r + step][c] is None and grid[r + 2 * step][c] is None:
+                    moves.append(Move(src, (r + 2 * step, c)))
+                if self.ep_square and self.ep_square[0] == r + step and abs(self.ep_square[1] - c) == 1:
+                    moves.append(Move(src, self.ep_square))
+        moves += self._castling_moves(color)
+        return moves
+
+    def _castling_moves(self, color):
+        moves = []
+        for right, (king_from, king_to, _, _, empty) in CASTLING.items():
+            if not self.castling & right or CASTLING_COLOR[right] != color:
+                continue
+            if any(self.grid[r][c] is not None for r, c in empty):
+                continue
+            passing = (king_from[0], (king_from[1] + king_to[1]) // 2)
+            if self.is_square_attacked(king_from, OTHER[color]) or self.is_square_attacked(passing, OTHER[color]):
+                continue
+            moves.append(Move(king_from, king_to))
+        return moves
+
+    def legal_moves(self) -> List[Move]:
+        """Pseudo-legal moves that do not leave the mover's own king in check."""
+        color, them = self.turn, OTHER[self.turn]
+        legal = []
+        for move in self.pseudo_legal_moves():
+            self.make_move(move)
+            king = self.king_square(color)
+            if king is None or not self.is_square_attacked(king, them):
+                legal.append(move)
+            self.unmake_move()
+        return legal
+
+    def make_move(self, move: Move):
+        """Play a move from legal_moves() in place; undo it with unmake_move()."""
+        (r1, c1), (r2, c2), promotion = move
+        piece = self.grid[r1][c1]
+        capture_pos = (r2, c2)
+        if piece.name == "Pawn" and (r2, c2) == self.ep_square:
+            capture_pos = (r1, c2)
+        captured = self._remove(*capture_pos) if self.grid[capture_pos[0]][capture_pos[1]] is not None else None
+        self.history.append((move, piece, captured, capture_pos, self.castling, self.ep_square, self.hash))
+        self._remove(r1, c1)
+        self._put(create_piece(promotion, piece.color) if promotion else piece, r2, c2)
+        if piece.name == "King" and abs(c2 - c1) == 2:  # castling: bring the rook across
+            rook_from, rook_to = ((r1, 7), (r1, 5)) if c2 > c1 else ((r1, 0), (r1, 3))
+            self._put(self._remove(*rook_from), *rook_to)
+        self._set_state(self.castling & ~(CASTLING_LOST.get((r1, c1), 0) | CASTLING_LOST.get((r2, c2), 0)),
+                        ((r1 + r2) // 2, c1) if piece.name == "Pawn" and abs(r2 - r1) == 2 else None)
+        self._set_turn(OTHER[self.turn])
+
+    def unmake_move(self):
+        (move, piece, captured, capture_pos, castling, ep_square, _) = self.history.pop()
+        (r1, c1), (r2, c2), _ = move
+        self._set_turn(OTHER[self.turn])
+        self._set_state(castling, ep_square)
+        if piece.name == "King" and abs(c2 - c1) == 2:
+            rook_from, rook_to = ((r1, 7), (r1, 5)) if c2 > c1 else ((r1, 0), (r1, 3))
+            self._put(self._remove(*rook_to), *rook_from)
+        self._remove(r2, c2)
+        self._put(piece, r1, c1)
+        if captured is not None:
+            self._put(captured, *capture_pos)
+
+    def _set_state(self, castling, ep_square):
+        self.hash ^= ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_CASTLING[castling]
+        if self.ep_square:
+            self.hash ^= ZOBRIST_EP[self.ep_square[1]]
+        if ep_square:
+            self.hash ^= ZOBRIST_EP[ep_square[1]]
+        self.castling = castling
+        self.ep_square = ep_square
+
+    def _set_turn(self, color):
+        if color != self.turn:
+            self.hash ^= ZOBRIST_SIDE
+        self.turn = color
+
+    def compute_hash(self) -> int:
+        """The Zobrist key rebuilt from scratch; always equal to `hash`."""
+        key = ZOBRIST_CASTLING[self.castling] ^ (ZOBRIST_SIDE if self.turn == "Black" else 0)
+        if self.ep_square:
+            key ^= ZOBRIST_EP[self.ep_square[1]]
+        for r, row in enumerate(self.grid):
+            for c, piece in enumerate(row):
+                if piece is not None:
+                    key ^= ZOBRIST_PIECES[piece.color][piece.name][r * 8 + c]
+        return key
+
+    def repetition_count(self) -> int:
+        """How many times the current position has occurred, counting back to the last capture
+        or pawn move (earlier positions cannot recur)."""
+        count = 1
+        for i in range(len(self.history) - 1, -1, -1):
+            _, piece, captured, _, _, _, key = self.history[i]
+            if (len(self.history) - i) % 2 == 0 and key == self.hash:
+                count += 1
+            if captured is not None or piece.name == "Pawn":
+                break
+        return count
 
     def show(self):
         for r in range(8):
@@ -135,6 +399,18 @@ class Board:
         print()
 
 
+def perft(board: Board, depth: int) -> int:
+    """Number of legal move sequences of length `depth`; the last ply is counted, not played."""
+    moves = board.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
 # --- Example Driver ---
 if __name__ == "__main__":
     board = Board()
@@ -159,3 +435,11 @@ if __name__ == "__main__":
     print("Queen moves:", queen.possible_moves((7, 7), board))
     print("Knight moves:", knight.possible_moves((2, 5), board))
     print("Pawn moves:", pawn.possible_moves((6, 3), board))
+
+    # Legal moves with make / unmake
+    game = Board.from_fen(START_FEN)
+    print("Legal moves from the start:", len(game.legal_moves()))
+    game.make_move(Move((6, 4), (4, 4)))  # e4
+    print("Black to move, en passant square:", game.turn, game.ep_square)
+    game.unmake_move()
+    print("perft(3) from the start:", perft(game, 3))
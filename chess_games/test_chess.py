@@ -0,0 +1,144 @@
+import random
+import unittest
+
+from chess_games.bitboard import BitBoard
+from chess_games.main import START_FEN, Board, Move, perft
+from chess_games.transposition import TranspositionTable, cached_perft
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+POSITION_3 = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+
+# known perft node counts, depth 1, 2, 3, ...
+PERFT = [(START_FEN, [20, 400, 8902]), (KIWIPETE, [48, 2039]), (POSITION_3, [14, 191, 2812])]
+
+
+def snapshot(board):
+    return ([[(p.name, p.color) if p else None for p in row] for row in board.grid],
+            board.turn, board.castling, board.ep_square)
+
+
+class TestPerft(unittest.TestCase):
+    def test_bitboard_perft(self):
+        for fen, counts in PERFT:
+            board = BitBoard.from_fen(fen)
+            for depth, expected in enumerate(counts, 1):
+                with self.subTest(fen=fen, depth=depth):
+                    self.assertEqual(perft(board, depth), expected)
+
+    def test_grid_board_perft(self):
+        for fen, counts in PERFT:
+            board = Board.from_fen(fen)
+            for depth, expected in enumerate(counts[:2], 1):
+                with self.subTest(fen=fen, depth=depth):
+                    self.assertEqual(perft(board, depth), expected)
+
+
+class TestMakeUnmake(unittest.TestCase):
+    def test_unmake_restores_every_move(self):
+        for board_class in (Board, BitBoard):
+            board = board_class.from_fen(KIWIPETE)
+            before = snapshot(board)
+            for move in board.legal_moves():
+                board.make_move(move)
+                board.unmake_move()
+                self.assertEqual(snapshot(board), before, move)
+            if board_class is BitBoard:
+                self.assertEqual(board.occupied, BitBoard.from_fen(KIWIPETE).occupied)
+
+    def test_en_passant_and_promotion(self):
+        board = BitBoard.from_fen("4k3/1P6/8/3pP3/8/8/8/4K3 w - d6 0 1")
+        moves = board.legal_moves()
+        self.assertIn(Move((3, 4), (2, 3)), moves)  # exd6 e.p.
+        self.assertEqual(sorted(m.promotion for m in moves if m.src == (1, 1)), ["Bishop", "Knight", "Queen", "Rook"])
+        board.make_move(Move((3, 4), (2, 3)))
+        self.assertIsNone(board.grid[3][3])  # the d5 pawn is gone
+        board.make_move(Move((0, 4), (0, 3)))
+        board.make_move(Move((1, 1), (0, 1), "Queen"))
+        self.assertEqual(board.grid[0][1].name, "Queen")
+        board.unmake_move()
+        self.assertEqual(board.grid[1][1].name, "Pawn")
+
+    def test_no_castling_out_of_or_through_check(self):
+        board = Board.from_fen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        self.assertIn(Move((7, 4), (7, 6)), board.legal_moves())
+        self.assertIn(Move((7, 4), (7, 2)), board.legal_moves())
+        board = Board.from_fen("r3k2r/8/8/8/8/8/5r2/R3K2R w KQkq - 0 1")  # f2 rook covers f1
+        moves = board.legal_moves()
+        self.assertNotIn(Move((7, 4), (7, 6)), moves)
+        self.assertIn(Move((7, 4), (7, 2)), moves)
+        board = Board.from_fen("r3k2r/8/8/8/4r3/8/8/R3K2R w KQkq - 0 1")  # king in check
+        moves = board.legal_moves()
+        self.assertNotIn(Move((7, 4), (7, 6)), moves)
+        self.assertNotIn(Move((7, 4), (7, 2)), moves)
+
+    def test_pinned_piece_and_friendly_targets(self):
+        board = BitBoard.from_fen("4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1")  # bishop pinned on the e-file
+        moves = board.legal_moves()
+        self.assertFalse([m for m in moves if m.src == (6, 4)])
+        self.assertNotIn(Move((7, 4), (6, 4)), moves)  # own bishop's square
+
+
+class TestZobrist(unittest.TestCase):
+    def test_incremental_hash_matches_full_rebuild(self):
+        rng = random.Random(7)
+        for board_class in (Board, BitBoard):
+            board = board_class.from_fen(KIWIPETE)
+            start = board.hash
+            for _ in range(60):
+                moves = board.legal_moves()
+                if not moves:
+                    break
+                board.make_move(rng.choice(moves))
+                self.assertEqual(board.hash, board.compute_hash())
+            while board.history:
+                board.unmake_move()
+            self.assertEqual(board.hash, start)
+        self.assertEqual(Board.from_fen(KIWIPETE).hash, BitBoard.from_fen(KIWIPETE).hash)
+
+    def test_transpositions_share_a_hash_and_side_matters(self):
+        a = BitBoard.from_fen(START_FEN)
+        for move in [Move((7, 6), (5, 5)), Move((0, 6), (2, 5)), Move((7, 1), (5, 2))]:
+            a.make_move(move)
+        b = BitBoard.from_fen(START_FEN)
+        for move in [Move((7, 1), (5, 2)), Move((0, 6), (2, 5)), Move((7, 6), (5, 5))]:
+            b.make_move(move)
+        self.assertEqual(a.hash, b.hash)
+        self.assertNotEqual(Board.from_fen(START_FEN).hash, Board.from_fen(START_FEN.replace(" w ", " b ")).hash)
+
+    def test_threefold_repetition(self):
+        board = Board.from_fen(START_FEN)
+        shuffle = [Move((7, 6), (5, 5)), Move((0, 6), (2, 5)), Move((5, 5), (7, 6)), Move((2, 5), (0, 6))]
+        counts = []
+        for move in shuffle * 2:
+            board.make_move(move)
+            counts.append(board.repetition_count())
+        self.assertEqual(counts, [1, 1, 1, 2, 2, 2, 2, 3])
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_depth_preferred_replacement(self):
+        table = TranspositionTable(size_bits=2)
+        table.store(0b100, 5, "deep")
+        self.assertFalse(table.store(0b1000, 2, "shallow"))  # same slot, shallower: rejected
+        self.assertEqual(table.probe(0b100, 3), (5, "deep"))
+        self.assertIsNone(table.probe(0b100, 6))
+        self.assertTrue(table.store(0b1000, 7, "deeper"))
+        self.assertIsNone(table.probe(0b100))
+        self.assertEqual(table.probe(0b1000), (7, "deeper"))
+
+    def test_cached_perft_with_colliding_slots(self):
+        for size_bits in (4, 16):
+            table = TranspositionTable(size_bits)
+            self.assertEqual(cached_perft(BitBoard.from_fen(START_FEN), 3, table), 8902)
+            self.assertEqual(cached_perft(BitBoard.from_fen(POSITION_3), 3, table), 2812)
+
+    def test_evaluate_never_returns_a_perft_count(self):
+        table = TranspositionTable()
+        board = BitBoard.from_fen(START_FEN)
+        self.assertEqual(cached_perft(board, 3, table), 8902)
+        self.assertEqual(table.evaluate(board, lambda b: 0.5), 0.5)
+        self.assertEqual(cached_perft(board, 3, table), 8902)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+from chess_games.main import Board
+
+EMPTY = -1
+# what a slot's value is, so one kind of result is never served as another
+PERFT, EVALUATION = "perft", "evaluation"
+
+
+class TranspositionTable:
+    """
+    Fixed-size cache of per-position results, indexed by Zobrist hash.
+
+    2**size_bits slots held in parallel lists; a position goes to slot hash & mask and the
+    full 64-bit hash is stored to tell colliding positions apart. Each slot keeps the depth
+    its value was searched to, a value tagged with its kind (PERFT count, EVALUATION, or any
+    caller-defined tag) and the legal move list; a probe only returns values of the kind it
+    asks for. Replacement is depth-preferred: a different position only takes the slot if its
+    depth is at least the stored one, so expensive deep results survive cheap shallow ones;
+    the same position always refreshes its own slot. Memory never grows past the lists
+    allocated up front.
+    """
+    def __init__(self, size_bits=16):
+        size = 1 << size_bits
+        self.mask = size - 1
+        self.keys = [0] * size
+        self.depths = [EMPTY] * size
+        self.values = [None] * size
+        self.kinds = [None] * size
+        self.moves = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key, depth=0, kind=None):
+        """(depth, value) of `kind` stored for key at `depth` or deeper, else None."""
+        slot = key & self.mask
+        if (self.keys[slot] == key and self.depths[slot] >= depth and self.values[slot] is not None
+                and self.kinds[slot] == kind):
+            self.hits += 1
+            return self.depths[slot], self.values[slot]
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value=None, moves=None, kind=None):
+        slot = key & self.mask
+        if self.keys[slot] != key:
+            if self.depths[slot] > depth:
+                return False  # keep the deeper entry
+            self.keys[slot], self.depths[slot], self.values[slot], self.moves[slot] = key, depth, None, None
+        if value is not None and depth >= self.depths[slot]:
+            self.depths[slot], self.values[slot], self.kinds[slot] = depth, value, kind
+        if moves is not None:
+            self.moves[slot] = moves
+        return True
+
+    def legal_moves(self, board: Board):
+        """board.legal_moves(), generated once per position while it stays in the table."""
+        slot = board.hash & self.mask
+        if self.keys[slot] == board.hash and self.moves[slot] is not None:
+            self.hits += 1
+            return self.moves[slot]
+        self.misses += 1
+        moves = board.legal_moves()
+        self.store(board.hash, 0, moves=moves)
+        return moves
+
+    def evaluate(self, board: Board, evaluate):
+        """evaluate(board), cached as a depth-0 EVALUATION value."""
+        cached = self.probe(board.hash, 0, EVALUATION)
+        if cached is not None:
+            return cached[1]
+        value = evaluate(board)
+        self.store(board.hash, 0, value, kind=EVALUATION)
+        return value
+
+    def clear(self):
+        self.__init__(self.mask.bit_length())
+
+
+def cached_perft(board: Board, depth: int, table: TranspositionTable) -> int:
+    """perft() that reuses counts of positions reached by different move orders."""
+    if depth <= 1:
+        return len(table.legal_moves(board)) if depth == 1 else 1
+    cached = table.probe(board.hash, depth, PERFT)
+    if cached is not None and cached[0] == depth:
+        return cached[1]
+    nodes = 0
+    for move in table.legal_moves(board):
+        board.make_move(move)
+        nodes += cached_perft(board, depth - 1, table)
+        board.unmake_move()
+    table.store(board.hash, depth, nodes, kind=PERFT)
+    return nodes
+
+
+if __name__ == "__main__":
+    from chess_games.bitboard import BitBoard
+    from chess_games.main import START_FEN, Move
+
+    board = BitBoard.from_fen(START_FEN)
+    table = TranspositionTable(size_bits=14)
+    print(f"Start position hash: {board.hash:#018x}")
+    print("perft(3) with the table:", cached_perft(board, 3, table), f"(hits {table.hits}, misses {table.misses})")
+
+    # Nf3 Nf6 Ng1 Ng8 twice: the start position comes round a third time
+    for _ in range(2):
+        for src, dst in [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))]:
+            board.make_move(Move(src, dst))
+    print("Back at the start:", board.hash == BitBoard.from_fen(START_FEN).hash,
+          "| occurrences:", board.repetition_count())
@@ -0,0 +1,208 @@
+import datetime
+import threading
+from array import array
+from collections import defaultdict
+
+from parking_lot.strategy_parking import ParkingLotListener
+
+ALL_FLOORS = None
+
+
+class OccupancyAnalytics(ParkingLotListener):
+    """
+    Incremental occupancy statistics, fed by ParkingLot park / un_park events.
+
+    Time is cut into fixed buckets of `bucket_sec` seconds starting at `origin` (by default
+    the hour of the first event). For every floor, and for the whole lot under ALL_FLOORS,
+    it keeps per-bucket:
+      - occupancy integral  vehicle-seconds parked inside the bucket
+      - arrivals            parks that happened inside the bucket
+    plus per-floor dwell histograms (power-of-two second buckets) with count and total.
+
+    An event only touches the buckets between the floor's previous event and now, so
+    recording is O(1) amortized and a range query costs O(1) per bucket in the range.
+    Occupancy is integrated up to the latest event; call advance() to close the open
+    interval (e.g. from a periodic reporter) before querying "up to now".
+    Arrays come from the array module; NumPy is not a dependency of this repo.
+    """
+    def __init__(self, bucket_sec=300, origin: datetime.datetime = None):
+        if 3600 % bucket_sec:
+            raise ValueError("bucket_sec must divide an hour")
+        self.bucket_sec = bucket_sec
+        self.origin = origin
+        self.integral = defaultdict(lambda: array("d"))  # floor -> vehicle-seconds per bucket
+        self.arrivals = defaultdict(lambda: array("L"))  # floor -> parks per bucket
+        self.occupied = defaultdict(int)  # floor -> vehicles parked right now
+        self.last_event = {}  # floor -> seconds since origin of the last integrated instant
+        self.dwell_histogram = defaultdict(lambda: defaultdict(int))  # floor -> {log2 bucket: count}
+        self.dwell_count = defaultdict(int)
+        self.dwell_total = defaultdict(float)
+        self._lock = threading.Lock()
+
+    # ---- listener hooks ----
+    def on_park(self, ticket, spot):
+        self.record_park(spot.floor, ticket.entry_time)
+
+    def on_un_park(self, ticket, spot):
+        self.record_un_park(spot.floor, ticket.entry_time, ticket.exit_time)
+
+    # ---- recording ----
+    def _seconds(self, at):
+        if self.origin is None:
+            self.origin = at.replace(minute=0, second=0, microsecond=0)
+        return (at - self.origin).total_seconds()
+
+    @staticmethod
+    def _grow(column, bucket):
+        if bucket >= len(column):
+            column.extend([0] * (bucket + 1 - len(column)))
+
+    def _integrate(self, floor, t):
+        """Add floor's occupancy from its last event up to t (seconds) into the buckets."""
+        last = self.last_event.get(floor, t)
+        occupied = self.occupied[floor]
+        if t <= last:  # late or first event: never integrate backwards
+            self.last_event[floor] = max(last, t)
+            return
+        self.last_event[floor] = t
+        if not occupied:
+            return
+        column = self.integral[floor]
+        size = self.bucket_sec
+        last = max(last, 0.0)  # time before the origin has no bucket, as in record_park
+        bucket = int(last // size)
+        self._grow(column, int(t // size))
+        while last < t:
+            end = min(t, (bucket + 1) * size)
+            column[bucket] += occupied * (end - last)
+            last = end
+            bucket += 1
+
+    def _change(self, floor, t, delta):
+        for key in (floor, ALL_FLOORS):
+            self._integrate(key, t)
+            self.occupied[key] += delta
+
+    def record_park(self, floor, at: datetime.datetime):
+        with self._lock:
+            t = self._seconds(at)
+            self._change(floor, t, 1)
+            bucket = max(0, int(t // self.bucket_sec))
+            for key in (floor, ALL_FLOORS):
+                column = self.arrivals[key]
+                self._grow(column, bucket)
+                column[bucket] += 1
+
+    def record_un_park(self, floor, entry_time: datetime.datetime, exit_time: datetime.datetime):
+        with self._lock:
+            self._change(floor, self._seconds(exit_time), -1)
+            dwell = max(0.0, (exit_time - entry_time).total_seconds())
+            for key in (floor, ALL_FLOORS):
+                self.dwell_histogram[key][int(dwell).bit_length()] += 1
+                self.dwell_count[key] += 1
+                self.dwell_total[key] += dwell
+
+    def advance(self, at: datetime.datetime):
+        """Integrate every floor's current occupancy up to `at`."""
+        with self._lock:
+            t = self._seconds(at)
+            for floor in list(self.occupied):
+                self._integrate(floor, t)
+
+    # ---- queries ----
+    def _bucket_range(self, start, end, column):
+        first = 0 if start is None else max(0, int(self._seconds(start) // self.bucket_sec))
+        last = len(column) if end is None else int(-(-self._seconds(end) // self.bucket_sec))
+        return first, last
+
+    def bucket_start(self, bucket):
+        return self.origin + datetime.timedelta(seconds=bucket * self.bucket_sec)
+
+    def occupancy_over_time(self, start=None, end=None, floor=ALL_FLOORS):
+        """[(bucket start, average vehicles parked during the bucket)] for buckets overlapping [start, end)."""
+        if self.origin is None:
+            return []
+        with self._lock:
+            column = self.integral[floor]
+            first, last = self._bucket_range(start, end, self.integral[ALL_FLOORS])
+            return [(self.bucket_start(b), (column[b] if b < len(column) else 0.0) / self.bucket_sec)
+                    for b in range(first, last)]
+
+    def average_occupancy(self, start=None, end=None, floor=ALL_FLOORS):
+        series = self.occupancy_over_time(start, end, floor)
+        return sum(avg for _, avg in series) / len(series) if series else 0.0
+
+    def arrivals_between(self, start=None, end=None, floor=ALL_FLOORS):
+        if self.origin is None:
+            return 0
+        with self._lock:
+            column = self.arrivals[floor]
+            first, last = self._bucket_range(start, end, column)
+            return sum(column[first:min(last, len(column))])
+
+    def average_dwell(self, floor=ALL_FLOORS):
+        """Mean dwell in seconds of the vehicles that have left."""
+        count = self.dwell_count.get(floor, 0)
+        return self.dwell_total[floor] / count if count else 0.0
+
+    def dwell_distribution(self, floor=ALL_FLOORS):
+        """{upper bound in seconds: departures} - bucket b counts dwells in [2**(b-1), 2**b) seconds."""
+        with self._lock:
+            return {1 << b: c for b, c in sorted(self.dwell_histogram[floor].items())}
+
+    def peak_hour(self, start=None, end=None, floor=ALL_FLOORS):
+        """(hour of day, average vehicles parked) for the busiest hour of day within [start, end)."""
+        series = self.occupancy_over_time(start, end, floor)
+        if not series:
+            return None, 0.0
+        totals, buckets = defaultdict(float), defaultdict(int)
+        for bucket_start, avg in series:
+            totals[bucket_start.hour] += avg
+            buckets[bucket_start.hour] += 1
+        hour = max(totals, key=lambda h: (totals[h] / buckets[h], -h))
+        return hour, totals[hour] / buckets[hour]
+
+
+if __name__ == "__main__":
+    import random
+
+    from parking_lot.strategy_parking import ParkingLot
+
+    # live: the lot feeds analytics through its listener hooks
+    layout = [[["2-1", "4-1"] * 10 for _ in range(5)] for _ in range(3)]  # 3 floors, 300 spots
+    lot = ParkingLot(layout)
+    live = OccupancyAnalytics(bucket_sec=60)
+    lot.add_listener(live)
+    tickets = [lot.park(2 if i % 2 == 0 else 4, f"KA01{i:04d}") for i in range(50)]
+    for ticket in tickets[:20]:
+        lot.un_park(ticket_id=ticket["ticketId"])
+    print("Live arrivals:", live.arrivals_between(), "departures:", live.dwell_count[ALL_FLOORS])
+
+    # a simulated day, recorded directly with simulated timestamps
+    rng = random.Random(7)
+    day = datetime.datetime(2024, 1, 1)
+    analytics = OccupancyAnalytics(bucket_sec=900, origin=day)
+    parked = []
+    for minute in range(24 * 60):
+        now = day + datetime.timedelta(minutes=minute)
+        rush = 8 <= now.hour < 10 or 17 <= now.hour < 19
+        for _ in range(rng.randint(2, 6) if rush else rng.randint(0, 1)):
+            floor = rng.randrange(3)
+            parked.append((floor, now))
+            analytics.record_park(floor, now)
+        staying = []
+        for floor, entry in parked:
+            if rng.random() < 0.02:
+                analytics.record_un_park(floor, entry, now)
+            else:
+                staying.append((floor, entry))
+        parked = staying
+    analytics.advance(day + datetime.timedelta(days=1))
+
+    print("Average occupancy:", round(analytics.average_occupancy(), 1))
+    print("Occupancy 08:00-10:00:",
+          round(analytics.average_occupancy(day.replace(hour=8), day.replace(hour=10)), 1))
+    print("Arrivals 17:00-19:00:", analytics.arrivals_between(day.replace(hour=17), day.replace(hour=19)))
+    print("Average dwell floor 0 (min):", round(analytics.average_dwell(0) / 60, 1))
+    print("Dwell distribution:", analytics.dwell_distribution())
+    print("Peak hour:", analytics.peak_hour())
@@ -0,0 +1,322 @@
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from parking_lot.analytics import OccupancyAnalytics
+from parking_lot.compact_parking import CompactParkingLot
+from parking_lot.concurrent_parking import ConcurrentParkingLot
+from parking_lot.federation import ParkingFederation
+from parking_lot import simple
+from parking_lot.scan_baselines import ScanMostFreeFloorStrategy, ScanNearestStrategy, ScanSimpleParkingLot
+from parking_lot.snapshot import load_layout, restore_snapshot, save_layout, save_snapshot
+from parking_lot.ticket_archive import TicketArchive
+from parking_lot.strategy_parking import ParkingLot, NearestStrategy, MostFreeFloorStrategy
+
+
+def make_layout(floors=50, rows=40, cols=50):
+    """floors * rows * cols spots (100k by default), alternating 2- and 4-wheeler columns."""
+    row = [("2-1" if c % 2 == 0 else "4-1") for c in range(cols)]
+    return [[list(row) for _ in range(rows)] for _ in range(floors)]
+
+
+def benchmark_fill(occupancy=0.99, tail=500):
+    """
+    Fill a 50-floor, 100k-spot lot to `occupancy` with the indexed strategies, then time
+    `tail` more parks at that occupancy for both the index and the original scans.
+    """
+    layout = make_layout()
+    total = sum(len(row) for floor in layout for row in floor)
+    target = int(total * occupancy)
+    print(f"\n=== Fill {total} spots to {occupancy:.0%} ===")
+
+    for name, strategy, baseline in (("Nearest", NearestStrategy(), ScanNearestStrategy()),
+                                     ("MostFreeFloor", MostFreeFloorStrategy(), ScanMostFreeFloorStrategy())):
+        lot = ParkingLot(layout)
+        start = time.perf_counter()
+        for i in range(target - tail):
+            lot.park(2 if i % 2 == 0 else 4, f"V{i}", strategy=strategy)
+        fill_sec = time.perf_counter() - start
+
+        timings = {}
+        for label, s in (("indexed", strategy), ("scan", baseline)):
+            parked = []
+            start = time.perf_counter()
+            for i in range(tail):
+                ticket = lot.park(2 if i % 2 == 0 else 4, f"T{label}{i}", strategy=s)
+                parked.append(ticket["ticketId"])
+            timings[label] = (time.perf_counter() - start) / tail
+            for ticket_id in parked:  # back to the same occupancy for the next run
+                lot.un_park(ticket_id=ticket_id)
+
+        print(f"{name:<14} fill: {(target - tail) / fill_sec:>9,.0f} parks/s   park at {occupancy:.0%}: "
+              f"indexed {timings['indexed'] * 1e6:>8.1f} us   scan {timings['scan'] * 1e6:>8.1f} us")
+
+
+def benchmark_memory(occupancy=0.5):
+    """Per-spot memory of ParkingLot vs CompactParkingLot on the 100k-spot layout."""
+    layout = make_layout()
+    total = sum(len(row) for floor in layout for row in floor)
+    print(f"\n=== Memory per spot ({total} spots, {occupancy:.0%} occupied) ===")
+    for cls in (ParkingLot, CompactParkingLot):
+        tracemalloc.start()
+        start = time.perf_counter()
+        lot = cls(layout)
+        build_sec = time.perf_counter() - start
+        empty, _ = tracemalloc.get_traced_memory()
+        for i in range(int(total * occupancy)):
+            lot.park(2 if i % 2 == 0 else 4, f"V{i}")
+        occupied, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line = (f"{cls.__name__:<18} build: {build_sec:>6.2f} s   empty: {empty / total:>6.1f} B/spot   "
+                f"occupied (incl. tickets): {occupied / total:>6.1f} B/spot")
+        if isinstance(lot, CompactParkingLot):
+            line += f"   columns: {lot.bytes_per_spot():.1f} B/spot"
+        print(line)
+
+
+def check_consistency(lot, parks, un_parks):
+    """
+    Problems found in `lot` after `parks` successful parks and `un_parks` successful un_parks:
+    spots held by two tickets, spots whose vehicle does not match their ticket, and free
+    counts that disagree with the spots themselves.
+    """
+    problems = []
+    live = list(lot.search_manager.by_ticket.values())
+    by_spot = {}
+    for ticket in live:
+        if ticket.get_spot_id() in by_spot:
+            problems.append(f"double-booked {ticket.get_spot_id()}")
+        by_spot[ticket.get_spot_id()] = ticket
+        if lot.parking_spots[ticket.get_spot_id()].vehicle_number != ticket.get_vehicle_number():
+            problems.append(f"spot {ticket.get_spot_id()} does not hold {ticket.get_vehicle_number()}")
+    occupied = sum(1 for spot in lot.iter_spots_frc() if spot.vehicle_number is not None)
+    if not occupied == len(live) == parks - un_parks:
+        problems.append(f"occupied={occupied} live tickets={len(live)} parks-un_parks={parks - un_parks}")
+    for floor_id in lot.floor_spots:
+        for vehicle_type in (2, 4):
+            actual = sum(1 for spot in lot.iter_floor_spots(floor_id)
+                         if spot.is_parking_available() and spot.vehicle_type == vehicle_type)
+            if actual != lot.floor_free_count[floor_id][vehicle_type] \
+                    or actual != lot.free_index.free_count[floor_id, vehicle_type]:
+                problems.append(f"free count mismatch on floor {floor_id} for {vehicle_type}W")
+    return problems
+
+
+def _gate_terminal(lot, worker, ops, strategy):
+    """One terminal: park until its share of the lot is taken, un_park a random half, repeat."""
+    rng = random.Random(worker)
+    held, parks, un_parks = [], 0, 0
+    for i in range(ops):
+        if held and (rng.random() < 0.5 or len(held) > 200):
+            ticket_id = held.pop(rng.randrange(len(held)))
+            un_parks += lot.un_park(ticket_id=ticket_id) == 201
+        else:
+            ticket = lot.park(2 if i % 2 == 0 else 4, f"W{worker}-{i}", strategy=strategy)
+            if ticket:
+                held.append(ticket["ticketId"])
+                parks += 1
+    return parks, un_parks
+
+
+def benchmark_concurrent(workers=(1, 2, 4, 8), ops=5_000):
+    """
+    Thread-pool stress: `workers` gate terminals share a 10-floor, 2000-spot lot and mix
+    parks and un_parks. Reports throughput and checks the lot for double-booking afterwards.
+    The plain ParkingLot runs the same load as a reference for the cost of the locks.
+    """
+    layout = make_layout(floors=10, rows=10, cols=20)
+    print(f"\n=== Concurrent park/un_park ({ops} ops per worker) ===")
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads aggressively to surface races
+    try:
+        for cls in (ConcurrentParkingLot, ParkingLot):
+            for strategy in (NearestStrategy(), MostFreeFloorStrategy()):
+                for n in workers:
+                    lot = cls(layout)
+                    start = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=n) as pool:
+                        results = list(pool.map(lambda w: _gate_terminal(lot, w, ops, strategy), range(n)))
+                    elapsed = time.perf_counter() - start
+                    parks = sum(p for p, _ in results)
+                    un_parks = sum(u for _, u in results)
+                    problems = check_consistency(lot, parks, un_parks)
+                    print(f"{cls.__name__:<21} {type(strategy).__name__:<22} workers={n}: "
+                          f"{n * ops / elapsed:>9,.0f} ops/s   "
+                          f"{'consistent' if not problems else f'{len(problems)} problems, e.g. {problems[0]}'}")
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+def benchmark_archive(cycles=100_000, open_tickets=1_000):
+    """
+    Park/un_park churn with and without a TicketArchive: memory still held after `cycles`
+    closed tickets, churn throughput, and lookup time for an archived ticket.
+    """
+    layout = make_layout(floors=5, rows=10, cols=40)
+    print(f"\n=== Ticket history after {cycles} closed tickets ({open_tickets} open) ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, archive in (("in memory", None), ("archived", TicketArchive(os.path.join(tmp, "tickets.jsonl")))):
+            lot = ParkingLot(layout, archive=archive)
+            held = [lot.park(2, f"OPEN{i}")["ticketId"] for i in range(open_tickets)]
+            tracemalloc.start()
+            start = time.perf_counter()
+            for i in range(cycles):
+                ticket = lot.park(4, f"V{i}")
+                lot.un_park(ticket_id=ticket["ticketId"])
+            churn_sec = time.perf_counter() - start
+            retained, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            queries = [f"V{i}" for i in range(0, cycles, cycles // 1000)]
+            start = time.perf_counter()
+            found = sum(1 for q in queries if lot.search(q))
+            search_us = (time.perf_counter() - start) / len(queries) * 1e6
+            line = (f"{label:<10} retained: {retained / 2**20:>7.1f} MiB   tickets in memory: {len(lot.tickets):>7}   "
+                    f"churn: {cycles / churn_sec:>8,.0f} cycles/s   closed-ticket search: {search_us:>6.1f} us "
+                    f"({found}/{len(queries)} found)")
+            if archive is not None:
+                line += f"   archive file: {archive.size_on_disk() / 2**20:.1f} MiB"
+            print(line)
+            assert len(held) == open_tickets
+            lot.close()
+
+
+def benchmark_snapshot(occupancy=0.5):
+    """Startup time on the 100k-spot layout: parse nested lists vs load the compiled file / a snapshot."""
+    layout = make_layout()
+    total = sum(len(row) for floor in layout for row in floor)
+    print(f"\n=== Startup ({total} spots) ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lot.snap")
+        for cls in (ParkingLot, CompactParkingLot):
+            start = time.perf_counter()
+            cls(layout)
+            print(f"parse nested lists ({cls.__name__}): {(time.perf_counter() - start) * 1e3:>8.1f} ms")
+
+        save_layout(layout, path)
+        start = time.perf_counter()
+        lot = load_layout(path)
+        lot.park(2, "FIRST")  # first park loads one floor's position heaps
+        print(f"load compiled layout + first park:        {(time.perf_counter() - start) * 1e3:>8.1f} ms")
+
+        for i in range(int(total * occupancy)):
+            lot.park(2 if i % 2 == 0 else 4, f"V{i}")
+        start = time.perf_counter()
+        save_snapshot(lot, path)
+        save_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        restored = restore_snapshot(path)
+        restore_ms = (time.perf_counter() - start) * 1e3
+        assert len(restored.search_manager.by_ticket) == len(lot.search_manager.by_ticket)
+        print(f"snapshot at {occupancy:.0%}: save {save_ms:>8.1f} ms   restore {restore_ms:>8.1f} ms   "
+              f"({len(lot.search_manager.by_ticket)} open tickets, {os.path.getsize(path) / 2**20:.1f} MiB)")
+
+
+def benchmark_analytics(cycles=50_000, days=30):
+    """Cost of feeding OccupancyAnalytics from the listener hooks, and of range queries over it."""
+    layout = make_layout(floors=5, rows=10, cols=40)
+    print("\n=== Occupancy analytics ===")
+    for label, listen in (("no listener", False), ("analytics", True)):
+        lot = ParkingLot(layout)
+        if listen:
+            lot.add_listener(OccupancyAnalytics())
+        start = time.perf_counter()
+        for i in range(cycles):
+            ticket = lot.park(2 if i % 2 == 0 else 4, f"V{i}")
+            lot.un_park(ticket_id=ticket["ticketId"])
+        print(f"{label:<12} churn: {cycles / (time.perf_counter() - start):>9,.0f} park+un_park/s")
+
+    # `days` of simulated traffic in 5-minute buckets, then query it
+    analytics = OccupancyAnalytics(bucket_sec=300)
+    rng = random.Random(0)
+    origin = datetime.datetime(2024, 1, 1)
+    parked = []
+    for minute in range(days * 24 * 60):
+        now = origin + datetime.timedelta(minutes=minute)
+        floor = rng.randrange(5)
+        analytics.record_park(floor, now)
+        parked.append((floor, now))
+        if len(parked) > 500:
+            floor, entry = parked.pop(rng.randrange(len(parked)))
+            analytics.record_un_park(floor, entry, now)
+    week = (origin + datetime.timedelta(days=7), origin + datetime.timedelta(days=14))
+    for label, query in (("occupancy_over_time, 1 week", lambda: analytics.occupancy_over_time(*week)),
+                         ("average_occupancy, whole range", lambda: analytics.average_occupancy()),
+                         ("peak_hour, 1 week, floor 2", lambda: analytics.peak_hour(*week, floor=2))):
+        start = time.perf_counter()
+        for _ in range(20):
+            query()
+        print(f"{label:<32} {(time.perf_counter() - start) / 20 * 1e3:>7.2f} ms")
+
+
+def benchmark_simple(occupancy=0.9, cycles=2_000):
+    """simple.ParkingLot on 10k spots: free-spot heaps vs the original scan, at `occupancy`."""
+    layout = make_layout(floors=10, rows=20, cols=50)
+    total = sum(len(row) for floor in layout for row in floor)
+    print(f"\n=== simple.ParkingLot, {total} spots at {occupancy:.0%} ===")
+    for label, cls in (("free-spot heaps", simple.ParkingLot), ("scan", ScanSimpleParkingLot)):
+        lot = cls(layout)
+        start = time.perf_counter()
+        for i in range(int(total * occupancy)):
+            lot.park(2 if i % 2 == 0 else 4, f"V{i}")
+        fill_sec = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(cycles):
+            ticket = lot.park(2 if i % 2 == 0 else 4, f"C{i}")
+            lot.un_park(ticket_id=ticket["ticketId"])
+        churn_sec = time.perf_counter() - start
+        print(f"{label:<17} fill: {int(total * occupancy) / fill_sec:>9,.0f} parks/s   "
+              f"park+un_park at {occupancy:.0%}: {cycles / churn_sec:>9,.0f} /s   "
+              f"index entries: {len(lot.search_manager.by_ticket)}")
+
+
+def scan_best_lot(lots, vehicle_type):
+    """The per-lot polling the federation replaces: sum get_free_spots_count over every floor of every lot."""
+    for lot_id, lot in lots:
+        if sum(lot.get_free_spots_count(floor, vehicle_type) for floor in lot.floor_spots) > 0:
+            return lot_id
+    return None
+
+
+def benchmark_federation(lot_count=50, workers=(1, 8), parks=20_000):
+    """
+    `lot_count` lots of 1000 spots (5 floors each): best-lot lookups against polling every
+    lot, and park_many throughput on thread pools of different sizes.
+    """
+    layout = make_layout(floors=5, rows=10, cols=20)
+    print(f"\n=== Federation of {lot_count} lots ===")
+    for n in workers:
+        federation = ParkingFederation(max_workers=n)
+        for i in range(lot_count):
+            federation.add_lot(f"lot-{i}", ParkingLot(layout), distance=i)
+        start = time.perf_counter()
+        tickets = federation.park_many([(2 if i % 2 == 0 else 4, f"V{i}") for i in range(parks)])
+        elapsed = time.perf_counter() - start
+        assert sum(1 for t in tickets if t) == parks
+        print(f"park_many workers={n}: {parks / elapsed:>9,.0f} parks/s")
+
+    # lots fill nearest-first, so after `parks` the first lots are full and polling has to walk past them
+    lots = list(federation.lots.items())
+    for label, lookup in (("federation best_lot", lambda: federation.best_lot(4)),
+                          ("poll get_free_spots_count", lambda: scan_best_lot(lots, 4))):
+        assert lookup() == federation.best_lot(4)
+        start = time.perf_counter()
+        for _ in range(1_000):
+            lookup()
+        print(f"{label:<26} {(time.perf_counter() - start) / 1_000 * 1e6:>9.1f} us")
+
+
+if __name__ == "__main__":
+    benchmark_fill()
+    benchmark_memory()
+    benchmark_concurrent()
+    benchmark_archive()
+    benchmark_snapshot()
+    benchmark_analytics()
+    benchmark_simple()
+    benchmark_federation()
@@ -0,0 +1,265 @@
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+from parking_lot.strategy_parking import ParkingLot
+
+EMPTY = -1
+CELL_ACTIVE = 0x80  # compiled cell byte: vehicle type in the low bits, can_park in the top bit
+
+_CELL_TYPE = bytes(b & 0x7F for b in range(256))
+_CELL_ACTIVE = bytes(b >> 7 for b in range(256))
+
+
+# ------------------ Spot Ids ------------------
+
+def encode_spot_id(floor, row, column):
+    """Integer spot id: floor in the high bits, then 16 bits of row and 16 bits of column."""
+    return (floor << 32) | (row << 16) | column
+
+
+def decode_spot_id(spot_id):
+    return spot_id >> 32, (spot_id >> 16) & 0xFFFF, spot_id & 0xFFFF
+
+
+# ------------------ Compiled Layout ------------------
+
+class CompiledLayout:
+    """
+    Pre-parsed floor_list: one cell byte per spot in floor -> row -> column order and
+    the row lengths of every floor. Built once by compile_layout (or read back from a
+    snapshot file) so CompactParkingLot never has to split "type-canPark" strings.
+    """
+    __slots__ = ("cells", "floor_rows")
+
+    def __init__(self, cells, floor_rows):
+        self.cells = cells  # bytes-like, vehicle_type | CELL_ACTIVE
+        self.floor_rows = floor_rows  # floor -> [row length]
+
+
+def compile_layout(floor_list):
+    cells = bytearray()
+    floor_rows = []
+    for fl in floor_list:
+        floor_rows.append([len(fr) for fr in fl])
+        for fr in fl:
+            for fc in fr:
+                vehicle_type_str, can_park_str = fc.split('-')
+                cells.append(int(vehicle_type_str) | (CELL_ACTIVE if int(can_park_str) else 0))
+    return CompiledLayout(cells, floor_rows)
+
+
+# ------------------ Thin Views ------------------
+
+class SpotView:
+    """ParkingSpot-compatible view over one slot of a CompactParkingLot's columns."""
+    __slots__ = ("lot", "floor", "row", "column", "index")
+
+    def __init__(self, lot, floor, row, column, index):
+        self.lot = lot
+        self.floor = floor
+        self.row = row
+        self.column = column
+        self.index = index
+
+    @property
+    def vehicle_type(self):
+        return self.lot.types[self.index]
+
+    @property
+    def can_park(self):
+        return bool(self.lot.active[self.index])
+
+    @property
+    def vehicle_number(self):
+        slot = self.lot.occupants[self.index]
+        return None if slot == EMPTY else self.lot.vehicle_numbers[slot]
+
+    def is_parking_available(self):
+        return self.lot.active[self.index] and self.lot.occupants[self.index] == EMPTY
+
+    def remove_parking(self):
+        self.lot.active[self.index] = 1
+        self.lot.release_occupant(self.index)
+
+    def get_spot_id(self):
+        return encode_spot_id(self.floor, self.row, self.column)
+
+    def park(self, vehicle_type, vehicle_number):
+        if self.is_parking_available() and self.vehicle_type == vehicle_type:
+            self.lot.active[self.index] = 0
+            self.lot.assign_occupant(self.index, vehicle_number)
+            return True
+        return False
+
+    def display(self):
+        print("--------------SPOT DISPLAY-------------------")
+        print(f"spotId:                  {self.get_spot_id()}")
+        print(f"FloorNumber:             {self.floor}")
+        print(f"RowNumber:               {self.row}")
+        print(f"ColumnNumber:            {self.column}")
+        print(f"VehicleType:             {self.vehicle_type}")
+        print(f"canParkVehicle:          {self.can_park}")
+        print(f"parkedVehicleNumber:     {self.vehicle_number}")
+
+
+class _FloorView(Sequence):
+    """floor_spots[floor] replacement: row-major sequence of SpotViews built on demand."""
+    def __init__(self, lot, floor):
+        self.lot = lot
+        self.floor = floor
+
+    def __len__(self):
+        return self.lot.floor_size(self.floor)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        return self.lot.spot_at(self.floor, pos)
+
+
+class _SpotMapping(Mapping):
+    """parking_spots replacement: integer spot id -> SpotView."""
+    def __init__(self, lot):
+        self.lot = lot
+
+    def __getitem__(self, spot_id):
+        floor, row, column = decode_spot_id(spot_id)
+        try:
+            offsets = self.lot.row_offsets[floor]
+            if row >= len(offsets) or column >= self.lot.row_length(floor, row):
+                raise KeyError(spot_id)
+        except (IndexError, TypeError):
+            raise KeyError(spot_id)
+        return self.lot.spot_at(floor, offsets[row] + column)
+
+    def __iter__(self):
+        for floor in range(len(self.lot.row_offsets)):
+            for row in range(len(self.lot.row_offsets[floor])):
+                for column in range(self.lot.row_length(floor, row)):
+                    yield encode_spot_id(floor, row, column)
+
+    def __len__(self):
+        return len(self.lot.types)
+
+
+# ------------------ Compact Parking Lot ------------------
+
+class CompactParkingLot(ParkingLot):
+    """
+    ParkingLot that keeps spots in parallel columns instead of one ParkingSpot object each:
+      types      bytearray  vehicle type per spot
+      active     bytearray  1 when the spot can take a vehicle (the can_park flag)
+      occupants  array('i') slot in vehicle_numbers, or -1 when empty
+    Spots are addressed by integer ids (see encode_spot_id); parking_spots and floor_spots
+    are thin views, so strategies, tickets and search work unchanged.
+
+    floor_list may also be a CompiledLayout, in which case the columns are filled with
+    whole-buffer copies instead of parsing strings (see parking_lot.snapshot).
+    """
+    def _configure(self, floor_list):
+        layout = floor_list if isinstance(floor_list, CompiledLayout) else compile_layout(floor_list)
+        cells = layout.cells
+        self.types = bytearray(cells).translate(_CELL_TYPE)
+        self.active = bytearray(cells).translate(_CELL_ACTIVE)
+        self.occupants = array("i", [EMPTY]) * len(self.types)
+        self.vehicle_numbers = []  # occupant slot -> vehicle number
+        self._free_slots = []
+        self.floor_base = []  # floor -> global index of the floor's first spot
+        self.row_offsets = []  # floor -> [row-major position of each row's first spot]
+
+        base = 0
+        for f, row_lengths in enumerate(layout.floor_rows):
+            self.floor_base.append(base)
+            offsets, pos = [], 0
+            for length in row_lengths:
+                offsets.append(pos)
+                pos += length
+            self.row_offsets.append(offsets)
+            for vehicle_type in (2, 4):
+                count = cells.count(bytes([vehicle_type | CELL_ACTIVE]), base, base + pos)
+                if count:
+                    self.floor_free_count[f][vehicle_type] = count
+            base += pos
+
+        self.parking_spots = _SpotMapping(self)
+        self.floor_spots = {f: _FloorView(self, f) for f in range(len(self.floor_base))}
+
+    # ---- column helpers ----
+    def floor_size(self, floor):
+        end = self.floor_base[floor + 1] if floor + 1 < len(self.floor_base) else len(self.types)
+        return end - self.floor_base[floor]
+
+    def row_length(self, floor, row):
+        offsets = self.row_offsets[floor]
+        end = offsets[row + 1] if row + 1 < len(offsets) else self.floor_size(floor)
+        return end - offsets[row]
+
+    def spot_at(self, floor, pos):
+        offsets = self.row_offsets[floor]
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:  # last row whose first position is <= pos
+            mid = (lo + hi + 1) // 2
+            if offsets[mid] <= pos:
+                lo = mid
+            else:
+                hi = mid - 1
+        return SpotView(self, floor, lo, pos - offsets[lo], self.floor_base[floor] + pos)
+
+    def assign_occupant(self, index, vehicle_number):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self.vehicle_numbers[slot] = vehicle_number
+        else:
+            slot = len(self.vehicle_numbers)
+            self.vehicle_numbers.append(vehicle_number)
+        self.occupants[index] = slot
+
+    def release_occupant(self, index):
+        slot = self.occupants[index]
+        if slot != EMPTY:
+            self.vehicle_numbers[slot] = None
+            self._free_slots.append(slot)
+            self.occupants[index] = EMPTY
+
+    def iter_free_positions(self, floor_id):
+        base, types, active, occupants = self.floor_base[floor_id], self.types, self.active, self.occupants
+        for pos in range(self.floor_size(floor_id)):
+            i = base + pos
+            if active[i] and occupants[i] == EMPTY:
+                yield pos, types[i]
+
+    def bytes_per_spot(self):
+        """Memory held per spot by the columns and layout tables (occupant strings excluded)."""
+        spots = max(1, len(self.types))
+        size = (sys.getsizeof(self.types) + sys.getsizeof(self.active) + sys.getsizeof(self.occupants)
+                + sys.getsizeof(self.floor_base) + sys.getsizeof(self.row_offsets)
+                + sum(sys.getsizeof(offsets) for offsets in self.row_offsets))
+        return size / spots
+
+
+if __name__ == "__main__":
+    layout = [
+        [
+            ["2-1", "4-1", "2-1", "2-0"],
+            ["2-1", "4-1", "2-1", "4-1"]
+        ],
+        [
+            ["4-1", "2-1", "4-1", "2-1"],
+            ["4-1", "4-1", "2-1", "2-1"]
+        ]
+    ]
+
+    lot = CompactParkingLot(layout)
+    t1 = lot.park(2, "KA01AA1111")
+    t2 = lot.park(4, "KA01BB2222")
+    print("Park result:", t1)
+    print("Spot of t2:", decode_spot_id(t2["spotId"]))
+    print("Search by spot:", lot.search(t2["spotId"]))
+    print("Un-park status:", lot.un_park(spot_id=t1["spotId"]))
+    print("Free 2W on floor 0:", lot.get_free_spots_count(0, 2))
+    print(f"Bytes per spot: {lot.bytes_per_spot():.1f}")
@@ -0,0 +1,164 @@
+import heapq
+import threading
+
+from parking_lot.strategy_parking import FreeSpotIndex, NearestStrategy, ParkingLot, ParkingStrategy, Ticket
+
+
+# ------------------ Locked Free Spot Index ------------------
+
+class ConcurrentFreeSpotIndex(FreeSpotIndex):
+    """
+    FreeSpotIndex safe for concurrent callers.
+
+    - floor_locks[floor]: guards that floor's position heaps and free counts, and the
+      spots on it; ConcurrentParkingLot claims and releases spots under the same lock
+    - heap_lock: guards the cross-floor heaps (floors, most_free)
+
+    Lock order is always floor lock -> heap_lock, never the reverse, so a lookup
+    that walks the floor heap drops heap_lock before it inspects a floor.
+    """
+    def __init__(self, parking_lot):
+        super().__init__(parking_lot)
+        self.floor_locks = {}
+        self.heap_lock = threading.Lock()
+
+    def build(self):
+        # one lock per floor, created up front so threads never race to create them
+        self.floor_locks = {floor_id: threading.RLock() for floor_id in self.lot.floor_spots.keys()}
+        super().build()
+
+    def occupy(self, spot):
+        with self.floor_locks[spot.floor]:
+            self.free_count[spot.floor, spot.vehicle_type] -= 1
+            with self.heap_lock:
+                self._push_count(spot.vehicle_type, spot.floor)
+
+    def release(self, spot):
+        key = (spot.floor, spot.vehicle_type)
+        with self.floor_locks[spot.floor]:
+            self._queue_position(key, self.lot.position_of(spot))
+            self.free_count[key] += 1
+            with self.heap_lock:
+                if self.free_count[key] == 1:
+                    self._queue_floor(spot.vehicle_type, spot.floor)
+                self._push_count(spot.vehicle_type, spot.floor)
+
+    def first_free_on_floor(self, floor_id, vehicle_type):
+        with self.floor_locks[floor_id]:
+            return super().first_free_on_floor(floor_id, vehicle_type)
+
+    def nearest(self, vehicle_type):
+        while True:
+            with self.heap_lock:
+                heap = self.floors.get(vehicle_type)
+                if not heap:
+                    return None
+                floor_id = heap[0]
+            spot = self.first_free_on_floor(floor_id, vehicle_type)
+            if spot is not None:
+                return spot
+            with self.heap_lock:
+                # release() re-queues the floor after raising its count, so popping at zero is safe
+                if heap and heap[0] == floor_id and self.free_count[floor_id, vehicle_type] == 0:
+                    self.queued_floors[vehicle_type].discard(heapq.heappop(heap))
+
+    def most_free_floor(self, vehicle_type):
+        with self.heap_lock:
+            return super().most_free_floor(vehicle_type)
+
+
+# ------------------ Concurrent Parking Lot ------------------
+
+class ConcurrentParkingLot(ParkingLot):
+    """
+    ParkingLot for many gate terminals sharing one lot.
+
+    park() is optimistic: the strategy picks a spot without holding any floor lock,
+    then the spot is claimed under its floor's lock. If another terminal got there
+    first, spot.park() fails and the search is retried. Spot state, floor_free_count
+    and the index for a floor only change under that floor's lock, so parks and
+    un_parks on different floors do not wait on each other. Tickets and the
+    SearchManager sit behind their own lock. Listeners are called outside every lock,
+    from whichever thread parked or un_parked, so they must do their own locking.
+    """
+    free_index_class = ConcurrentFreeSpotIndex
+
+    def __init__(self, floor_list, max_retries=64, archive=None):
+        self.max_retries = max_retries
+        self.search_lock = threading.Lock()
+        super().__init__(floor_list, archive=archive)
+
+    def floor_lock(self, floor_id):
+        return self.free_index.floor_locks[floor_id]
+
+    def park(self, vehicle_type, vehicle_number, ticket_id=None, strategy: ParkingStrategy = None):
+        if strategy is None:
+            strategy = NearestStrategy()
+
+        for _ in range(self.max_retries):
+            spot = strategy.find_spot(self, vehicle_type)
+            if not spot:
+                return None
+            with self.floor_lock(spot.floor):
+                claimed = spot.park(vehicle_type, vehicle_number)
+                if claimed:
+                    self.floor_free_count[spot.floor][vehicle_type] -= 1
+                    self.free_index.occupy(spot)
+            if claimed:
+                ticket = Ticket(vehicle_number, vehicle_type, spot.get_spot_id(), ticket_id)
+                with self.search_lock:
+                    self.tickets.append(ticket)
+                    self.search_manager.index(ticket)
+                for listener in self.listeners:
+                    listener.on_park(ticket, spot)
+                return ticket.printer()
+        return None
+
+    def un_park(self, ticket_id=None, spot_id=None, vehicle_number=None):
+        try:
+            with self.search_lock:
+                if ticket_id:
+                    ticket = self.search_manager.ticket_search(ticket_id)
+                elif vehicle_number:
+                    ticket = self.search_manager.vehicle_search(vehicle_number)
+                elif spot_id is not None:
+                    ticket = self.search_manager.spot_search(spot_id)
+                else:
+                    raise AttributeError("Search Not supported")
+
+                if not ticket:
+                    return 404
+                # un-indexing first makes the ticket ours: a racing un_park now gets 404
+                self.search_manager.un_index(ticket)
+
+            spot = self.parking_spots[ticket.get_spot_id()]
+            with self.floor_lock(spot.floor):
+                spot.remove_parking()
+                self.floor_free_count[spot.floor][spot.vehicle_type] += 1
+                self.free_index.release(spot)
+            with self.search_lock:
+                self._close_ticket(ticket)
+            for listener in self.listeners:
+                listener.on_un_park(ticket, spot)
+            return 201
+        except KeyError:
+            return 404
+
+    def search(self, query):
+        with self.search_lock:
+            return super().search(query)
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    layout = [[["2-1", "4-1"] * 4 for _ in range(2)] for _ in range(4)]  # 4 floors, 64 spots
+    lot = ConcurrentParkingLot(layout)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        tickets = list(pool.map(lambda i: lot.park(2 if i % 2 == 0 else 4, f"KA01{i:04d}"), range(40)))
+
+    parked = [t for t in tickets if t]
+    print("Parked:", len(parked), "Turned away:", len(tickets) - len(parked))
+    print("Distinct spots:", len({t["spotId"] for t in parked}))
+    print("Free 2W on floor 0:", lot.get_free_spots_count(0, 2))
@@ -0,0 +1,134 @@
+import heapq
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from parking_lot.strategy_parking import ParkingLotListener
+
+
+class _LotCapacity(ParkingLotListener):
+    """Forwards one lot's park / un_park events to the federation's capacity index."""
+    def __init__(self, federation, lot_id):
+        self.federation = federation
+        self.lot_id = lot_id
+
+    def on_park(self, ticket, spot):
+        self.federation._capacity_changed(self.lot_id, spot.vehicle_type, -1)
+
+    def on_un_park(self, ticket, spot):
+        self.federation._capacity_changed(self.lot_id, spot.vehicle_type, 1)
+
+
+class ParkingFederation:
+    """
+    Routes vehicles across many ParkingLots.
+
+    - free[(lot_id, vehicle_type)]: free spots in that lot, kept current by listener hooks
+      on every lot, so parks and un_parks made directly on a lot are seen too
+    - nearest[vehicle_type]: min-heap of (distance, lot_id) for lots that may have space
+    - queued[vehicle_type]: lot ids currently in that heap
+
+    As in FreeSpotIndex, heap entries are invalidated lazily: a lot is pushed when its count
+    goes 0 -> 1 unless it is still queued, and dropped when it reaches the top with no
+    space, so each heap holds at most one entry per lot and best_lot() is
+    amortized O(log lots). Each lot has its own lock, so parks routed to different lots
+    run in parallel (see park_many).
+    """
+    def __init__(self, max_workers=8):
+        self.lots = {}
+        self.distance = {}
+        self.lot_locks = {}
+        self.free = defaultdict(int)
+        self.nearest = defaultdict(list)
+        self.queued = defaultdict(set)
+        self._index_lock = threading.Lock()
+        self.max_workers = max_workers
+
+    def add_lot(self, lot_id, lot, distance=None):
+        """Register `lot` before it takes traffic; lots are ranked by `distance` (default: registration order)."""
+        if lot_id in self.lots:
+            raise ValueError(f"lot {lot_id} already registered")
+        self.lots[lot_id] = lot
+        self.distance[lot_id] = len(self.lots) if distance is None else distance
+        self.lot_locks[lot_id] = threading.Lock()
+        totals = defaultdict(int)
+        for counts in lot.floor_free_count.values():
+            for vehicle_type, count in counts.items():
+                totals[vehicle_type] += count
+        with self._index_lock:
+            for vehicle_type, count in totals.items():
+                self.free[lot_id, vehicle_type] = count
+                if count > 0:
+                    self._queue(vehicle_type, lot_id)
+        lot.add_listener(_LotCapacity(self, lot_id))
+
+    def _capacity_changed(self, lot_id, vehicle_type, delta):
+        with self._index_lock:
+            key = (lot_id, vehicle_type)
+            self.free[key] += delta
+            if delta > 0 and self.free[key] == 1:
+                self._queue(vehicle_type, lot_id)
+
+    def _queue(self, vehicle_type, lot_id):
+        """Push lot_id onto the vehicle type's heap unless it is already there. Caller holds _index_lock."""
+        queued = self.queued[vehicle_type]
+        if lot_id not in queued:
+            queued.add(lot_id)
+            heapq.heappush(self.nearest[vehicle_type], (self.distance[lot_id], lot_id))
+
+    def best_lot(self, vehicle_type):
+        """Nearest lot with a free spot for vehicle_type, or None."""
+        with self._index_lock:
+            heap = self.nearest.get(vehicle_type)
+            while heap:
+                _, lot_id = heap[0]
+                if self.free[lot_id, vehicle_type] > 0:
+                    return lot_id
+                self.queued[vehicle_type].discard(heapq.heappop(heap)[1])
+            return None
+
+    def free_capacity(self, vehicle_type):
+        """{lot_id: free spots} for vehicle_type across the federation."""
+        with self._index_lock:
+            return {lot_id: count for (lot_id, vt), count in self.free.items() if vt == vehicle_type}
+
+    def park(self, vehicle_type, vehicle_number, ticket_id=None, strategy=None):
+        """Park in the nearest lot with space; returns the ticket dict with its "lotId", or None."""
+        for _ in range(len(self.lots)):
+            lot_id = self.best_lot(vehicle_type)
+            if lot_id is None:
+                return None
+            with self.lot_locks[lot_id]:
+                ticket = self.lots[lot_id].park(vehicle_type, vehicle_number, ticket_id, strategy)
+            if ticket:
+                ticket["lotId"] = lot_id
+                return ticket
+            # the lot filled up between best_lot() and park(); its count is 0 now, so retry
+        return None
+
+    def un_park(self, lot_id, ticket_id=None, spot_id=None, vehicle_number=None):
+        with self.lot_locks[lot_id]:
+            return self.lots[lot_id].un_park(ticket_id=ticket_id, spot_id=spot_id, vehicle_number=vehicle_number)
+
+    def park_many(self, requests):
+        """Park [(vehicle_type, vehicle_number), ...] on a thread pool; results in request order."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda request: self.park(*request), requests))
+
+
+if __name__ == "__main__":
+    from parking_lot.strategy_parking import ParkingLot
+
+    federation = ParkingFederation()
+    small = [[["2-1", "4-1"]]]  # one 2W and one 4W spot
+    federation.add_lot("mall", ParkingLot(small), distance=1.5)
+    federation.add_lot("airport", ParkingLot(small * 2), distance=12.0)
+    federation.add_lot("station", ParkingLot(small), distance=4.0)
+
+    print("Best lot for 4W:", federation.best_lot(4))
+    tickets = federation.park_many([(4, f"KA01{i:04d}") for i in range(5)])
+    print("Parked 4W in:", [t["lotId"] if t else None for t in tickets])
+    print("Best lot for 4W now:", federation.best_lot(4))
+    print("Un-park:", federation.un_park("mall", ticket_id=tickets[0]["ticketId"]))
+    print("Best lot for 4W after un-park:", federation.best_lot(4))
+    print("Free 2W capacity:", federation.free_capacity(2))
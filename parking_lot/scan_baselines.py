@@ -0,0 +1,38 @@
+from parking_lot import simple
+from parking_lot.strategy_parking import ParkingStrategy
+
+
+class ScanNearestStrategy(ParkingStrategy):
+    """The original linear-scan nearest search, the reference for the free-spot index."""
+    def find_spot(self, parking_lot, vehicle_type):
+        for spot in parking_lot.iter_spots_frc():
+            if spot.is_parking_available() and spot.vehicle_type == vehicle_type:
+                return spot
+        return None
+
+
+class ScanMostFreeFloorStrategy(ParkingStrategy):
+    """The original most-free-floor search: scan every floor count, then scan the floor."""
+    def find_spot(self, parking_lot, vehicle_type):
+        best_floor, best_count = None, -1
+        for floor_id in parking_lot.floor_spots.keys():
+            cnt = parking_lot.floor_free_count[floor_id][vehicle_type]
+            if cnt > best_count:
+                best_floor, best_count = floor_id, cnt
+        if best_floor is None or best_count <= 0:
+            return None
+        for spot in parking_lot.iter_floor_spots(best_floor):
+            if spot.is_parking_available() and spot.vehicle_type == vehicle_type:
+                return spot
+        return None
+
+
+class ScanSimpleParkingLot(simple.ParkingLot):
+    """simple.ParkingLot with its original park: try every spot in dict order."""
+    def park(self, vehicle_type, vehicle_number, ticket_id=None):
+        for _, spot in self.parking_spots.items():
+            if spot.park(vehicle_type, vehicle_number):
+                ticket = simple.Ticket(vehicle_number, vehicle_type, spot.get_spot_id(), ticket_id)
+                self.tickets.append(ticket)
+                self.search_manager.index(ticket)
+                return ticket.printer()
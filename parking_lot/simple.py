@@ -1,5 +1,7 @@
 import datetime
+import heapq
 import uuid
+from collections import defaultdict
 
 
 class ParkingSpot:
@@ -8,7 +10,7 @@ class ParkingSpot:
         self.floor = floor
         self.row = row
         self.column = column
-        self.vehicle_type = vehicle_type
+        self.vehicle_type = int(vehicle_type)  # 2 or 4
         self.vehicle_number = vehicle_number
         self.can_park = can_park
 
@@ -96,15 +98,24 @@ class SearchManager:
         self.by_spot[ticket.get_spot_id()] = ticket
 
     def un_index(self, ticket):
-        self.by_ticket[ticket.get_ticket_id()] = None
-        self.by_vehicle_number[ticket.get_vehicle_number()] = None
-        self.by_spot[ticket.get_spot_id()] = None
+        self.by_ticket.pop(ticket.get_ticket_id(), None)
+        self.by_vehicle_number.pop(ticket.get_vehicle_number(), None)
+        self.by_spot.pop(ticket.get_spot_id(), None)
 
 
 class ParkingLot:
+    """
+    free_spots[vehicle_type] is a min-heap of the floor -> row -> column ordinals of the free
+    spots of that type: park pops the smallest and un_park pushes the spot back, both in
+    O(log spots), so park always takes the first free spot in floor -> row -> column order,
+    the same one the old linear scan found.
+    """
 
     def __init__(self, floor_list):
         self.parking_spots = {}
+        self.spots_in_order = []  # ordinal -> ParkingSpot, floor -> row -> column
+        self.ordinals = {}  # spot_id -> ordinal
+        self.free_spots = defaultdict(list)  # vehicle_type -> heap of free spot ordinals
         self.tickets = []
         self.search_manager = SearchManager()
         self._configure(floor_list)
@@ -113,20 +124,28 @@ class ParkingLot:
         for f, fl in enumerate(floor_list):
             for r, fr in enumerate(fl):
                 for c, fc in enumerate(fr):
-                    if fc == "4-0":
-                        print("ooo")
                     vehicle_type, can_park = fc.split('-')
                     can_park = bool(int(can_park))
                     parking_spot = ParkingSpot(f, r, c, vehicle_type, can_park)
-                    self.parking_spots[parking_spot.get_spot_id()] = parking_spot
+                    spot_id = parking_spot.get_spot_id()
+                    ordinal = self.ordinals[spot_id] = len(self.spots_in_order)
+                    self.parking_spots[spot_id] = parking_spot
+                    self.spots_in_order.append(parking_spot)
+                    if can_park:
+                        # ordinals are appended in increasing order, so each list is already a heap
+                        self.free_spots[parking_spot.vehicle_type].append(ordinal)
 
     def park(self, vehicle_type, vehicle_number, ticket_id=None):
-        for _, spot in self.parking_spots.items():
-            if spot.park(vehicle_type, vehicle_number):
-                ticket = Ticket(vehicle_number, vehicle_type, spot.get_spot_id(), ticket_id)
-                self.tickets.append(ticket)
-                self.search_manager.index(ticket)
-                return ticket.printer()
+        vehicle_type = int(vehicle_type)
+        heap = self.free_spots.get(vehicle_type)
+        if not heap:
+            return None
+        spot = self.spots_in_order[heapq.heappop(heap)]
+        spot.park(vehicle_type, vehicle_number)
+        ticket = Ticket(vehicle_number, vehicle_type, spot.get_spot_id(), ticket_id)
+        self.tickets.append(ticket)
+        self.search_manager.index(ticket)
+        return ticket.printer()
 
     def un_park(self, ticket_id=None, spot_id=None, vehicle_number=None):
         try:
@@ -141,6 +160,7 @@ class ParkingLot:
             spot_id = ticket.get_spot_id()
             spot = self.parking_spots[spot_id]
             spot.remove_parking()
+            heapq.heappush(self.free_spots[spot.vehicle_type], self.ordinals[spot_id])
             self.search_manager.un_index(ticket)
             return 201
         except KeyError:
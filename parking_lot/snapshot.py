@@ -0,0 +1,171 @@
+import datetime
+import json
+import mmap
+import struct
+from array import array
+
+from parking_lot.compact_parking import (
+    EMPTY, CELL_ACTIVE, CompactParkingLot, CompiledLayout, compile_layout, decode_spot_id, encode_spot_id,
+)
+from parking_lot.strategy_parking import ParkingLot, Ticket
+
+_ACTIVE_BIT = bytes(CELL_ACTIVE if b else 0 for b in range(256))
+_CELL_STRINGS = [f"{b & ~CELL_ACTIVE}-{1 if b & CELL_ACTIVE else 0}" for b in range(256)]
+
+# ------------------ File Format ------------------
+#
+#   header      MAGIC, floors, total rows, spots                (little endian)
+#   floor rows  uint32 per floor: number of rows
+#   row lengths uint16 per row
+#   cells       one byte per spot: vehicle_type | CELL_ACTIVE   (see compile_layout)
+#   occupancy   uint32 length + JSON {"vehicles": [[spot index, number]],
+#                                     "tickets": [[id, number, type, floor, row, column, entry time]],
+#                                     "compact": saved from a CompactParkingLot}
+#
+# The fixed-size sections are read straight out of an mmap, so loading costs a few
+# buffer copies rather than parsing one string per spot.
+
+MAGIC = b"PLSNAP01"
+_HEADER = struct.Struct("<8sIII")
+_LENGTH = struct.Struct("<I")
+
+
+def _write(path, layout, occupancy):
+    floor_rows = array("I", [len(rows) for rows in layout.floor_rows])
+    row_lengths = array("H", [length for rows in layout.floor_rows for length in rows])
+    blob = json.dumps(occupancy, separators=(",", ":")).encode()
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(floor_rows), len(row_lengths), len(layout.cells)))
+        f.write(floor_rows.tobytes())
+        f.write(row_lengths.tobytes())
+        f.write(layout.cells)
+        f.write(_LENGTH.pack(len(blob)))
+        f.write(blob)
+
+
+def _read(path):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, floors, rows, spots = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a parking lot snapshot")
+        pos = _HEADER.size
+        floor_rows = array("I")
+        floor_rows.frombytes(mm[pos:pos + 4 * floors])
+        pos += 4 * floors
+        row_lengths = array("H")
+        row_lengths.frombytes(mm[pos:pos + 2 * rows])
+        pos += 2 * rows
+        cells = mm[pos:pos + spots]
+        pos += spots
+        (length,) = _LENGTH.unpack_from(mm, pos)
+        occupancy = json.loads(mm[pos + _LENGTH.size:pos + _LENGTH.size + length])
+
+    nested, start = [], 0
+    for count in floor_rows:
+        nested.append(row_lengths[start:start + count].tolist())
+        start += count
+    return CompiledLayout(cells, nested), occupancy
+
+
+# ------------------ API ------------------
+
+def save_layout(floor_list, path):
+    """Compile a "type-canPark" floor_list once and store it for fast startup."""
+    layout = floor_list if isinstance(floor_list, CompiledLayout) else compile_layout(floor_list)
+    _write(path, layout, {"vehicles": [], "tickets": []})
+
+
+def load_layout(path):
+    """Empty CompactParkingLot from a file written by save_layout (or a snapshot's layout)."""
+    layout, _ = _read(path)
+    return CompactParkingLot(layout)
+
+
+def _compact_cells(lot):
+    # types | active << 7 for the whole lot at once, via big-int OR instead of a per-spot loop
+    n = len(lot.types)
+    combined = int.from_bytes(lot.types, "little") | int.from_bytes(lot.active.translate(_ACTIVE_BIT), "little")
+    cells = combined.to_bytes(n, "little")
+    vehicles = [[i, lot.vehicle_numbers[slot]] for i, slot in enumerate(lot.occupants) if slot != EMPTY]
+    floor_rows = [[lot.row_length(f, r) for r in range(len(offsets))] for f, offsets in enumerate(lot.row_offsets)]
+    return cells, floor_rows, vehicles
+
+
+def _object_cells(lot):
+    cells = bytearray()
+    floor_rows, vehicles = [], []
+    for floor_id in sorted(lot.floor_spots.keys()):
+        rows = []
+        for spot in lot.iter_floor_spots(floor_id):
+            if spot.column == 0:
+                rows.append(0)
+            rows[-1] += 1
+            if spot.vehicle_number is not None:
+                vehicles.append([len(cells), spot.vehicle_number])
+            cells.append(spot.vehicle_type | (CELL_ACTIVE if spot.can_park else 0))
+        floor_rows.append(rows)
+    return cells, floor_rows, vehicles
+
+
+def save_snapshot(lot, path):
+    """
+    Layout plus live occupancy and open tickets of `lot` (a ParkingLot or CompactParkingLot).
+    Tickets record their spot as (floor, row, column), so a snapshot of either kind can be
+    restored into either kind; spot ids are re-encoded for the lot they are restored into.
+    """
+    compact = isinstance(lot, CompactParkingLot)
+    cells, floor_rows, vehicles = _compact_cells(lot) if compact else _object_cells(lot)
+    tickets = []
+    for ticket in lot.search_manager.by_ticket.values():
+        if compact:
+            location = decode_spot_id(ticket.get_spot_id())
+        else:
+            spot = lot.parking_spots[ticket.get_spot_id()]
+            location = (spot.floor, spot.row, spot.column)
+        tickets.append([ticket.ticket_id, ticket.vehicle_number, ticket.vehicle_type, *location,
+                        ticket.entry_time.isoformat()])
+    _write(path, CompiledLayout(cells, floor_rows), {"vehicles": vehicles, "tickets": tickets, "compact": compact})
+
+
+def _layout_strings(layout):
+    """The "type-canPark" floor_list a CompiledLayout was compiled from."""
+    cells, floor_list, start = bytes(layout.cells), [], 0
+    for row_lengths in layout.floor_rows:
+        floor = []
+        for length in row_lengths:
+            floor.append([_CELL_STRINGS[b] for b in cells[start:start + length]])
+            start += length
+        floor_list.append(floor)
+    return floor_list
+
+
+def restore_snapshot(path, archive=None, lot_class=None):
+    """
+    Lot serving the occupancy and open tickets stored by save_snapshot. It is a `lot_class`
+    (any ParkingLot subclass taking floor_list and archive), by default the kind that was
+    saved: CompactParkingLot for a compact lot, else ParkingLot, so ticket spot ids match
+    the ones handed out before the snapshot.
+    """
+    layout, occupancy = _read(path)
+    if lot_class is None:
+        lot_class = CompactParkingLot if occupancy.get("compact", True) else ParkingLot
+    # occupied spots were saved with can_park cleared, so the free counts and FreeSpotIndex
+    # built from the layout already account for them
+    if issubclass(lot_class, CompactParkingLot):
+        lot = lot_class(layout, archive=archive)
+        for index, vehicle_number in occupancy["vehicles"]:
+            lot.assign_occupant(index, vehicle_number)
+        spot_id = encode_spot_id
+    else:
+        lot = lot_class(_layout_strings(layout), archive=archive)
+        spots = list(lot.iter_spots_frc())
+        for index, vehicle_number in occupancy["vehicles"]:
+            spots[index].vehicle_number = vehicle_number
+        spot_id = "{}-{}-{}".format
+    fromisoformat = datetime.datetime.fromisoformat
+    for ticket_id, vehicle_number, vehicle_type, floor, row, column, entry_time in occupancy["tickets"]:
+        ticket = Ticket(vehicle_number, vehicle_type, spot_id(floor, row, column), ticket_id)
+        ticket.entry_time = fromisoformat(entry_time)
+        lot.tickets.append(ticket)
+        lot.search_manager.index(ticket)
+    return lot
@@ -1,4 +1,5 @@
 import datetime
+import heapq
 import uuid
 from abc import ABC, abstractmethod
 from collections import defaultdict
@@ -74,6 +75,21 @@ class Ticket:
             "exitTime": self.exit_time
         }
 
+    def to_record(self):
+        """JSON-safe form of printer(), used by TicketArchive."""
+        record = self.printer()
+        record["entryTime"] = self.entry_time.isoformat()
+        record["exitTime"] = self.exit_time.isoformat() if self.exit_time else None
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        ticket = cls(record["vehicleNumber"], record["vehicleType"], record["spotId"], record["ticketId"])
+        ticket.entry_time = datetime.datetime.fromisoformat(record["entryTime"])
+        if record["exitTime"]:
+            ticket.exit_time = datetime.datetime.fromisoformat(record["exitTime"])
+        return ticket
+
 
 class SearchManager:
     def __init__(self):
@@ -101,6 +117,143 @@ class SearchManager:
         self.by_spot.pop(ticket.get_spot_id(), None)
 
 
+# ------------------ Listeners ------------------
+
+class ParkingLotListener:
+    """Receives park / un_park events from a ParkingLot (see ParkingLot.add_listener)."""
+    def on_park(self, ticket, spot):
+        pass
+
+    def on_un_park(self, ticket, spot):
+        pass
+
+
+# ------------------ Free Spot Index ------------------
+
+class FreeSpotIndex:
+    """
+    Incremental free-spot index, updated by ParkingLot.park / un_park.
+
+    - free[(floor, vehicle_type)]: min-heap of row-major positions on that floor
+    - floors[vehicle_type]: min-heap of floors that may still have a free spot
+    - most_free[vehicle_type]: heap of (-free_count, floor) entries
+
+    Heaps are invalidated lazily: a popped entry is checked against the spot / count it
+    describes and skipped if stale, so park and un_park are O(log n) and a lookup is
+    amortized O(log n). queued / queued_floors mirror what free / floors hold, so release
+    never pushes a position or floor that is still in its heap and the heaps stay bounded
+    by the number of spots / floors however often spots are reused.
+
+    build() only needs the lot's floor_free_count; a floor's position heaps are filled
+    from its spots the first time that floor is searched, so a freshly loaded lot
+    serves its first park without scanning every spot.
+    """
+    def __init__(self, parking_lot):
+        self.lot = parking_lot
+        self.free = {}
+        self.queued = {}  # (floor, vehicle_type) -> set of positions in free[key]
+        self.free_count = defaultdict(int)  # (floor, vehicle_type) -> free spots
+        self.floors = defaultdict(list)
+        self.queued_floors = defaultdict(set)  # vehicle_type -> floors in floors[vehicle_type]
+        self.most_free = defaultdict(list)
+        self.floor_ids = set()
+
+    def build(self):
+        self.free.clear()
+        self.queued.clear()
+        self.free_count.clear()
+        self.floors.clear()
+        self.queued_floors.clear()
+        self.most_free.clear()
+        self.floor_ids = set(self.lot.floor_spots.keys())
+        for floor_id in self.floor_ids:
+            for vehicle_type, count in self.lot.floor_free_count[floor_id].items():
+                if count:
+                    self.free_count[floor_id, vehicle_type] = count
+        for (floor_id, vehicle_type), count in self.free_count.items():
+            self.floors[vehicle_type].append(floor_id)
+            self.queued_floors[vehicle_type].add(floor_id)
+            self.most_free[vehicle_type].append((-count, floor_id))
+        for heap in list(self.floors.values()) + list(self.most_free.values()):
+            heapq.heapify(heap)
+
+    def occupy(self, spot):
+        key = (spot.floor, spot.vehicle_type)
+        self.free_count[key] -= 1
+        self._push_count(spot.vehicle_type, spot.floor)
+
+    def release(self, spot):
+        key = (spot.floor, spot.vehicle_type)
+        self._queue_position(key, self.lot.position_of(spot))
+        self.free_count[key] += 1
+        if self.free_count[key] == 1:
+            self._queue_floor(spot.vehicle_type, spot.floor)
+        self._push_count(spot.vehicle_type, spot.floor)
+
+    def _queue_position(self, key, pos):
+        queued = self.queued.get(key)
+        # an unloaded floor picks the spot up when it is loaded; a queued one still has it
+        if queued is not None and pos not in queued:
+            queued.add(pos)
+            heapq.heappush(self.free[key], pos)
+
+    def _queue_floor(self, vehicle_type, floor_id):
+        queued = self.queued_floors[vehicle_type]
+        if floor_id not in queued:
+            queued.add(floor_id)
+            heapq.heappush(self.floors[vehicle_type], floor_id)
+
+    def _push_count(self, vehicle_type, floor_id):
+        heap = self.most_free[vehicle_type]
+        heapq.heappush(heap, (-self.free_count[floor_id, vehicle_type], floor_id))
+        if len(heap) > 4 * len(self.floor_ids) + 16:
+            heap[:] = [(-self.free_count[f, vehicle_type], f) for f in self.floor_ids]
+            heapq.heapify(heap)
+
+    def _load_floor(self, floor_id, vehicle_type):
+        positions = defaultdict(list)
+        for pos, free_type in self.lot.iter_free_positions(floor_id):
+            positions[free_type].append(pos)
+        # positions come in ascending order, so every list is already a valid heap
+        for free_type in set(positions) | {vehicle_type}:
+            if (floor_id, free_type) not in self.free:
+                self.free[floor_id, free_type] = positions[free_type]
+                self.queued[floor_id, free_type] = set(positions[free_type])
+        return self.free[floor_id, vehicle_type]
+
+    def first_free_on_floor(self, floor_id, vehicle_type):
+        heap = self.free.get((floor_id, vehicle_type))
+        if heap is None:
+            heap = self._load_floor(floor_id, vehicle_type)
+        queued = self.queued[floor_id, vehicle_type]
+        spots = self.lot.floor_spots[floor_id]
+        while heap:
+            spot = spots[heap[0]]
+            if spot.is_parking_available():
+                return spot
+            queued.discard(heapq.heappop(heap))
+        return None
+
+    def nearest(self, vehicle_type):
+        heap = self.floors.get(vehicle_type)
+        while heap:
+            spot = self.first_free_on_floor(heap[0], vehicle_type)
+            if spot is not None:
+                return spot
+            self.queued_floors[vehicle_type].discard(heapq.heappop(heap))
+        return None
+
+    def most_free_floor(self, vehicle_type):
+        """(floor, free_count) with the most free spots, lower floor on ties."""
+        heap = self.most_free.get(vehicle_type)
+        while heap:
+            neg_count, floor_id = heap[0]
+            if -neg_count == self.free_count[floor_id, vehicle_type]:
+                return floor_id, -neg_count
+            heapq.heappop(heap)
+        return None, 0
+
+
 # ------------------ Strategy Pattern ------------------
 
 class ParkingStrategy(ABC):
@@ -113,13 +266,10 @@ class ParkingStrategy(ABC):
 class NearestStrategy(ParkingStrategy):
     """
     Pick the first valid spot in floor -> row -> column order.
-    Uses the lot's insertion order (configured FRC), and checks type & availability.
+    Answered from the lot's FreeSpotIndex: lowest floor with a free spot, then its lowest position.
     """
     def find_spot(self, parking_lot, vehicle_type):
-        for spot in parking_lot.iter_spots_frc():
-            if spot.is_parking_available() and spot.vehicle_type == vehicle_type:
-                return spot
-        return None
+        return parking_lot.free_index.nearest(vehicle_type)
 
 
 class MostFreeFloorStrategy(ParkingStrategy):
@@ -129,20 +279,10 @@ class MostFreeFloorStrategy(ParkingStrategy):
     Then pick the nearest (row-major) spot on that floor.
     """
     def find_spot(self, parking_lot, vehicle_type):
-        best_floor = None
-        best_count = -1
-        for floor_id in parking_lot.floor_spots.keys():
-            cnt = parking_lot.floor_free_count[floor_id][vehicle_type]
-            if cnt > best_count or (cnt == best_count and (best_floor is None or floor_id < best_floor)):
-                best_floor, best_count = floor_id, cnt
-
+        best_floor, best_count = parking_lot.free_index.most_free_floor(vehicle_type)
         if best_floor is None or best_count <= 0:
             return None
-
-        for spot in parking_lot.iter_floor_spots(best_floor):
-            if spot.is_parking_available() and spot.vehicle_type == vehicle_type:
-                return spot
-        return None
+        return parking_lot.free_index.first_free_on_floor(best_floor, vehicle_type)
 
 
 # ------------------ Parking Lot ------------------
@@ -153,18 +293,30 @@ class ParkingLot:
       3D list of strings "vehicleType-canPark" e.g. "4-1", "2-0"
       - vehicleType in {"2","4"}
       - canPark in {"0","1"}  (0 => inactive/blocked; 1 => available initially)
+
+    archive: optional TicketArchive. Without one, tickets keeps every ticket ever issued;
+    with one, closed tickets are streamed to the archive and tickets only holds open
+    tickets plus those closed since the last archive batch.
     """
-    def __init__(self, floor_list):
+    free_index_class = FreeSpotIndex
+
+    def __init__(self, floor_list, archive=None):
+        self.archive = archive
         self.parking_spots = {}  # spot_id -> ParkingSpot
         self.floor_spots = defaultdict(list)  # floor_id -> [ParkingSpot in row-major]
         self.tickets = []
         self.search_manager = SearchManager()
         self.floor_free_count = defaultdict(lambda: defaultdict(int))  # floor -> {2: count, 4: count}
+        self.row_offsets = defaultdict(list)  # floor -> row-major position of each row's first spot
+        self.free_index = self.free_index_class(self)
+        self.listeners = []
         self._configure(floor_list)
+        self.free_index.build()
 
     def _configure(self, floor_list):
         for f, fl in enumerate(floor_list):
             for r, fr in enumerate(fl):
+                self.row_offsets[f].append(len(self.floor_spots[f]))
                 for c, fc in enumerate(fr):
                     vehicle_type_str, can_park_str = fc.split('-')
                     vehicle_type = int(vehicle_type_str)
@@ -188,7 +340,20 @@ class ParkingLot:
         for spot in self.floor_spots[floor_id]:
             yield spot
 
+    def iter_free_positions(self, floor_id):
+        """(position, vehicle_type) of every spot on floor_id that is free right now, in row-major order."""
+        for pos, spot in enumerate(self.floor_spots[floor_id]):
+            if spot.is_parking_available():
+                yield pos, spot.vehicle_type
+
+    def position_of(self, spot):
+        """Row-major position of spot within floor_spots[spot.floor]."""
+        return self.row_offsets[spot.floor][spot.row] + spot.column
+
     # ---- API ----
+    def add_listener(self, listener: ParkingLotListener):
+        self.listeners.append(listener)
+
     def park(self, vehicle_type, vehicle_number, ticket_id=None, strategy: ParkingStrategy = None):
         if strategy is None:
             strategy = NearestStrategy()
@@ -198,12 +363,15 @@ class ParkingLot:
             return None
 
         if spot.park(vehicle_type, vehicle_number):
-            # update free count
+            # update free count and index
             self.floor_free_count[spot.floor][vehicle_type] -= 1
+            self.free_index.occupy(spot)
             # create and index ticket
             ticket = Ticket(vehicle_number, vehicle_type, spot.get_spot_id(), ticket_id)
             self.tickets.append(ticket)
             self.search_manager.index(ticket)
+            for listener in self.listeners:
+                listener.on_park(ticket, spot)
             return ticket.printer()
         return None
 
@@ -213,7 +381,7 @@ class ParkingLot:
                 ticket = self.search_manager.ticket_search(ticket_id)
             elif vehicle_number:
                 ticket = self.search_manager.vehicle_search(vehicle_number)
-            elif spot_id:
+            elif spot_id is not None:
                 ticket = self.search_manager.spot_search(spot_id)
             else:
                 raise AttributeError("Search Not supported")
@@ -225,21 +393,41 @@ class ParkingLot:
             spot = self.parking_spots[sid]
             spot.remove_parking()
             self.floor_free_count[spot.floor][spot.vehicle_type] += 1
+            self.free_index.release(spot)
             self.search_manager.un_index(ticket)
-            ticket.set_exit_time()
+            self._close_ticket(ticket)
+            for listener in self.listeners:
+                listener.on_un_park(ticket, spot)
             return 201
         except KeyError:
             return 404
 
+    def _close_ticket(self, ticket):
+        ticket.set_exit_time()
+        if self.archive is not None and self.archive.append(ticket):
+            # a batch just reached disk: drop closed tickets from memory
+            self.tickets = [t for t in self.tickets if t.exit_time is None]
+
     def search(self, query):
         """
         Search by ticketId OR vehicleNumber OR spotId.
+        Open tickets are answered from memory, closed ones from the archive (if any).
         Returns ticket dict or None.
         """
         t = (self.search_manager.ticket_search(query)
              or self.search_manager.vehicle_search(query)
              or self.search_manager.spot_search(query))
-        return t.printer() if t else None
+        if t:
+            return t.printer()
+        if self.archive is not None:
+            record = self.archive.search(query)
+            if record:
+                return Ticket.from_record(record).printer()
+        return None
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
 
     def get_free_spots_count(self, floor, vehicle_type):
         return self.floor_free_count[floor][vehicle_type]
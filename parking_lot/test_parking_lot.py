@@ -0,0 +1,295 @@
+import datetime
+import os
+import random
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from parking_lot import simple
+from parking_lot.analytics import ALL_FLOORS, OccupancyAnalytics
+from parking_lot.compact_parking import CompactParkingLot
+from parking_lot.concurrent_parking import ConcurrentParkingLot
+from parking_lot.federation import ParkingFederation
+from parking_lot.scan_baselines import ScanMostFreeFloorStrategy, ScanNearestStrategy, ScanSimpleParkingLot
+from parking_lot.snapshot import load_layout, restore_snapshot, save_layout, save_snapshot
+from parking_lot.strategy_parking import MostFreeFloorStrategy, NearestStrategy, ParkingLot
+from parking_lot.ticket_archive import TicketArchive
+
+LOT_CLASSES = (ParkingLot, ConcurrentParkingLot, CompactParkingLot)
+
+
+class TestFreeSpotIndex(unittest.TestCase):
+    def test_heaps_stay_bounded_under_reuse(self):
+        for lot_class in LOT_CLASSES:
+            lot = lot_class([[["2-1", "2-1"]]])
+            for i in range(2_000):
+                strategy = MostFreeFloorStrategy() if i % 2 else None
+                first = lot.park(2, f"a{i}", strategy=strategy)
+                second = lot.park(2, f"b{i}", strategy=strategy)
+                lot.un_park(ticket_id=first["ticketId"])
+                lot.un_park(ticket_id=second["ticketId"])
+            index = lot.free_index
+            with self.subTest(lot=lot_class.__name__):
+                self.assertLessEqual(len(index.floors[2]), 1)
+                self.assertLessEqual(len(index.free[0, 2]), 2)
+                self.assertEqual(lot.get_free_spots_count(0, 2), 2)
+
+    def test_un_park_before_floor_is_indexed(self):
+        for lot_class in LOT_CLASSES:
+            lot = lot_class([[["2-1", "4-1"]], [["2-1", "4-1"]]])
+            ticket = lot.park(2, "KA01", strategy=ScanNearestStrategy())  # never loads the floor index
+            with self.subTest(lot=lot_class.__name__):
+                self.assertEqual(lot.un_park(ticket_id=ticket["ticketId"]), 201)
+                self.assertEqual(lot.get_free_spots_count(0, 2), 1)
+                self.assertEqual(lot.free_index.free_count[0, 2], 1)
+                self.assertEqual(lot.un_park(ticket_id=ticket["ticketId"]), 404)
+                self.assertEqual(lot.park(2, "KA02")["spotId"], ticket["spotId"])
+
+    def test_index_matches_the_scan_under_churn(self):
+        layout = [[[f"{2 + 2 * ((f + r + c) % 2)}-{int((f * 7 + r * 3 + c) % 5 != 0)}" for c in range(6)]
+                   for r in range(3)] for f in range(4)]
+        for lot_class in LOT_CLASSES:
+            rng = random.Random(7)
+            indexed, scanned = lot_class(layout), lot_class(layout)
+            open_tickets = []
+            with self.subTest(lot=lot_class.__name__):
+                for i in range(1_500):
+                    if open_tickets and rng.random() < 0.45:
+                        ticket_id = open_tickets.pop(rng.randrange(len(open_tickets)))
+                        self.assertEqual(indexed.un_park(ticket_id=ticket_id), scanned.un_park(ticket_id=ticket_id))
+                        continue
+                    vehicle_type = rng.choice((2, 4))
+                    most_free = rng.random() < 0.5
+                    got = indexed.park(vehicle_type, f"V{i}", f"T{i}",
+                                       MostFreeFloorStrategy() if most_free else NearestStrategy())
+                    want = scanned.park(vehicle_type, f"V{i}", f"T{i}",
+                                        ScanMostFreeFloorStrategy() if most_free else ScanNearestStrategy())
+                    self.assertEqual(got and got["spotId"], want and want["spotId"])
+                    if got:
+                        open_tickets.append(f"T{i}")
+
+
+class TestSimpleParkingLot(unittest.TestCase):
+    def test_parks_in_scan_order_after_un_parks(self):
+        layout = [[["2-1", "4-1", "2-0", "2-1"], ["2-1", "4-1", "2-1", "4-0"]], [["2-1", "4-1", "2-1", "2-1"]]]
+        rng = random.Random(3)
+        lot, scanned = simple.ParkingLot(layout), ScanSimpleParkingLot(layout)
+        open_tickets = []
+        for i in range(500):
+            if open_tickets and rng.random() < 0.5:
+                ticket_id = open_tickets.pop(rng.randrange(len(open_tickets)))
+                self.assertEqual(lot.un_park(ticket_id=ticket_id), scanned.un_park(ticket_id=ticket_id))
+                continue
+            vehicle_type = rng.choice((2, 4))
+            got, want = lot.park(vehicle_type, f"V{i}", f"T{i}"), scanned.park(vehicle_type, f"V{i}", f"T{i}")
+            self.assertEqual(got and got["spotId"], want and want["spotId"])
+            if got:
+                open_tickets.append(f"T{i}")
+
+
+class TestConcurrentParkingLot(unittest.TestCase):
+    def test_concurrent_un_park_releases_each_spot_once(self):
+        lot = ConcurrentParkingLot([[["2-1"] * 10, ["4-1"] * 10] for _ in range(4)])
+        tickets = [lot.park(2 + 2 * (i % 2), f"KA{i}")["ticketId"] for i in range(80)]
+        self.assertIsNone(lot.park(2, "full"))
+        barrier = threading.Barrier(8)
+
+        def un_park(ticket_id):
+            if tickets.index(ticket_id) < 8:
+                barrier.wait()  # start the first few together
+            return lot.un_park(ticket_id=ticket_id)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(un_park, tickets + tickets[:20]))  # the last 20 are repeats
+        self.assertEqual(results.count(201), 80)
+        self.assertEqual(results.count(404), 20)
+        for floor in range(4):
+            self.assertEqual((lot.get_free_spots_count(floor, 2), lot.get_free_spots_count(floor, 4)), (10, 10))
+        spots = {lot.park(2 + 2 * (i % 2), f"KB{i}")["spotId"] for i in range(80)}
+        self.assertEqual(len(spots), 80)
+
+
+class TestTicketArchive(unittest.TestCase):
+    def test_closed_tickets_are_searchable_after_leaving_memory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lot = ParkingLot([[["2-1", "4-1"]]], archive=TicketArchive(os.path.join(tmp, "tickets.jsonl"), batch_size=4))
+            for i in range(10):
+                ticket = lot.park(2, f"KA{i}", f"T{i}")
+                lot.un_park(ticket_id=ticket["ticketId"])
+            lot.park(4, "KB1", "open")
+            self.assertLessEqual(len(lot.tickets), 3)  # 2 closed since the last batch + the open one
+            self.assertEqual(lot.archive.archived, 8)
+
+            self.assertEqual(lot.search("T1")["vehicleNumber"], "KA1")  # on disk
+            self.assertEqual(lot.search("KA9")["ticketId"], "T9")  # still buffered
+            self.assertIsNotNone(lot.search("T3")["exitTime"])
+            self.assertIsNone(lot.search("open")["exitTime"])
+            self.assertEqual(lot.search("0-0-0")["ticketId"], "T9")  # latest ticket for the spot
+            self.assertIsNone(lot.search("missing"))
+            lot.close()
+
+
+class TestSnapshot(unittest.TestCase):
+    LAYOUT = [[["2-1", "2-0", "4-1"], ["4-1", "2-1"]], [["2-1", "4-1", "4-1"]]]
+
+    def test_round_trip_keeps_lot_kind_and_spot_ids(self):
+        for lot_class in LOT_CLASSES:
+            lot = lot_class(self.LAYOUT)
+            tickets = [lot.park(vehicle_type, f"KA{i}") for i, vehicle_type in enumerate([2, 4, 4, 2])]
+            lot.un_park(ticket_id=tickets[1]["ticketId"])
+            with tempfile.TemporaryDirectory() as tmp, self.subTest(lot=lot_class.__name__):
+                path = os.path.join(tmp, "lot.snap")
+                save_snapshot(lot, path)
+                restored = restore_snapshot(path, lot_class=lot_class if lot_class is ConcurrentParkingLot else None)
+                self.assertIs(type(restored), lot_class)
+                for floor in (0, 1):
+                    for vehicle_type in (2, 4):
+                        self.assertEqual(restored.get_free_spots_count(floor, vehicle_type),
+                                         lot.get_free_spots_count(floor, vehicle_type))
+                self.assertEqual(restored.search("KA3")["spotId"], tickets[3]["spotId"])
+                self.assertEqual(restored.un_park(spot_id=tickets[0]["spotId"]), 201)
+                self.assertEqual(restored.park(2, "KA9")["spotId"], tickets[0]["spotId"])
+                self.assertEqual(restored.park(4, "KA10")["spotId"], lot.park(4, "KA10")["spotId"])
+
+    def test_restore_into_another_kind_re_encodes_spot_ids(self):
+        lot = ParkingLot(self.LAYOUT)
+        lot.park(4, "KA1")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "lot.snap")
+            save_snapshot(lot, path)
+            compact = restore_snapshot(path, lot_class=CompactParkingLot)
+        spot_id = compact.search("KA1")["spotId"]
+        self.assertEqual(compact.parking_spots[spot_id].get_spot_id(), spot_id)
+        self.assertEqual(compact.un_park(vehicle_number="KA1"), 201)
+
+    def test_compiled_layout_matches_the_floor_list(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "lot.layout")
+            save_layout(self.LAYOUT, path)
+            loaded = load_layout(path)
+            with open(path, "wb") as f:
+                f.write(b"not a snapshot" * 4)  # long enough for the header, wrong magic
+            with self.assertRaises(ValueError):
+                load_layout(path)
+        lot = CompactParkingLot(self.LAYOUT)
+        for floor in (0, 1):
+            for vehicle_type in (2, 4):
+                self.assertEqual(loaded.get_free_spots_count(floor, vehicle_type),
+                                 lot.get_free_spots_count(floor, vehicle_type))
+        for i, vehicle_type in enumerate([4, 2, 4, 2, 4, 2]):
+            got, want = loaded.park(vehicle_type, f"KA{i}"), lot.park(vehicle_type, f"KA{i}")
+            self.assertEqual(got and got["spotId"], want and want["spotId"])
+
+
+class TestParkingFederation(unittest.TestCase):
+    def test_routes_to_nearest_lot_with_space(self):
+        federation = ParkingFederation(max_workers=4)
+        federation.add_lot("far", ParkingLot([[["4-1", "4-1"]]]), distance=9)
+        federation.add_lot("near", ParkingLot([[["4-1", "2-1"]]]), distance=1)
+        federation.add_lot("mid", CompactParkingLot([[["4-1"]]]), distance=5)
+        tickets = federation.park_many([(4, f"KA{i}") for i in range(5)])
+        self.assertEqual(sorted(t["lotId"] for t in tickets[:4]), ["far", "far", "mid", "near"])
+        self.assertIsNone(tickets[4])
+        self.assertEqual(federation.free_capacity(4), {"far": 0, "near": 0, "mid": 0})
+
+        near = next(t for t in tickets if t["lotId"] == "near")
+        self.assertEqual(federation.un_park("near", ticket_id=near["ticketId"]), 201)
+        self.assertEqual(federation.best_lot(4), "near")
+        federation.lots["mid"].un_park(vehicle_number=next(t for t in tickets if t["lotId"] == "mid")["vehicleNumber"])
+        self.assertEqual(federation.park(4, "KB1")["lotId"], "near")  # un_park on the lot itself is seen too
+        self.assertEqual(federation.park(4, "KB2")["lotId"], "mid")
+        self.assertEqual(federation.park(2, "KB3")["lotId"], "near")
+        self.assertIsNone(federation.park(2, "KB4"))
+
+    def test_routes_to_nearest_lot_with_space(self):
+        federation = ParkingFederation(max_workers=4)
+        federation.add_lot("far", ParkingLot([[["4-1", "4-1"]]]), distance=9)
+        federation.add_lot("near", ParkingLot([[["4-1", "2-1"]]]), distance=1)
+        federation.add_lot("mid", CompactParkingLot([[["4-1"]]]), distance=5)
+        tickets = federation.park_many([(4, f"KA{i}") for i in range(5)])
+        self.assertEqual(sorted(t["lotId"] for t in tickets[:4]), ["far", "far", "mid", "near"])
+        self.assertIsNone(tickets[4])
+        self.assertEqual(federation.free_capacity(4), {"far": 0, "near": 0, "mid": 0})
+
+        near = next(t for t in tickets if t["lotId"] == "near")
+        self.assertEqual(federation.un_park("near", ticket_id=near["ticketId"]), 201)
+        self.assertEqual(federation.best_lot(4), "near")
+        federation.lots["mid"].un_park(vehicle_number=next(t for t in tickets if t["lotId"] == "mid")["vehicleNumber"])
+        self.assertEqual(federation.park(4, "KB1")["lotId"], "near")  # un_park on the lot itself is seen too
+        self.assertEqual(federation.park(4, "KB2")["lotId"], "mid")
+        self.assertEqual(federation.park(2, "KB3")["lotId"], "near")
+        self.assertIsNone(federation.park(2, "KB4"))
+
+    def test_heap_holds_one_entry_per_lot_under_churn(self):
+        federation = ParkingFederation()
+        federation.add_lot("near", ParkingLot([[["4-1"]]]), distance=1)
+        federation.add_lot("far", ParkingLot([[["4-1"]]]), distance=2)
+        for i in range(1_000):
+            ticket = federation.park(4, f"KA{i}")
+            federation.un_park(ticket["lotId"], ticket_id=ticket["ticketId"])
+        self.assertEqual(sorted(federation.nearest[4]), [(1, "near"), (2, "far")])
+
+
+class TestOccupancyAnalytics(unittest.TestCase):
+    day = datetime.datetime(2024, 1, 1)
+
+    def at(self, hours=0, minutes=0):
+        return self.day + datetime.timedelta(hours=hours, minutes=minutes)
+
+    def test_integrates_across_bucket_boundaries(self):
+        analytics = OccupancyAnalytics(bucket_sec=3600, origin=self.day)
+        analytics.record_park(0, self.at(0, 30))
+        analytics.record_park(1, self.at(1, 15))
+        analytics.record_un_park(0, self.at(0, 30), self.at(2, 45))
+        analytics.advance(self.at(3))
+        self.assertEqual([avg for _, avg in analytics.occupancy_over_time(end=self.at(3), floor=0)], [0.5, 1.0, 0.75])
+        self.assertEqual([avg for _, avg in analytics.occupancy_over_time(end=self.at(3), floor=1)], [0.0, 0.75, 1.0])
+        self.assertEqual([avg for _, avg in analytics.occupancy_over_time(end=self.at(3))], [0.5, 1.75, 1.75])
+        self.assertEqual(analytics.average_occupancy(self.at(1), self.at(3)), 1.75)
+
+    def test_events_before_the_origin_are_clamped_to_the_first_bucket(self):
+        analytics = OccupancyAnalytics(bucket_sec=3600, origin=self.day)
+        analytics.record_park(0, self.at(0, -30))
+        analytics.record_park(0, self.at(2, 30))
+        self.assertEqual([avg for _, avg in analytics.occupancy_over_time()], [1.0, 1.0, 0.5])
+        self.assertEqual(analytics.arrivals_between(end=self.at(1)), 1)
+
+    def test_arrivals_between(self):
+        analytics = OccupancyAnalytics(bucket_sec=900, origin=self.day)
+        for minutes in (5, 10, 20, 70, 125):
+            analytics.record_park(minutes % 2, self.at(minutes=minutes))
+        self.assertEqual(analytics.arrivals_between(), 5)
+        self.assertEqual(analytics.arrivals_between(self.at(0, 15), self.at(1, 15)), 2)
+        self.assertEqual(analytics.arrivals_between(self.at(0, 15), self.at(1, 15), floor=0), 2)
+        self.assertEqual(analytics.arrivals_between(self.at(1, 15)), 1)
+        self.assertEqual(analytics.arrivals_between(self.at(5)), 0)
+        self.assertEqual(OccupancyAnalytics().arrivals_between(), 0)
+
+    def test_dwell_histogram_and_average(self):
+        analytics = OccupancyAnalytics(origin=self.day)
+        for floor, entry, dwell in ((0, 0, 0), (0, 1, 1), (1, 2, 3), (1, 3, 100)):
+            start = self.at(minutes=entry)
+            analytics.record_park(floor, start)
+            analytics.record_un_park(floor, start, start + datetime.timedelta(seconds=dwell))
+        self.assertEqual(analytics.dwell_distribution(), {1: 1, 2: 1, 4: 1, 128: 1})
+        self.assertEqual(analytics.dwell_distribution(1), {4: 1, 128: 1})
+        self.assertEqual(analytics.average_dwell(), 26.0)
+        self.assertEqual(analytics.average_dwell(0), 0.5)
+        self.assertEqual(analytics.average_dwell(2), 0.0)
+        self.assertEqual(analytics.dwell_count[ALL_FLOORS], 4)
+
+    def test_peak_hour(self):
+        analytics = OccupancyAnalytics(bucket_sec=1800, origin=self.day)
+        self.assertEqual(OccupancyAnalytics().peak_hour(), (None, 0.0))
+        analytics.record_park(0, self.at(1))
+        analytics.record_park(0, self.at(2))
+        analytics.record_park(0, self.at(2, 30))
+        analytics.record_un_park(0, self.at(2), self.at(3))
+        analytics.advance(self.at(4))
+        self.assertEqual(analytics.peak_hour(), (2, 2.5))
+        self.assertEqual(analytics.peak_hour(self.at(3), self.at(4)), (3, 2.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
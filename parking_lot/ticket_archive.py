@@ -0,0 +1,82 @@
+import json
+import os
+import sqlite3
+
+
+class TicketArchive:
+    """
+    Append-only archive of closed tickets.
+
+    Closed tickets are buffered and written in batches of `batch_size` as JSON lines to
+    `path`. A SQLite table next to it (`path + ".idx"`) maps ticket id, vehicle number
+    and spot id to the byte offset of the record, so archived tickets stay searchable
+    without keeping them, or their keys, in memory. Vehicle number and spot id point at
+    the most recently archived ticket for that key.
+    """
+    KEY_PREFIXES = ("t:", "v:", "s:")  # ticket id, vehicle number, spot id
+
+    def __init__(self, path, batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self._writer = open(path, "ab")
+        self._reader = None
+        self._index = sqlite3.connect(path + ".idx", check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        self._index.execute("CREATE TABLE IF NOT EXISTS offsets (key TEXT PRIMARY KEY, offset INTEGER) WITHOUT ROWID")
+        self.archived = 0
+
+    def append(self, ticket):
+        """Queue a closed ticket; returns True when this call wrote a batch to disk."""
+        self._pending.append(ticket.to_record())
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if not self._pending:
+            return
+        offset = self._writer.tell()
+        lines, rows = [], []
+        for record in self._pending:
+            line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+            for prefix, key in zip(self.KEY_PREFIXES, (record["ticketId"], record["vehicleNumber"], record["spotId"])):
+                rows.append((prefix + str(key), offset))
+            lines.append(line)
+            offset += len(line)
+        # records reach the file before their offsets reach the index
+        self._writer.write(b"".join(lines))
+        self._writer.flush()
+        with self._index:
+            self._index.executemany("INSERT OR REPLACE INTO offsets VALUES (?, ?)", rows)
+        self.archived += len(self._pending)
+        self._pending = []
+
+    def _read_at(self, offset):
+        if self._reader is None:
+            self._reader = open(self.path, "rb")
+        self._reader.seek(offset)
+        return json.loads(self._reader.readline())
+
+    def search(self, query):
+        """Archived ticket record (see Ticket.to_record) by ticket id, vehicle number or spot id."""
+        for record in reversed(self._pending):
+            if query in (record["ticketId"], record["vehicleNumber"], record["spotId"]):
+                return record
+        for prefix in self.KEY_PREFIXES:
+            row = self._index.execute("SELECT offset FROM offsets WHERE key = ?", (prefix + str(query),)).fetchone()
+            if row is not None:
+                return self._read_at(row[0])
+        return None
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if self._reader is not None:
+            self._reader.close()
+        self._index.close()
+
+    def size_on_disk(self):
+        return os.path.getsize(self.path)
@@ -0,0 +1,269 @@
+import hashlib
+import multiprocessing
+import struct
+import threading
+from abc import ABC, abstractmethod
+from itertools import islice
+from multiprocessing import shared_memory
+from typing import Callable, Iterable, List, Optional
+
+from rate_limitter.main import RateLimiterStrategy
+
+Transition = Callable[[list], bool]
+EMPTY, TOMBSTONE = 0, 1  # SharedMemoryBackend slot markers; key hashes are never either
+IdleCheck = Callable[[list], bool]  # True when a stored state can be dropped
+
+
+# ------------------ Backend Interface ------------------
+
+class StateBackend(ABC):
+    """
+    Where per-user limiter state lives.
+
+    apply() is an atomic check-and-update: load the user's state (or `initial` for a new user),
+    run `transition` on it, store the result and return the decision. apply_many() is the
+    pipelined form and may group keys to take each lock once per batch. A fixed-capacity
+    backend may use `is_idle` to reclaim an idle key's slot for a new key.
+
+    evict() drops idle keys incrementally: each call inspects at most `budget` keys,
+    resuming where the previous call stopped, and returns how many were dropped.
+    """
+    @abstractmethod
+    def apply(self, key: str, transition: Transition, initial: list, is_idle: Optional[IdleCheck] = None) -> bool:
+        pass
+
+    def apply_many(self, keys: Iterable[str], transition: Transition, initial: list,
+                   is_idle: Optional[IdleCheck] = None) -> List[bool]:
+        return [self.apply(key, transition, list(initial), is_idle) for key in keys]
+
+    @abstractmethod
+    def evict(self, is_idle: IdleCheck, budget: int = 1024) -> int:
+        pass
+
+
+class InMemoryBackend(StateBackend):
+    """Reference backend: a dict guarded by one lock, local to the process."""
+    def __init__(self):
+        self.storage = {}
+        self._lock = threading.Lock()
+
+    def apply(self, key: str, transition: Transition, initial: list, is_idle: Optional[IdleCheck] = None) -> bool:
+        with self._lock:
+            state = self.storage.get(key)
+            if state is None:
+                state = self.storage[key] = list(initial)
+            return transition(state)
+
+    def apply_many(self, keys: Iterable[str], transition: Transition, initial: list,
+                   is_idle: Optional[IdleCheck] = None) -> List[bool]:
+        storage = self.storage
+        results = []
+        with self._lock:
+            for key in keys:
+                state = storage.get(key)
+                if state is None:
+                    state = storage[key] = list(initial)
+                results.append(transition(state))
+        return results
+
+    def evict(self, is_idle: IdleCheck, budget: int = 1024) -> int:
+        """Inspect the `budget` least recently inspected keys; survivors move to the back."""
+        storage = self.storage
+        evicted = 0
+        with self._lock:
+            for key in list(islice(storage, min(budget, len(storage)))):
+                state = storage.pop(key)
+                if is_idle(state):
+                    evicted += 1
+                else:
+                    storage[key] = state
+        return evicted
+
+
+class SharedMemoryBackend(StateBackend):
+    """
+    Fixed-size hash table in a multiprocessing SharedMemory block, usable from any process
+    that receives this object (e.g. as a multiprocessing.Process argument).
+
+    Each slot holds a 64-bit key hash followed by `fields` int64 values. The table is split
+    into `stripes` regions with one multiprocessing lock each; a key is confined to the region
+    picked by its hash and probes linearly inside it, so one lock covers every slot a key can
+    touch. Keys are identified by a 64-bit blake2b digest, not Python's per-process hash().
+
+    evict() marks idle slots with a tombstone (probes pass over it, new keys reuse it) and
+    turns tombstones back into empty slots when nothing can be probed past them. A new key
+    that finds its region full reclaims the first slot whose state `is_idle` accepts, so
+    rotating user ids only fail when every slot in the region holds an active user.
+    """
+    def __init__(self, slots: int = 1 << 16, fields: int = 3, stripes: int = 64, name: Optional[str] = None):
+        if slots % stripes:
+            raise ValueError("slots must be a multiple of stripes")
+        self.slots = slots
+        self.fields = fields
+        self.stripes = stripes
+        self._record = struct.Struct("<Q" + "q" * fields)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=slots * self._record.size)
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+        self.locks = [multiprocessing.Lock() for _ in range(stripes)]
+        self._owner = True
+        self._evict_slot = 0
+
+    def __getstate__(self):
+        return {"slots": self.slots, "fields": self.fields, "stripes": self.stripes,
+                "name": self.shm.name, "locks": self.locks}
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.fields = state["fields"]
+        self.stripes = state["stripes"]
+        self.locks = state["locks"]
+        self._record = struct.Struct("<Q" + "q" * self.fields)
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._evict_slot = 0
+
+    @staticmethod
+    def key_hash(key: str) -> int:
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return digest if digest > TOMBSTONE else digest + 2  # 0 and 1 mark empty and freed slots
+
+    def _stored_hash(self, slot: int) -> int:
+        return struct.unpack_from("<Q", self.shm.buf, slot * self._record.size)[0]
+
+    def _locate(self, h: int, is_idle: Optional[IdleCheck] = None) -> int:
+        """
+        Slot index for hash h. A new key takes the first tombstone on its probe path, else the
+        empty slot that ends it, else an idle slot. Caller holds the stripe lock.
+        """
+        region = self.slots // self.stripes
+        base = (h % self.stripes) * region
+        start = (h // self.stripes) % region
+        reuse = None
+        for probe in range(region):
+            slot = base + (start + probe) % region
+            stored = self._stored_hash(slot)
+            if stored == h:
+                return slot
+            if stored == EMPTY:
+                return slot if reuse is None else reuse
+            if stored == TOMBSTONE and reuse is None:
+                reuse = slot
+        if reuse is None and is_idle is not None:
+            record, buf = self._record, self.shm.buf
+            for slot in range(base, base + region):
+                if is_idle(list(record.unpack_from(buf, slot * record.size)[1:])):
+                    return slot
+        if reuse is None:
+            raise RuntimeError("SharedMemoryBackend stripe is full; increase slots")
+        return reuse
+
+    def _free_locked(self, slot: int):
+        """Tombstone slot, then empty it and the tombstones before it if nothing probes past them."""
+        region = self.slots // self.stripes
+        base = slot - slot % region
+        struct.pack_into("<Q", self.shm.buf, slot * self._record.size, TOMBSTONE)
+        if self._stored_hash(base + (slot - base + 1) % region) != EMPTY:
+            return
+        for _ in range(region):
+            if self._stored_hash(slot) != TOMBSTONE:
+                break
+            struct.pack_into("<Q", self.shm.buf, slot * self._record.size, EMPTY)
+            slot = base + (slot - base - 1) % region
+
+    def _apply_locked(self, h: int, transition: Transition, initial: list, is_idle: Optional[IdleCheck]) -> bool:
+        record, buf = self._record, self.shm.buf
+        slot = self._locate(h, is_idle)
+        offset = slot * record.size
+        values = record.unpack_from(buf, offset)
+        if values[0] != h:
+            state = list(initial) + [0] * (self.fields - len(initial))
+        else:
+            state = list(values[1:])
+        allowed = transition(state)
+        record.pack_into(buf, offset, h, *state)
+        return allowed
+
+    def apply(self, key: str, transition: Transition, initial: list, is_idle: Optional[IdleCheck] = None) -> bool:
+        h = self.key_hash(key)
+        with self.locks[h % self.stripes]:
+            return self._apply_locked(h, transition, initial, is_idle)
+
+    def apply_many(self, keys: Iterable[str], transition: Transition, initial: list,
+                   is_idle: Optional[IdleCheck] = None) -> List[bool]:
+        hashes = [self.key_hash(key) for key in keys]
+        by_stripe = {}
+        for pos, h in enumerate(hashes):
+            by_stripe.setdefault(h % self.stripes, []).append(pos)
+
+        results = [False] * len(hashes)
+        for stripe, positions in by_stripe.items():
+            with self.locks[stripe]:
+                for pos in positions:
+                    results[pos] = self._apply_locked(hashes[pos], transition, initial, is_idle)
+        return results
+
+    def evict(self, is_idle: IdleCheck, budget: int = 1024) -> int:
+        """Inspect the next `budget` slots in table order, taking each stripe's lock once."""
+        region = self.slots // self.stripes
+        record, buf = self._record, self.shm.buf
+        evicted = 0
+        remaining = min(budget, self.slots)
+        while remaining:
+            slot = self._evict_slot
+            end = min(slot - slot % region + region, slot + remaining)
+            with self.locks[slot // region]:
+                for slot in range(slot, end):
+                    values = record.unpack_from(buf, slot * record.size)
+                    if values[0] > TOMBSTONE and is_idle(list(values[1:])):
+                        self._free_locked(slot)
+                        evicted += 1
+            remaining -= end - self._evict_slot
+            self._evict_slot = end % self.slots
+        return evicted
+
+    def close(self):
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+# ------------------ Strategy Adapter ------------------
+
+class BackendRateLimiter(RateLimiterStrategy):
+    """
+    Runs a fixed-state strategy (fixed window, sliding window counter, token bucket or
+    leaky bucket) against a StateBackend instead of the strategy's own storage dict.
+    """
+    def __init__(self, strategy: RateLimiterStrategy, backend: StateBackend):
+        strategy.initial_state(0)  # fail fast for strategies with variable-size state
+        self.strategy = strategy
+        self.backend = backend
+
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        strategy = self.strategy
+        if now is None:
+            now = strategy.clock()
+        return self.backend.apply(user_id, lambda state: strategy.transition(state, now),
+                                  strategy.initial_state(now), lambda state: strategy.state_is_idle(state, now))
+
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        strategy = self.strategy
+        if now is None:
+            now = strategy.clock()
+        return self.backend.apply_many(user_ids, lambda state: strategy.transition(state, now),
+                                       strategy.initial_state(now), lambda state: strategy.state_is_idle(state, now))
+
+    def evict_idle_keys(self, now: Optional[int] = None, budget: int = 1024,
+                        max_keys: Optional[int] = None) -> int:
+        """
+        Drop idle users from the backend, inspecting at most `budget` keys per call. max_keys
+        is not supported: a SharedMemoryBackend is bounded by its slot count instead.
+        """
+        if max_keys is not None:
+            raise NotImplementedError("BackendRateLimiter cannot cap its backend's key count")
+        strategy = self.strategy
+        if now is None:
+            now = strategy.clock()
+        evicted = self.backend.evict(lambda state: strategy.state_is_idle(state, now), budget)
+        self.evicted_keys += evicted
+        return evicted
@@ -0,0 +1,229 @@
+import multiprocessing
+import threading
+import time
+import tracemalloc
+
+from rate_limitter.main import (
+    RateLimiter,
+    FixedWindowRateLimiter,
+    SlidingWindowRateLimiter,
+    SlidingWindowCounterRateLimiter,
+    TokenBucketRateLimiter,
+    LeakyBucketRateLimiter,
+)
+from rate_limitter.metrics import RateLimiterMetrics
+from rate_limitter.backends import BackendRateLimiter, InMemoryBackend, SharedMemoryBackend
+from rate_limitter.sharded import ShardedRateLimiter
+
+
+def make_strategies():
+    return {
+        "Fixed Window": lambda: FixedWindowRateLimiter(max_requests=50, window_size_sec=1),
+        "Sliding Window": lambda: SlidingWindowRateLimiter(max_requests=50, window_size_sec=1),
+        "Sliding Counter": lambda: SlidingWindowCounterRateLimiter(max_requests=50, window_size_sec=1),
+        "Token Bucket": lambda: TokenBucketRateLimiter(rate=50, capacity=50),
+        "Leaky Bucket": lambda: LeakyBucketRateLimiter(rate=50, capacity=50),
+    }
+
+
+def make_user_ids(total: int, distinct_users: int):
+    return [f"user-{i % distinct_users}" for i in range(total)]
+
+
+def benchmark_batch(total=200_000, distinct_users=1_000, batch_size=256):
+    """Compare looping over RateLimiter.allow_request with RateLimiter.allow_requests."""
+    print(f"\n=== allow_request loop vs allow_requests batch "
+          f"({total} requests, {distinct_users} users, batch={batch_size}) ===")
+    user_ids = make_user_ids(total, distinct_users)
+    batches = [user_ids[i:i + batch_size] for i in range(0, total, batch_size)]
+
+    for name, factory in make_strategies().items():
+        limiter = RateLimiter(factory())
+        start = time.perf_counter()
+        for user_id in user_ids:
+            limiter.allow_request(user_id)
+        loop_sec = time.perf_counter() - start
+
+        limiter = RateLimiter(factory())
+        start = time.perf_counter()
+        for batch in batches:
+            limiter.allow_requests(batch)
+        batch_sec = time.perf_counter() - start
+
+        print(f"{name:<16} loop: {total / loop_sec:>12,.0f} req/s   "
+              f"batch: {total / batch_sec:>12,.0f} req/s   speedup: {loop_sec / batch_sec:.2f}x")
+
+
+def benchmark_sliding_window_memory(users=20_000, max_requests=100, requests_per_user=100):
+    """Compare state size and per-decision latency of the exact deque log and the O(1) counter."""
+    print(f"\n=== Sliding window log vs counter ({users} users, limit={max_requests}, "
+          f"{requests_per_user} requests each) ===")
+    user_ids = [f"user-{i}" for i in range(users)]
+    total = users * requests_per_user
+
+    for name, factory in [
+        ("Sliding Window", lambda: SlidingWindowRateLimiter(max_requests=max_requests, window_size_sec=60)),
+        ("Sliding Counter", lambda: SlidingWindowCounterRateLimiter(max_requests=max_requests, window_size_sec=60)),
+    ]:
+        strategy = factory()
+        start = time.perf_counter()
+        for _ in range(requests_per_user):
+            for user_id in user_ids:
+                strategy.allow_request(user_id)
+        elapsed = time.perf_counter() - start
+
+        # separate run so tracing overhead does not skew the latency figure
+        tracemalloc.start()
+        strategy = factory()
+        for _ in range(requests_per_user):
+            for user_id in user_ids:
+                strategy.allow_request(user_id)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<16} state: {current / users:>8,.0f} B/user   "
+              f"latency: {elapsed / total * 1e9:>6,.0f} ns/decision")
+
+
+def benchmark_cached_clock(total=200_000, distinct_users=1_000):
+    """Reading the clock per decision vs passing one coarse timestamp per 1k decisions."""
+    print(f"\n=== Clock per decision vs cached timestamp ({total} requests, {distinct_users} users) ===")
+    user_ids = make_user_ids(total, distinct_users)
+    for name, factory in make_strategies().items():
+        strategy = factory()
+        start = time.perf_counter()
+        for user_id in user_ids:
+            strategy.allow_request(user_id)
+        clock_sec = time.perf_counter() - start
+
+        strategy = factory()
+        clock = strategy.clock
+        start = time.perf_counter()
+        for i in range(0, total, 1_000):
+            now = clock()
+            for user_id in user_ids[i:i + 1_000]:
+                strategy.allow_request(user_id, now)
+        cached_sec = time.perf_counter() - start
+        print(f"{name:<16} clock: {total / clock_sec:>12,.0f} req/s   cached: {total / cached_sec:>12,.0f} req/s")
+
+
+def benchmark_metrics(total=300_000, distinct_users=1_000, batch_size=256, repeats=5):
+    """Per-decision cost of RateLimiter with and without RateLimiterMetrics, single and batched."""
+    print(f"\n=== Metrics overhead ({total} requests, {distinct_users} users, best of {repeats}) ===")
+    user_ids = make_user_ids(total, distinct_users)
+    batches = [user_ids[i:i + batch_size] for i in range(0, total, batch_size)]
+
+    def single(limiter):
+        for user_id in user_ids:
+            limiter.allow_request(user_id)
+
+    def batched(limiter):
+        for batch in batches:
+            limiter.allow_requests(batch)
+
+    for name, factory in make_strategies().items():
+        line = f"{name:<16}"
+        for mode, run in (("single", single), ("batch", batched)):
+            best = {}
+            for label in ("off", "on"):
+                for _ in range(repeats):
+                    limiter = RateLimiter(factory(), metrics=RateLimiterMetrics() if label == "on" else None)
+                    start = time.perf_counter()
+                    run(limiter)
+                    elapsed = time.perf_counter() - start
+                    best[label] = min(best.get(label, elapsed), elapsed)
+            line += (f"  {mode}: {best['off'] / total * 1e9:>4.0f} -> {best['on'] / total * 1e9:>4.0f} ns "
+                     f"({best['on'] / best['off'] - 1:>+6.1%})")
+        print(line)
+
+
+class GlobalLockRateLimiter:
+    """Baseline for the threaded benchmark: one lock around a single strategy."""
+    def __init__(self, strategy):
+        self.strategy = strategy
+        self.lock = threading.Lock()
+
+    def allow_request(self, user_id):
+        with self.lock:
+            return self.strategy.allow_request(user_id)
+
+
+def run_threads(limiter, threads: int, requests_per_thread: int, distinct_users: int) -> float:
+    user_ids = make_user_ids(requests_per_thread, distinct_users)
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        allow = limiter.allow_request
+        barrier.wait()
+        for user_id in user_ids:
+            allow(user_id)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    return threads * requests_per_thread / (time.perf_counter() - start)
+
+
+def benchmark_sharded(requests_per_thread=50_000, distinct_users=10_000, shards=16):
+    """Throughput of a single global lock vs ShardedRateLimiter as the thread count grows."""
+    print(f"\n=== Global lock vs {shards}-way sharded token bucket "
+          f"({requests_per_thread} requests/thread, {distinct_users} users) ===")
+    factory = lambda: TokenBucketRateLimiter(rate=50, capacity=50)
+    for threads in (1, 2, 4, 8):
+        global_rps = run_threads(GlobalLockRateLimiter(factory()), threads, requests_per_thread, distinct_users)
+        sharded_rps = run_threads(ShardedRateLimiter(factory, shards), threads, requests_per_thread, distinct_users)
+        print(f"threads={threads}   global lock: {global_rps:>12,.0f} req/s   sharded: {sharded_rps:>12,.0f} req/s")
+
+
+def _backend_worker(backend, rate, capacity, user_ids, rounds, batch_size, results):
+    limiter = BackendRateLimiter(TokenBucketRateLimiter(rate=rate, capacity=capacity), backend)
+    allowed = 0
+    for _ in range(rounds):
+        for i in range(0, len(user_ids), batch_size):
+            allowed += sum(limiter.allow_requests(user_ids[i:i + batch_size]))
+    results.put(allowed)
+
+
+def benchmark_backends(users=1_000, rounds=20, rate=5, capacity=10, batch_size=64):
+    """
+    Admission accuracy and throughput of a token bucket spread over 1-8 processes.
+
+    Every process sends `rounds` requests per user. The quota for the run is
+    users * (capacity + rate * elapsed); accuracy is admitted / quota, so a process-local
+    backend drifts towards N x quota while the shared-memory backend should stay near 1.
+    """
+    print(f"\n=== Backends across processes ({users} users, capacity={capacity}, rate={rate}/s) ===")
+    user_ids = [f"user-{i}" for i in range(users)]
+    for processes in (1, 2, 4, 8):
+        for name in ("in-memory (per process)", "shared memory"):
+            backend = SharedMemoryBackend(slots=1 << 14, fields=3) if name == "shared memory" else InMemoryBackend()
+            results = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=_backend_worker,
+                                               args=(backend, rate, capacity, user_ids, rounds, batch_size, results))
+                       for _ in range(processes)]
+            start = time.perf_counter()
+            for w in workers:
+                w.start()
+            admitted = sum(results.get() for _ in workers)
+            for w in workers:
+                w.join()
+            elapsed = time.perf_counter() - start
+            if isinstance(backend, SharedMemoryBackend):
+                backend.close()
+
+            quota = users * (capacity + rate * elapsed)
+            decisions = processes * users * rounds
+            print(f"processes={processes}  {name:<24} accuracy: {admitted / quota:>5.2f}x quota   "
+                  f"throughput: {decisions / elapsed:>10,.0f} req/s")
+
+
+if __name__ == "__main__":
+    benchmark_batch()
+    benchmark_sliding_window_memory()
+    benchmark_cached_clock()
+    benchmark_metrics()
+    benchmark_sharded()
+    benchmark_backends()
@@ -1,44 +1,188 @@
+import asyncio
+import heapq
+import threading
 import time
 from abc import ABC, abstractmethod
 from collections import defaultdict, deque
+from itertools import islice
+from typing import Callable, Iterable, List, Optional
+
+NS_PER_SEC = 1_000_000_000
+Clock = Callable[[], int]  # returns integer nanoseconds, e.g. time.monotonic_ns
+
+
+class SimulatedClock:
+    """Deterministic clock for tests and benchmarks: time only moves when advance() is called."""
+    def __init__(self, start_ns: int = 0):
+        self.now_ns = start_ns
+
+    def __call__(self) -> int:
+        return self.now_ns
+
+    def advance(self, seconds: float):
+        self.now_ns += int(seconds * NS_PER_SEC)
 
 
 class RateLimiterStrategy(ABC):
+    clock: Clock = time.monotonic_ns
+    evicted_keys = 0  # running total of keys dropped by evict_idle_keys
+
     @abstractmethod
-    def allow_request(self, user_id: str) -> bool:
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        """
+        Decide one request. `now` is an optional timestamp from the strategy's clock, so hot
+        loops can pass a cached coarse value instead of reading the clock for every call.
+        """
         pass
 
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        """Decide a batch of requests in order. Strategies override this to read the clock once."""
+        if now is None:
+            now = self.clock()
+        return [self.allow_request(user_id, now) for user_id in user_ids]
+
+    def reserve(self, user_id: str, tokens: int = 1, now: Optional[int] = None) -> int:
+        """
+        Take `tokens` if they are available and return 0; otherwise take nothing and return
+        how many nanoseconds until they will be. Only bucket strategies can answer this.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot compute a wait time")
+
+    def is_idle(self, state, now: int) -> bool:
+        """True when dropping this user's state is indistinguishable from a fresh user."""
+        return False
+
+    def last_seen(self, state) -> int:
+        """Clock time of the latest activity recorded in state; evict_idle_keys' cap drops the oldest first."""
+        raise NotImplementedError(f"{type(self).__name__} does not track when users were last seen")
+
+    def state_is_idle(self, state: list, now: int) -> bool:
+        """is_idle for the fixed-size state of initial_state / transition."""
+        return self.is_idle(state, now)
+
+    def initial_state(self, now: int) -> list:
+        """Fixed-size numeric state for a new user, as stored by a StateBackend."""
+        raise NotImplementedError(f"{type(self).__name__} does not keep fixed-size state")
+
+    def transition(self, state: list, now: int) -> bool:
+        """Decide one request against `state`, updating it in place."""
+        raise NotImplementedError(f"{type(self).__name__} does not keep fixed-size state")
+
+    def evict_idle_keys(self, now: Optional[int] = None, budget: int = 1024,
+                        max_keys: Optional[int] = None) -> int:
+        """
+        Incrementally drop idle users from storage and return how many keys were evicted.
+
+        Each call inspects at most `budget` keys, resuming where the previous call stopped,
+        so a maintenance loop can call it periodically without touching allow_request.
+        If storage still holds more than `max_keys` afterwards, the least recently seen
+        keys (see last_seen) are dropped as well; those users restart with a full allowance.
+
+        The sweep takes keys from the front of storage and moves the ones it keeps to the
+        back, so the front is always the least recently inspected keys and a call costs
+        O(budget). Enforcing max_keys costs one O(n log excess) pass, only when over the cap.
+        """
+        if now is None:
+            now = self.clock()
+        storage = self.storage
+
+        evicted = 0
+        for user_id in list(islice(storage, min(budget, len(storage)))):
+            state = storage.pop(user_id)
+            if self.is_idle(state, now):
+                evicted += 1
+            else:
+                storage[user_id] = state
+
+        if max_keys is not None and len(storage) > max_keys:
+            last_seen = self.last_seen
+            for user_id, _ in heapq.nsmallest(len(storage) - max_keys, storage.items(),
+                                              key=lambda item: last_seen(item[1])):
+                del storage[user_id]
+                evicted += 1
+
+        self.evicted_keys += evicted
+        return evicted
+
 
 class FixedWindowRateLimiter(RateLimiterStrategy):
-    def __init__(self, max_requests: int, window_size_sec: int):
+    def __init__(self, max_requests: int, window_size_sec: int, clock: Clock = time.monotonic_ns):
         self.max_requests = max_requests
         self.window_size_sec = window_size_sec
-        self.storage = defaultdict(lambda: [0, int(time.time())])  # [count, window_start]
+        self.window_ns = int(window_size_sec * NS_PER_SEC)
+        self.clock = clock
+        self.storage = defaultdict(lambda: [0, self.clock()])  # [count, window_start_ns]
 
-    def allow_request(self, user_id: str) -> bool:
-        count, window_start = self.storage[user_id]
-        now = int(time.time())
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        if now is None:
+            now = self.clock()
+        state = self.storage.get(user_id)
+        if state is None:
+            state = self.storage[user_id] = [0, now]
+        count, window_start = state
 
-        if now - window_start >= self.window_size_sec:
+        if now - window_start >= self.window_ns:
             self.storage[user_id] = [1, now]
             return True
         elif count < self.max_requests:
-            self.storage[user_id][0] += 1
+            state[0] += 1
+            return True
+        return False
+
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        if now is None:
+            now = self.clock()
+        storage = self.storage
+        window_ns = self.window_ns
+        max_requests = self.max_requests
+        results = []
+        for user_id in user_ids:
+            state = storage.get(user_id)
+            if state is None:
+                state = storage[user_id] = [0, now]
+            if now - state[1] >= window_ns:
+                storage[user_id] = [1, now]
+                results.append(True)
+            elif state[0] < max_requests:
+                state[0] += 1
+                results.append(True)
+            else:
+                results.append(False)
+        return results
+
+    def is_idle(self, state, now: int) -> bool:
+        return now - state[1] >= self.window_ns
+
+    def last_seen(self, state) -> int:
+        return state[1]
+
+    def initial_state(self, now: int) -> list:
+        return [0, now]
+
+    def transition(self, state: list, now: int) -> bool:
+        if now - state[1] >= self.window_ns:
+            state[0], state[1] = 1, now
+            return True
+        elif state[0] < self.max_requests:
+            state[0] += 1
             return True
         return False
 
 
 class SlidingWindowRateLimiter(RateLimiterStrategy):
-    def __init__(self, max_requests: int, window_size_sec: int):
+    def __init__(self, max_requests: int, window_size_sec: int, clock: Clock = time.monotonic_ns):
         self.max_requests = max_requests
         self.window_size_sec = window_size_sec
+        self.window_ns = int(window_size_sec * NS_PER_SEC)
+        self.clock = clock
         self.storage = defaultdict(deque)
 
-    def allow_request(self, user_id: str) -> bool:
-        now = time.time()
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        if now is None:
+            now = self.clock()
         q = self.storage[user_id]
 
-        while q and now - q[0] > self.window_size_sec:
+        while q and now - q[0] > self.window_ns:
             q.popleft()
 
         if len(q) < self.max_requests:
@@ -46,55 +190,369 @@ class SlidingWindowRateLimiter(RateLimiterStrategy):
             return True
         return False
 
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        if now is None:
+            now = self.clock()
+        storage = self.storage
+        window_ns = self.window_ns
+        max_requests = self.max_requests
+        results = []
+        for user_id in user_ids:
+            q = storage[user_id]
+            while q and now - q[0] > window_ns:
+                q.popleft()
+            if len(q) < max_requests:
+                q.append(now)
+                results.append(True)
+            else:
+                results.append(False)
+        return results
+
+    def is_idle(self, state, now: int) -> bool:
+        return not state or now - state[-1] > self.window_ns
+
+    def last_seen(self, state) -> int:
+        return state[-1] if state else -1
+
+
+class SlidingWindowCounterRateLimiter(RateLimiterStrategy):
+    """
+    Approximate sliding window that keeps O(1) state per user instead of a timestamp log.
+
+    Time is cut into fixed windows of window_size_sec. For each user we keep the count of the
+    previous window and of the current one; the sliding count is estimated as
+        previous * (1 - elapsed_in_current / window_size_sec) + current
+    and a request is admitted only while that estimate stays within max_requests.
+
+    Accuracy bounds (compared with SlidingWindowRateLimiter's exact log):
+      - exact when arrivals in the previous window are evenly spread;
+      - every fixed window admits at most max_requests, so any interval of window_size_sec
+        admits at most 2 * max_requests (the worst case is a burst at the very end of the
+        previous window followed by a burst right after the boundary);
+      - it can also deny requests the exact log would admit when the previous window's
+        requests were clustered at its start (they are still weighted in by overlap).
+    """
+    def __init__(self, max_requests: int, window_size_sec: int, clock: Clock = time.monotonic_ns):
+        self.max_requests = max_requests
+        self.window_size_sec = window_size_sec
+        self.window_ns = int(window_size_sec * NS_PER_SEC)
+        self.clock = clock
+        self.storage = defaultdict(lambda: [0, 0, self.clock()])  # [previous_count, current_count, window_start_ns]
+
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        if now is None:
+            now = self.clock()
+        state = self.storage.get(user_id)
+        if state is None:
+            state = self.storage[user_id] = [0, 0, now]
+        return self.transition(state, now)
+
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        if now is None:
+            now = self.clock()
+        storage = self.storage
+        allow = self.transition
+        results = []
+        for user_id in user_ids:
+            state = storage.get(user_id)
+            if state is None:
+                state = storage[user_id] = [0, 0, now]
+            results.append(allow(state, now))
+        return results
+
+    def is_idle(self, state, now: int) -> bool:
+        return now - state[2] >= 2 * self.window_ns
+
+    def last_seen(self, state) -> int:
+        return state[2]
+
+    def initial_state(self, now: int) -> list:
+        return [0, 0, now]
+
+    def transition(self, state: list, now: int) -> bool:
+        window = self.window_ns
+        elapsed = max(0, now - state[2])
+        if elapsed >= window:
+            # roll forward; anything older than one full window no longer overlaps
+            state[0] = state[1] if elapsed < 2 * window else 0
+            state[1] = 0
+            state[2] += (elapsed // window) * window
+            elapsed = now - state[2]
+
+        # estimate + 1 <= max_requests, scaled by window to stay in integers
+        if state[0] * (window - elapsed) + (state[1] + 1) * window <= self.max_requests * window:
+            state[1] += 1
+            return True
+        return False
+
 
 class TokenBucketRateLimiter(RateLimiterStrategy):
-    def __init__(self, rate: float, capacity: int):
+    """
+    Tokens are accounted as integer nanoseconds of credit: one token costs ns_per_token
+    (precomputed from rate) and credit grows by one per elapsed nanosecond, so a decision
+    is a subtraction and a comparison with no float math on the clock.
+    """
+    def __init__(self, rate: float, capacity: int, clock: Clock = time.monotonic_ns):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
         self.rate = rate  # tokens per second
         self.capacity = capacity
-        self.storage = defaultdict(lambda: [capacity, time.time()])  # [tokens, last_checked]
+        self.clock = clock
+        self.ns_per_token = max(1, round(NS_PER_SEC / rate))
+        self.capacity_ns = capacity * self.ns_per_token
+        self.storage = defaultdict(lambda: [self.capacity_ns, self.clock()])  # [credit_ns, last_checked_ns]
 
-    def allow_request(self, user_id: str) -> bool:
-        tokens, last_checked = self.storage[user_id]
-        now = time.time()
-        elapsed = now - last_checked
-        new_tokens = min(self.capacity, tokens + elapsed * self.rate)
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        if now is None:
+            now = self.clock()
+        state = self.storage.get(user_id)
+        if state is None:
+            state = self.storage[user_id] = [self.capacity_ns, now]
+        credit, last_checked = state
+        if now > last_checked:
+            credit = min(self.capacity_ns, credit + now - last_checked)
+            state[1] = now
 
-        if new_tokens >= 1:
-            self.storage[user_id] = [new_tokens - 1, now]
+        if credit >= self.ns_per_token:
+            state[0] = credit - self.ns_per_token
             return True
         else:
-            self.storage[user_id] = [new_tokens, now]
+            state[0] = credit
             return False
 
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        if now is None:
+            now = self.clock()
+        storage = self.storage
+        cost = self.ns_per_token
+        capacity_ns = self.capacity_ns
+        results = []
+        for user_id in user_ids:
+            state = storage.get(user_id)
+            if state is None:
+                state = storage[user_id] = [capacity_ns, now]
+            elif now > state[1]:
+                state[0] = min(capacity_ns, state[0] + now - state[1])
+                state[1] = now
+            if state[0] >= cost:
+                state[0] -= cost
+                results.append(True)
+            else:
+                results.append(False)
+        return results
+
+    def reserve(self, user_id: str, tokens: int = 1, now: Optional[int] = None) -> int:
+        cost = tokens * self.ns_per_token
+        if cost > self.capacity_ns:
+            raise ValueError(f"cannot reserve {tokens} tokens from a bucket of {self.capacity}")
+        if now is None:
+            now = self.clock()
+        state = self.storage.get(user_id)
+        if state is None:
+            state = self.storage[user_id] = [self.capacity_ns, now]
+        if now > state[1]:
+            state[0] = min(self.capacity_ns, state[0] + now - state[1])
+            state[1] = now
+        if state[0] >= cost:
+            state[0] -= cost
+            return 0
+        return cost - state[0]
+
+    def is_idle(self, state, now: int) -> bool:
+        # refilled to capacity, same as a bucket created now
+        return state[0] + now - state[1] >= self.capacity_ns
+
+    def last_seen(self, state) -> int:
+        return state[1]
+
+    def initial_state(self, now: int) -> list:
+        return [self.capacity_ns, now]
+
+    def transition(self, state: list, now: int) -> bool:
+        if now > state[1]:
+            state[0] = min(self.capacity_ns, state[0] + now - state[1])
+            state[1] = now
+        if state[0] >= self.ns_per_token:
+            state[0] -= self.ns_per_token
+            return True
+        return False
+
 
 class LeakyBucketRateLimiter(RateLimiterStrategy):
-    def __init__(self, rate: float, capacity: int):
+    """Water is kept in integer nanoseconds: each request adds ns_per_request, and it drains one per ns."""
+    def __init__(self, rate: float, capacity: int, clock: Clock = time.monotonic_ns):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
         self.rate = rate  # leak rate: requests per second
         self.capacity = capacity
-        self.storage = defaultdict(lambda: {"water": 0.0, "last_checked": time.time()})
+        self.clock = clock
+        self.ns_per_request = max(1, round(NS_PER_SEC / rate))
+        self.capacity_ns = capacity * self.ns_per_request
+        self.storage = defaultdict(lambda: {"water": 0, "last_checked": self.clock()})
 
-    def allow_request(self, user_id: str) -> bool:
-        bucket = self.storage[user_id]
-        now = time.time()
-        leaked = (now - bucket["last_checked"]) * self.rate
-        bucket["water"] = max(0.0, bucket["water"] - leaked)
-        bucket["last_checked"] = now
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        if now is None:
+            now = self.clock()
+        bucket = self.storage.get(user_id)
+        if bucket is None:
+            bucket = self.storage[user_id] = {"water": 0, "last_checked": now}
+        elif now > bucket["last_checked"]:
+            bucket["water"] = max(0, bucket["water"] - (now - bucket["last_checked"]))
+            bucket["last_checked"] = now
 
-        if bucket["water"] + 1 <= self.capacity:
-            bucket["water"] += 1
+        if bucket["water"] + self.ns_per_request <= self.capacity_ns:
+            bucket["water"] += self.ns_per_request
+            return True
+        return False
+
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        if now is None:
+            now = self.clock()
+        storage = self.storage
+        cost = self.ns_per_request
+        capacity_ns = self.capacity_ns
+        results = []
+        for user_id in user_ids:
+            bucket = storage.get(user_id)
+            if bucket is None:
+                bucket = storage[user_id] = {"water": 0, "last_checked": now}
+            elif now > bucket["last_checked"]:
+                bucket["water"] = max(0, bucket["water"] - (now - bucket["last_checked"]))
+                bucket["last_checked"] = now
+            if bucket["water"] + cost <= capacity_ns:
+                bucket["water"] += cost
+                results.append(True)
+            else:
+                results.append(False)
+        return results
+
+    def reserve(self, user_id: str, tokens: int = 1, now: Optional[int] = None) -> int:
+        cost = tokens * self.ns_per_request
+        if cost > self.capacity_ns:
+            raise ValueError(f"cannot reserve {tokens} requests from a bucket of {self.capacity}")
+        if now is None:
+            now = self.clock()
+        bucket = self.storage.get(user_id)
+        if bucket is None:
+            bucket = self.storage[user_id] = {"water": 0, "last_checked": now}
+        elif now > bucket["last_checked"]:
+            bucket["water"] = max(0, bucket["water"] - (now - bucket["last_checked"]))
+            bucket["last_checked"] = now
+        overflow = bucket["water"] + cost - self.capacity_ns
+        if overflow <= 0:
+            bucket["water"] += cost
+            return 0
+        return overflow
+
+    def is_idle(self, state, now: int) -> bool:
+        # fully drained, same as a bucket created now
+        return state["water"] - (now - state["last_checked"]) <= 0
+
+    def last_seen(self, state) -> int:
+        return state["last_checked"]
+
+    def state_is_idle(self, state: list, now: int) -> bool:
+        return state[0] - (now - state[1]) <= 0
+
+    def initial_state(self, now: int) -> list:
+        return [0, now]  # [water_ns, last_checked_ns]
+
+    def transition(self, state: list, now: int) -> bool:
+        if now > state[1]:
+            state[0] = max(0, state[0] - (now - state[1]))
+            state[1] = now
+        if state[0] + self.ns_per_request <= self.capacity_ns:
+            state[0] += self.ns_per_request
             return True
         return False
 
 
 class RateLimiter:
-    def __init__(self, strategy: RateLimiterStrategy):
+    def __init__(self, strategy: RateLimiterStrategy, metrics=None):
         self.strategy = strategy
+        self.strategy_name = type(strategy).__name__
+        self.metrics = metrics  # optional rate_limitter.metrics.RateLimiterMetrics
+        self._decisions = 0  # drives latency sampling; an occasional lost increment is harmless
+        self._local = threading.local()  # .counts: this thread's [allowed, denied] list in metrics
+        self._queues = {}  # user_id -> [asyncio.Lock, number of acquire() calls holding or waiting]
 
     def set_strategy(self, strategy: RateLimiterStrategy):
         self.strategy = strategy
+        self.strategy_name = type(strategy).__name__
+        self._local = threading.local()
+
+    def _thread_counts(self) -> List[int]:
+        counts = self._local.counts = self.metrics.counter(self.strategy_name)
+        return counts
+
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        metrics = self.metrics
+        if metrics is None:
+            return self.strategy.allow_request(user_id, now)
+        self._decisions += 1
+        if self._decisions & (metrics.latency_sample_every - 1):
+            allowed = self.strategy.allow_request(user_id, now)
+            try:
+                self._local.counts[not allowed] += 1
+            except AttributeError:
+                self._thread_counts()[not allowed] += 1
+            return allowed
+        start = time.perf_counter_ns()
+        allowed = self.strategy.allow_request(user_id, now)
+        metrics.record(self.strategy_name, user_id, allowed, time.perf_counter_ns() - start)
+        return allowed
 
-    def allow_request(self, user_id: str) -> bool:
-        return self.strategy.allow_request(user_id)
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        if self.metrics is None:
+            return self.strategy.allow_requests(user_ids, now)
+        user_ids = list(user_ids)
+        start = time.perf_counter_ns()
+        results = self.strategy.allow_requests(user_ids, now)
+        self.metrics.record_batch(self.strategy_name, user_ids, results, time.perf_counter_ns() - start)
+        return results
+
+    def evict_idle_keys(self, now: Optional[int] = None, budget: int = 1024,
+                        max_keys: Optional[int] = None) -> int:
+        return self.strategy.evict_idle_keys(now, budget, max_keys)
+
+    async def acquire(self, user_id: str, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until `tokens` are granted for user_id, sleeping exactly as long as the token or
+        leaky bucket says is needed instead of retrying. Callers for the same user are served
+        in FIFO order. Returns False, without taking anything, if the wait would exceed timeout;
+        time spent queued behind earlier callers counts towards it.
+        The strategy's clock must track real time, since the wait is an asyncio.sleep.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = [asyncio.Lock(), 0]
+        queue[1] += 1
+        lock = queue[0]
+        try:
+            if deadline is None:
+                await lock.acquire()
+            else:
+                try:
+                    await asyncio.wait_for(lock.acquire(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    return False
+            try:
+                while True:
+                    wait_ns = self.strategy.reserve(user_id, tokens)
+                    if wait_ns == 0:
+                        return True
+                    delay = wait_ns / NS_PER_SEC
+                    if deadline is not None and loop.time() + delay > deadline:
+                        return False
+                    await asyncio.sleep(delay)
+            finally:
+                lock.release()
+        finally:
+            queue[1] -= 1
+            if queue[1] == 0:
+                del self._queues[user_id]
 
 
 class RateLimiterObserver:
@@ -111,16 +569,29 @@ def test_rate_limiter(name, limiter: RateLimiter, user_id: str = "user1", interv
         time.sleep(interval)
 
 
+def simulate_rate_limiter(limiter: RateLimiter, clock: SimulatedClock, user_id: str = "user1",
+                          interval=0.5, total=10) -> List[bool]:
+    """Same traffic shape as test_rate_limiter, but advances a SimulatedClock instead of sleeping."""
+    decisions = []
+    for _ in range(total):
+        decisions.append(limiter.allow_request(user_id))
+        clock.advance(interval)
+    return decisions
+
+
 if __name__ == "__main__":
     user = "test-user"
+    clock = SimulatedClock()
 
     strategies = {
-        "Fixed Window": FixedWindowRateLimiter(max_requests=5, window_size_sec=5),
-        "Sliding Window": SlidingWindowRateLimiter(max_requests=5, window_size_sec=5),
-        "Token Bucket": TokenBucketRateLimiter(rate=1, capacity=5),
-        "Leaky Bucket": LeakyBucketRateLimiter(rate=1, capacity=5),
+        "Fixed Window": FixedWindowRateLimiter(max_requests=5, window_size_sec=5, clock=clock),
+        "Sliding Window": SlidingWindowRateLimiter(max_requests=5, window_size_sec=5, clock=clock),
+        "Sliding Window Counter": SlidingWindowCounterRateLimiter(max_requests=5, window_size_sec=5, clock=clock),
+        "Token Bucket": TokenBucketRateLimiter(rate=1, capacity=5, clock=clock),
+        "Leaky Bucket": LeakyBucketRateLimiter(rate=1, capacity=5, clock=clock),
     }
 
     for name, strategy in strategies.items():
         limiter = RateLimiter(strategy)
-        test_rate_limiter(name, limiter, user_id=user)
+        print(f"\n=== Simulating {name} ===")
+        print(simulate_rate_limiter(limiter, clock, user_id=user))
@@ -0,0 +1,180 @@
+import queue
+import threading
+from collections import Counter, defaultdict
+from itertools import compress, islice
+from operator import not_
+from typing import Callable, Dict, List, Optional, Tuple
+
+from rate_limitter.main import RateLimiterObserver
+
+
+class _ThreadAccumulator:
+    __slots__ = ("counts", "merged", "latency", "throttled", "lock", "thread")
+
+    def __init__(self):
+        self.counts = {}  # strategy -> [allowed, denied], only ever written by the owning thread
+        self.merged = {}  # strategy -> [allowed, denied] already added to the totals by drain()
+        self.latency = defaultdict(int)  # (strategy, log2 bucket) -> count
+        self.throttled = defaultdict(int)  # user_id -> sampled denials
+        self.lock = threading.Lock()  # guards latency, throttled and new keys in counts
+        self.thread = threading.current_thread()
+
+
+class RateLimiterMetrics:
+    """
+    Decision metrics for RateLimiter: allowed/denied counters per strategy, decision latency
+    histograms (power-of-two nanosecond buckets) and the most throttled users.
+
+    Each thread records into its own accumulator, which is also kept in a registry. Counters
+    are plain [allowed, denied] lists only the owning thread increments; drain() reads every
+    registered accumulator and adds what has changed since its last visit, so decisions show
+    up without the recording thread ever flushing, including threads that have since exited
+    (their accumulators are dropped once merged). Latency samples and throttled users are
+    swapped out under a per-thread lock that only the sampled path and drain() take.
+
+    Allowed/denied counters are exact. Latency and throttled users are sampled: RateLimiter
+    times one single decision in `latency_sample_every` (a power of two) and every batch once,
+    and throttled users are tracked at the same rate and scaled back up, which keeps heavy
+    hitters in the top-N while leaving the untimed path at one list increment.
+    """
+    def __init__(self, latency_sample_every: int = 64, top_n: int = 10, max_tracked_users: int = 10_000):
+        if latency_sample_every & (latency_sample_every - 1):
+            raise ValueError("latency_sample_every must be a power of two")
+        self.latency_sample_every = latency_sample_every
+        self.top_n = top_n
+        self.max_tracked_users = max_tracked_users
+        self._local = threading.local()
+        self._registry: List[_ThreadAccumulator] = []
+        self._registry_lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self.allowed: Dict[str, int] = defaultdict(int)
+        self.denied: Dict[str, int] = defaultdict(int)
+        self.latency: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.throttled = Counter()
+
+    def _accumulator(self) -> _ThreadAccumulator:
+        acc = getattr(self._local, "acc", None)
+        if acc is None:
+            acc = self._local.acc = _ThreadAccumulator()
+            with self._registry_lock:
+                self._registry.append(acc)
+        return acc
+
+    def counter(self, strategy_name: str) -> List[int]:
+        """
+        The calling thread's [allowed, denied] list for strategy_name. Callers may keep it
+        and increment it directly (RateLimiter does, per thread); drain() picks the counts up.
+        """
+        acc = self._accumulator()
+        counts = acc.counts.get(strategy_name)
+        if counts is None:
+            with acc.lock:
+                counts = acc.counts[strategy_name] = [0, 0]
+        return counts
+
+    def count(self, strategy_name: str, allowed: bool):
+        """Untimed decision: a single counter update."""
+        self.counter(strategy_name)[not allowed] += 1
+
+    def record(self, strategy_name: str, user_id: str, allowed: bool, latency_ns: int):
+        self.counter(strategy_name)[not allowed] += 1
+        acc = self._local.acc
+        with acc.lock:
+            if not allowed:
+                acc.throttled[user_id] += self.latency_sample_every
+            acc.latency[strategy_name, latency_ns.bit_length()] += 1
+
+    def record_batch(self, strategy_name: str, user_ids: List[str], results: List[bool], latency_ns: int):
+        counts = self.counter(strategy_name)
+        allowed = sum(results)
+        counts[0] += allowed
+        counts[1] += len(results) - allowed
+        acc = self._local.acc
+        with acc.lock:
+            if allowed < len(results):
+                step = self.latency_sample_every
+                throttled = acc.throttled
+                for user_id in islice(compress(user_ids, map(not_, results)), 0, None, step):
+                    throttled[user_id] += step
+            # one sample per batch, at the mean per-decision latency
+            acc.latency[strategy_name, (latency_ns // max(1, len(results))).bit_length()] += 1
+
+    def drain(self) -> int:
+        """Merge every thread's new counts and samples into the totals; returns the number of decisions merged."""
+        merged = 0
+        with self._drain_lock:
+            with self._registry_lock:
+                registry = list(self._registry)
+            finished = []
+            for acc in registry:
+                alive = acc.thread.is_alive()  # checked first: a dead thread's counts are final
+                with acc.lock:
+                    counts = list(acc.counts.items())
+                    latency, acc.latency = acc.latency, defaultdict(int)
+                    throttled, acc.throttled = acc.throttled, defaultdict(int)
+                for name, (allowed, denied) in counts:
+                    seen = acc.merged.setdefault(name, [0, 0])
+                    self.allowed[name] += allowed - seen[0]
+                    self.denied[name] += denied - seen[1]
+                    merged += allowed - seen[0] + denied - seen[1]
+                    seen[0], seen[1] = allowed, denied
+                for (name, bucket), count in latency.items():
+                    self.latency[name][bucket] += count
+                self.throttled.update(throttled)
+                if not alive:
+                    finished.append(acc)
+            if finished:
+                with self._registry_lock:
+                    self._registry = [acc for acc in self._registry if acc not in finished]
+            if len(self.throttled) > self.max_tracked_users:
+                self.throttled = Counter(dict(self.throttled.most_common(self.max_tracked_users)))
+        return merged
+
+    def top_throttled(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Most throttled users with their estimated denial counts."""
+        return self.throttled.most_common(self.top_n if n is None else n)
+
+    def snapshot(self) -> dict:
+        """Current totals; drains every thread's pending counts first."""
+        self.drain()
+        return {
+            "allowed": dict(self.allowed),
+            "denied": dict(self.denied),
+            # bucket b counts decisions that took [2**(b-1), 2**b) nanoseconds
+            "latency_ns": {name: {1 << b: c for b, c in sorted(buckets.items())}
+                           for name, buckets in self.latency.items()},
+            "top_throttled": self.top_throttled(),
+        }
+
+
+class BatchingObserver(RateLimiterObserver):
+    """RateLimiterObserver that queues decisions and reports them in batches on drain()."""
+    def __init__(self, sink: Callable[[List[Tuple[str, bool]]], None] = None, batch_size: int = 256):
+        self.sink = sink or self._print_batch
+        self.batch_size = batch_size
+        self._decisions = queue.SimpleQueue()
+
+    def notify(self, user_id: str, allowed: bool):
+        self._decisions.put((user_id, allowed))
+
+    def drain(self) -> int:
+        drained = 0
+        batch = []
+        while True:
+            try:
+                batch.append(self._decisions.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self.sink(batch)
+                drained += len(batch)
+                batch = []
+        if batch:
+            self.sink(batch)
+            drained += len(batch)
+        return drained
+
+    @staticmethod
+    def _print_batch(batch):
+        allowed = sum(1 for _, ok in batch if ok)
+        print(f"[OBSERVE] {len(batch)} decisions, Allowed: {allowed}, Denied: {len(batch) - allowed}")
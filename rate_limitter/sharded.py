@@ -0,0 +1,64 @@
+import threading
+from typing import Callable, Iterable, List, Optional
+
+from rate_limitter.main import RateLimiterStrategy
+
+
+class ShardedRateLimiter(RateLimiterStrategy):
+    """
+    Thread-safe wrapper that splits users across N independent strategy instances.
+
+    user_id is hashed to a stripe; each stripe owns its own strategy (and therefore its own
+    storage) plus a lock, so the read-modify-write inside allow_request is atomic per user
+    while requests for users on different stripes never wait on each other.
+    """
+    def __init__(self, strategy_factory: Callable[[], RateLimiterStrategy], shards: int = 16):
+        if shards <= 0:
+            raise ValueError("shards must be positive")
+        self.shards = [strategy_factory() for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    def shard_index(self, user_id: str) -> int:
+        return hash(user_id) % len(self.shards)
+
+    @property
+    def clock(self):
+        return self.shards[0].clock
+
+    def allow_request(self, user_id: str, now: Optional[int] = None) -> bool:
+        i = hash(user_id) % len(self.shards)
+        with self.locks[i]:
+            return self.shards[i].allow_request(user_id, now)
+
+    def reserve(self, user_id: str, tokens: int = 1, now: Optional[int] = None) -> int:
+        i = hash(user_id) % len(self.shards)
+        with self.locks[i]:
+            return self.shards[i].reserve(user_id, tokens, now)
+
+    def allow_requests(self, user_ids: Iterable[str], now: Optional[int] = None) -> List[bool]:
+        user_ids = list(user_ids)
+        n = len(self.shards)
+        positions = {}  # shard -> positions in the batch, in arrival order
+        for pos, user_id in enumerate(user_ids):
+            positions.setdefault(hash(user_id) % n, []).append(pos)
+
+        results = [False] * len(user_ids)
+        for i, shard_positions in positions.items():
+            with self.locks[i]:
+                decisions = self.shards[i].allow_requests([user_ids[p] for p in shard_positions], now)
+            for p, allowed in zip(shard_positions, decisions):
+                results[p] = allowed
+        return results
+
+    def evict_idle_keys(self, now: Optional[int] = None, budget: int = 1024,
+                        max_keys: Optional[int] = None) -> int:
+        n = len(self.shards)
+        shard_budget = max(1, budget // n)
+        evicted = 0
+        for i, (shard, lock) in enumerate(zip(self.shards, self.locks)):
+            # the first max_keys % n shards keep one key more, so the caps add up to max_keys
+            shard_max_keys = None if max_keys is None else max_keys // n + (i < max_keys % n)
+            with lock:
+                evicted += shard.evict_idle_keys(now, shard_budget, shard_max_keys)
+        self.evicted_keys += evicted
+        return evicted
@@ -0,0 +1,337 @@
+import asyncio
+import random
+import threading
+import time
+import unittest
+
+from rate_limitter.backends import BackendRateLimiter, InMemoryBackend, SharedMemoryBackend
+from rate_limitter.main import (
+    NS_PER_SEC,
+    RateLimiter,
+    SimulatedClock,
+    simulate_rate_limiter,
+    FixedWindowRateLimiter,
+    SlidingWindowRateLimiter,
+    SlidingWindowCounterRateLimiter,
+    TokenBucketRateLimiter,
+    LeakyBucketRateLimiter,
+)
+from rate_limitter.metrics import RateLimiterMetrics
+from rate_limitter.sharded import ShardedRateLimiter
+
+
+class TestBatchRequests(unittest.TestCase):
+    def test_batch_matches_single_calls_with_repeated_users(self):
+        user_ids = ["a", "b", "a", "a", "c", "a", "b"]
+        single = FixedWindowRateLimiter(max_requests=2, window_size_sec=60)
+        batch = FixedWindowRateLimiter(max_requests=2, window_size_sec=60)
+        expected = [single.allow_request(u) for u in user_ids]
+        self.assertEqual(batch.allow_requests(user_ids), expected)
+        self.assertEqual(expected, [True, True, True, False, True, False, True])
+
+    def test_batch_matches_single_calls_for_every_strategy(self):
+        factories = (lambda clock: FixedWindowRateLimiter(3, 10, clock=clock),
+                     lambda clock: SlidingWindowRateLimiter(3, 10, clock=clock),
+                     lambda clock: SlidingWindowCounterRateLimiter(3, 10, clock=clock),
+                     lambda clock: TokenBucketRateLimiter(rate=0.5, capacity=3, clock=clock),
+                     lambda clock: LeakyBucketRateLimiter(rate=0.5, capacity=3, clock=clock))
+        for factory in factories:
+            rng = random.Random(11)
+            clock = SimulatedClock()
+            single, batch = factory(clock), factory(clock)
+            with self.subTest(strategy=type(single).__name__):
+                for _ in range(50):
+                    clock.advance(rng.choice((0, 0.25, 1, 4)))
+                    user_ids = [f"user-{rng.randrange(4)}" for _ in range(rng.randrange(8))]
+                    now = clock()
+                    self.assertEqual(batch.allow_requests(user_ids, now),
+                                     [single.allow_request(u, now) for u in user_ids])
+
+
+class TestSlidingWindowCounter(unittest.TestCase):
+    def test_previous_window_is_forgotten_after_two_windows(self):
+        clock = SimulatedClock()
+        strategy = SlidingWindowCounterRateLimiter(max_requests=4, window_size_sec=10, clock=clock)
+        self.assertEqual(strategy.allow_requests(["u"] * 4), [True] * 4)
+        clock.advance(10)  # boundary: the whole previous window still overlaps
+        self.assertFalse(strategy.allow_request("u"))
+        clock.advance(13)  # 23s: window [20, 30), nothing from [0, 10) overlaps any more
+        self.assertEqual(strategy.allow_requests(["u"] * 5), [True] * 4 + [False])
+        self.assertEqual(strategy.storage["u"], [0, 4, 20 * NS_PER_SEC])
+
+    def test_any_window_admits_at_most_twice_the_limit(self):
+        rng = random.Random(5)
+        clock = SimulatedClock()
+        strategy = SlidingWindowCounterRateLimiter(max_requests=5, window_size_sec=10, clock=clock)
+        admitted = []
+        for _ in range(2_000):
+            clock.advance(rng.choice((0, 0.01, 0.5, 2)))
+            if strategy.allow_request("u"):
+                admitted.append(clock())
+        for fixed_start in range(0, admitted[-1], 10 * NS_PER_SEC):  # each fixed window on its own
+            self.assertLessEqual(sum(fixed_start <= t < fixed_start + 10 * NS_PER_SEC for t in admitted), 5)
+        window = 10 * NS_PER_SEC
+        left = 0
+        for right, t in enumerate(admitted):
+            while admitted[left] <= t - window:
+                left += 1
+            self.assertLessEqual(right - left + 1, 10)
+
+
+class TestShardedRateLimiter(unittest.TestCase):
+    def test_batch_keeps_order_across_shards(self):
+        limiter = ShardedRateLimiter(lambda: FixedWindowRateLimiter(max_requests=1, window_size_sec=60), shards=4)
+        user_ids = [f"user-{i % 10}" for i in range(30)]
+        self.assertEqual(limiter.allow_requests(user_ids), [True] * 10 + [False] * 20)
+
+    def test_no_over_admission_under_contention(self):
+        capacity = 200
+        for factory in (lambda: TokenBucketRateLimiter(rate=0.001, capacity=capacity),
+                        lambda: LeakyBucketRateLimiter(rate=0.001, capacity=capacity)):
+            limiter = ShardedRateLimiter(factory, shards=8)
+            allowed = []
+            barrier = threading.Barrier(8)
+
+            def worker():
+                barrier.wait()
+                allowed.append(sum(limiter.allow_request("hot-user") for _ in range(500)))
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(sum(allowed), capacity)
+
+
+class TestBackends(unittest.TestCase):
+    def test_backends_match_local_storage(self):
+        user_ids = [f"user-{i % 7}" for i in range(60)]
+        shared = SharedMemoryBackend(slots=256, fields=3, stripes=4)
+        try:
+            for factory in (lambda: FixedWindowRateLimiter(max_requests=3, window_size_sec=60),
+                            lambda: SlidingWindowCounterRateLimiter(max_requests=3, window_size_sec=60),
+                            lambda: TokenBucketRateLimiter(rate=0.001, capacity=3),
+                            lambda: LeakyBucketRateLimiter(rate=0.001, capacity=3)):
+                now = 1_000 * NS_PER_SEC
+                expected = factory().allow_requests(user_ids, now)
+                for backend in (InMemoryBackend(), shared):
+                    shared.shm.buf[:] = bytes(len(shared.shm.buf))
+                    limiter = BackendRateLimiter(factory(), backend)
+                    self.assertEqual(limiter.allow_requests(user_ids, now), expected)
+        finally:
+            shared.close()
+
+    def test_evict_idle_keys_through_rate_limiter(self):
+        clock = SimulatedClock()
+        shared = SharedMemoryBackend(slots=64, fields=3, stripes=4)
+        try:
+            for backend in (InMemoryBackend(), shared):
+                limiter = RateLimiter(BackendRateLimiter(
+                    FixedWindowRateLimiter(max_requests=1, window_size_sec=10, clock=clock), backend))
+                self.assertTrue(all(limiter.allow_requests([f"user-{i}" for i in range(10)])))
+                clock.advance(5)
+                self.assertFalse(limiter.allow_request("user-0"))
+                self.assertEqual(limiter.evict_idle_keys(), 0)
+                clock.advance(10)
+                self.assertEqual(limiter.evict_idle_keys(budget=64), 10)
+                self.assertTrue(limiter.allow_request("user-0"))
+            self.assertEqual(sum(shared._stored_hash(slot) != 0 for slot in range(64)), 1)
+        finally:
+            shared.close()
+
+    def test_shared_memory_reuses_idle_slots_for_new_users(self):
+        clock = SimulatedClock()
+        shared = SharedMemoryBackend(slots=64, fields=3, stripes=4)
+        try:
+            limiter = BackendRateLimiter(TokenBucketRateLimiter(rate=1, capacity=2, clock=clock), shared)
+            for i in range(1000):  # rotating ids, each idle again a few seconds later
+                self.assertTrue(limiter.allow_request(f"user-{i}"))
+                clock.advance(1)
+                if i % 50 == 0:
+                    limiter.evict_idle_keys(budget=16)
+            active = [f"active-{i}" for i in range(16)]
+            self.assertEqual(limiter.allow_requests(active * 3), [True] * 32 + [False] * 16)
+        finally:
+            shared.close()
+
+
+class TestSimulatedClock(unittest.TestCase):
+    def test_token_bucket_refills_on_simulated_time(self):
+        clock = SimulatedClock()
+        limiter = RateLimiter(TokenBucketRateLimiter(rate=1, capacity=5, clock=clock))
+        decisions = simulate_rate_limiter(limiter, clock, interval=0.5, total=10)
+        self.assertEqual(decisions, [True] * 9 + [False])
+
+    def test_new_users_start_at_the_passed_timestamp(self):
+        clock = SimulatedClock(start_ns=100 * NS_PER_SEC)
+        cached = clock() - 5 * NS_PER_SEC  # coarse timestamp read earlier in the loop
+        for strategy in (FixedWindowRateLimiter(2, 10, clock=clock),
+                         SlidingWindowCounterRateLimiter(2, 10, clock=clock),
+                         TokenBucketRateLimiter(rate=1, capacity=2, clock=clock),
+                         LeakyBucketRateLimiter(rate=1, capacity=2, clock=clock)):
+            with self.subTest(strategy=type(strategy).__name__):
+                self.assertTrue(strategy.allow_request("u", now=cached))
+                self.assertEqual(strategy.last_seen(strategy.storage["u"]), cached)
+                if isinstance(strategy, (TokenBucketRateLimiter, LeakyBucketRateLimiter)):
+                    self.assertEqual(strategy.reserve("v", now=cached), 0)
+                    self.assertEqual(strategy.last_seen(strategy.storage["v"]), cached)
+
+    def test_leaky_bucket_drains_on_simulated_time(self):
+        clock = SimulatedClock()
+        limiter = RateLimiter(LeakyBucketRateLimiter(rate=2, capacity=2, clock=clock))
+        self.assertEqual(limiter.allow_requests(["u"] * 3), [True, True, False])
+        clock.advance(0.5)
+        self.assertEqual(limiter.allow_requests(["u"] * 2), [True, False])
+
+    def test_stale_cached_timestamp_does_not_rewind_bucket(self):
+        clock = SimulatedClock(start_ns=10 * NS_PER_SEC)
+        strategy = TokenBucketRateLimiter(rate=1, capacity=1, clock=clock)
+        self.assertTrue(strategy.allow_request("u"))
+        clock.advance(1)
+        cached = clock() - NS_PER_SEC // 2  # coarse timestamp read earlier in the loop
+        self.assertFalse(strategy.allow_request("u", now=cached))
+        self.assertTrue(strategy.allow_request("u"))
+
+    def test_sliding_window_counter_weights_previous_window(self):
+        clock = SimulatedClock()
+        strategy = SlidingWindowCounterRateLimiter(max_requests=4, window_size_sec=10, clock=clock)
+        self.assertEqual(strategy.allow_requests(["u"] * 5), [True] * 4 + [False])
+        clock.advance(15)  # half of the previous window still overlaps: estimate = 4 * 0.5
+        self.assertEqual(strategy.allow_requests(["u"] * 3), [True, True, False])
+
+
+class TestEviction(unittest.TestCase):
+    def test_sweep_is_bounded_by_budget_and_resumes(self):
+        clock = SimulatedClock()
+        strategy = FixedWindowRateLimiter(max_requests=5, window_size_sec=10, clock=clock)
+        strategy.allow_requests([f"old-{i}" for i in range(30)])
+        clock.advance(10)
+        strategy.allow_requests([f"new-{i}" for i in range(10)])
+        evicted = [strategy.evict_idle_keys(budget=8) for _ in range(6)]
+        self.assertEqual(evicted, [8, 8, 8, 6, 0, 0])
+        self.assertEqual(sorted(strategy.storage), sorted(f"new-{i}" for i in range(10)))
+        self.assertEqual(strategy.evicted_keys, 30)
+
+    def test_idle_follows_each_strategy_ttl(self):
+        clock = SimulatedClock()
+        for strategy, ttl in ((FixedWindowRateLimiter(5, 10, clock=clock), 10),
+                              (SlidingWindowRateLimiter(5, 10, clock=clock), 10.5),
+                              (SlidingWindowCounterRateLimiter(5, 10, clock=clock), 20),
+                              (TokenBucketRateLimiter(rate=1, capacity=5, clock=clock), 3),
+                              (LeakyBucketRateLimiter(rate=1, capacity=5, clock=clock), 3)):
+            with self.subTest(strategy=type(strategy).__name__):
+                strategy.allow_requests(["u"] * 3)
+                clock.advance(ttl - 0.5)
+                self.assertEqual(strategy.evict_idle_keys(), 0)
+                clock.advance(0.5)
+                self.assertEqual(strategy.evict_idle_keys(), 1)
+                self.assertEqual(len(strategy.storage), 0)
+
+    def test_cap_drops_least_recently_seen_users(self):
+        clock = SimulatedClock()
+        strategy = TokenBucketRateLimiter(rate=0.01, capacity=100, clock=clock)
+        strategy.allow_request("heavy")  # first in, and active throughout
+        for i in range(10):
+            clock.advance(1)
+            strategy.allow_requests(["heavy", f"user-{i}"])
+        self.assertEqual(strategy.evict_idle_keys(budget=0, max_keys=4), 7)
+        self.assertEqual(sorted(strategy.storage), ["heavy", "user-7", "user-8", "user-9"])
+
+    def test_sharded_cap_below_the_shard_count(self):
+        clock = SimulatedClock()
+        limiter = ShardedRateLimiter(lambda: TokenBucketRateLimiter(rate=0.01, capacity=100, clock=clock), shards=8)
+        for i in range(40):  # int ids hash to themselves: five users per shard
+            clock.advance(1)
+            limiter.allow_request(i)
+        for max_keys in (20, 11, 3, 0):
+            with self.subTest(max_keys=max_keys):
+                limiter.evict_idle_keys(budget=0, max_keys=max_keys)
+                self.assertEqual(sum(len(shard.storage) for shard in limiter.shards), max_keys)
+        self.assertEqual(limiter.evicted_keys, 40)
+
+
+class TestAsyncAcquire(unittest.TestCase):
+    def test_waiters_are_served_in_fifo_order(self):
+        limiter = RateLimiter(TokenBucketRateLimiter(rate=200, capacity=1))
+        order = []
+
+        async def worker(i):
+            await limiter.acquire("u")
+            order.append(i)
+
+        async def main():
+            await asyncio.gather(*(worker(i) for i in range(5)))
+
+        start = time.monotonic()
+        asyncio.run(main())
+        self.assertEqual(order, [0, 1, 2, 3, 4])
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 200)
+        self.assertEqual(limiter._queues, {})
+
+    def test_timeout_gives_up_without_taking_tokens(self):
+        strategy = LeakyBucketRateLimiter(rate=1, capacity=2)
+        limiter = RateLimiter(strategy)
+
+        async def main():
+            self.assertTrue(await limiter.acquire("u", tokens=2))
+            return await limiter.acquire("u", timeout=0.01)
+
+        self.assertFalse(asyncio.run(main()))
+        self.assertGreater(strategy.reserve("u"), 0)
+
+    def test_timeout_covers_the_wait_behind_earlier_callers(self):
+        limiter = RateLimiter(TokenBucketRateLimiter(rate=1, capacity=1))
+
+        async def main():
+            self.assertTrue(await limiter.acquire("u"))
+            first = asyncio.create_task(limiter.acquire("u"))  # holds the queue for ~1 s
+            await asyncio.sleep(0)
+            start = time.monotonic()
+            queued = await limiter.acquire("u", timeout=0.05)
+            waited = time.monotonic() - start
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            return queued, waited
+
+        queued, waited = asyncio.run(main())
+        self.assertFalse(queued)
+        self.assertLess(waited, 0.5)
+        self.assertEqual(limiter._queues, {})
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counters_are_exact_across_threads(self):
+        metrics = RateLimiterMetrics(latency_sample_every=4)
+        limiter = RateLimiter(FixedWindowRateLimiter(max_requests=10, window_size_sec=60), metrics=metrics)
+
+        def worker(t):
+            for i in range(100):
+                limiter.allow_request(f"user-{t}")
+            limiter.allow_requests([f"batch-{t}"] * 20)
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["allowed"], {"FixedWindowRateLimiter": 4 * (10 + 10)})
+        self.assertEqual(snapshot["denied"], {"FixedWindowRateLimiter": 4 * (90 + 10)})
+        self.assertEqual(len(snapshot["top_throttled"]), 8)
+        self.assertTrue(snapshot["latency_ns"]["FixedWindowRateLimiter"])
+
+    def test_drain_harvests_threads_without_flushing(self):
+        metrics = RateLimiterMetrics()
+        limiter = RateLimiter(FixedWindowRateLimiter(max_requests=1000, window_size_sec=60), metrics=metrics)
+        thread = threading.Thread(target=lambda: [limiter.allow_request("u") for _ in range(3000)])
+        thread.start()
+        thread.join()
+        self.assertEqual(metrics.snapshot()["allowed"], {"FixedWindowRateLimiter": 1000})
+        self.assertEqual(metrics.snapshot()["denied"], {"FixedWindowRateLimiter": 2000})
+        self.assertEqual(metrics._registry, [])  # the exited thread's accumulator was dropped
+
+        limiter.allow_request("u")  # a live thread's counts show up on the next drain as well
+        self.assertEqual(metrics.drain(), 1)
+        self.assertEqual(metrics.drain(), 0)